@@ -1,5 +1,12 @@
+from .archive_mode import ArchiveMode
 from .compile_command import CompileCommand
-from .dep_tree import CyclicDependencyError, DepTree, MissingDependencyError, Target
+from .dep_tree import (
+    CyclicDependencyError,
+    DepTree,
+    MissingDependencyError,
+    Target,
+    UnknownTargetError,
+)
 from .environment import (
     Environment,
     Program,
@@ -14,6 +21,7 @@ from .safe_exec import SafeBuildError, safe_execute
 __version__ = "0.4.1"
 
 __all__ = [
+    "ArchiveMode",
     "CompileCommand",
     "CyclicDependencyError",
     "DepTree",
@@ -27,5 +35,6 @@ __all__ = [
     "StaticLibrary",
     "SystemLibrary",
     "Target",
+    "UnknownTargetError",
     "safe_execute",
 ]
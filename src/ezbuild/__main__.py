@@ -1,4 +1,5 @@
 from importlib.metadata import version
+from pathlib import Path
 from typing import Annotated
 
 import typer
@@ -7,6 +8,7 @@ from ezbuild import (
     commands,
     log,
 )
+from ezbuild.commands.build import DEFAULT_LINK_MEMORY
 
 cli: typer.Typer = typer.Typer()
 
@@ -35,12 +37,84 @@ def init(
 
 @cli.command()
 def build(
-    name: Annotated[
-        str | None, typer.Argument(help="Name of the project to build")
+    names: Annotated[
+        list[str] | None,
+        typer.Argument(help="Targets to build along with their dependencies"),
+    ] = None,
+    jobs: Annotated[
+        int | None,
+        typer.Option("--jobs", "-j", min=1, help="Number of jobs to run in parallel"),
+    ] = None,
+    link_jobs: Annotated[
+        int | None,
+        typer.Option("--link-jobs", min=1, help="Number of links to run in parallel"),
+    ] = None,
+    link_memory: Annotated[
+        str,
+        typer.Option(
+            "--link-memory",
+            help="Memory a link needs; further links wait until it is available",
+        ),
+    ] = DEFAULT_LINK_MEMORY,
+    load_average: Annotated[
+        float | None,
+        typer.Option(
+            "--load-average",
+            "-l",
+            min=0,
+            help="Start no new jobs while the load average is at least this",
+        ),
+    ] = None,
+    keep_going: Annotated[
+        bool,
+        typer.Option(
+            "--keep-going",
+            "-k",
+            help="Keep building what does not depend on a failed step",
+        ),
+    ] = False,
+    always_make: Annotated[
+        bool,
+        typer.Option("--always-make", "-B", help="Rebuild outputs that are up to date"),
+    ] = False,
+    use_hash: Annotated[
+        bool,
+        typer.Option("--hash", help="Compare file contents when timestamps differ"),
+    ] = False,
+    use_cache: Annotated[
+        bool | None,
+        typer.Option("--cache/--no-cache", help="Reuse objects from the local cache"),
+    ] = None,
+    remote_cache: Annotated[
+        str | None,
+        typer.Option(
+            "--remote-cache", help="URL of a shared cache to read and upload to"
+        ),
     ] = None,
+    trace: Annotated[
+        str | None,
+        typer.Option("--trace", help="Write a Chrome trace of the build to this file"),
+    ] = None,
+    stats: Annotated[
+        bool,
+        typer.Option("--stats", help="Print timings and the slowest steps at the end"),
+    ] = False,
 ) -> None:
     """Build the project."""
-    exit_code, message = commands.build(name=name)
+    exit_code, message = commands.build(
+        names=names,
+        jobs=jobs,
+        link_jobs=link_jobs,
+        link_memory=link_memory,
+        load_average=load_average,
+        keep_going=keep_going,
+        always_make=always_make,
+        use_hash=use_hash,
+        use_cache=use_cache,
+        remote_cache=remote_cache,
+        trace_path=Path(trace) if trace else None,
+        show_stats=stats,
+    )
     if exit_code != 0:
         log.error(message)
     raise typer.Exit(exit_code)
@@ -57,12 +131,84 @@ def run(
     raise typer.Exit(exit_code)
 
 
+@cli.command()
+def generate(
+    ninja: Annotated[
+        bool, typer.Option("--ninja", help="Generate build/build.ninja for ninja")
+    ] = False,
+    link_jobs: Annotated[
+        int | None,
+        typer.Option(
+            "--link-jobs", min=1, help="Number of links ninja runs in parallel"
+        ),
+    ] = None,
+) -> None:
+    """Generate build files for another build tool."""
+    exit_code, message = commands.generate(ninja=ninja, link_jobs=link_jobs)
+    if exit_code != 0:
+        log.error(message)
+    raise typer.Exit(exit_code)
+
+
 @cli.command()
 def clean():
     """Clean the project."""
     commands.clean()
 
 
+cache_cli: typer.Typer = typer.Typer(help="Manage the object cache.")
+cli.add_typer(cache_cli, name="cache")
+
+
+@cache_cli.command("stats")
+def cache_stats() -> None:
+    """Show object cache statistics."""
+    exit_code, message = commands.cache_stats()
+    if exit_code != 0:
+        log.error(message)
+    raise typer.Exit(exit_code)
+
+
+@cache_cli.command("trim")
+def cache_trim(
+    max_size: Annotated[
+        str | None,
+        typer.Option("--max-size", help="Size to trim the cache to, e.g. 512M or 5G"),
+    ] = None,
+) -> None:
+    """Evict least recently used objects until the cache fits its size limit."""
+    exit_code, message = commands.cache_trim(max_size=max_size)
+    if exit_code != 0:
+        log.error(message)
+    raise typer.Exit(exit_code)
+
+
+@cache_cli.command("clear")
+def cache_clear() -> None:
+    """Remove every object from the cache."""
+    commands.cache_clear()
+
+
+@cache_cli.command("serve")
+def cache_serve(
+    host: Annotated[
+        str, typer.Option("--host", help="Address to listen on")
+    ] = "127.0.0.1",
+    port: Annotated[int, typer.Option("--port", help="Port to listen on")] = 8765,
+    directory: Annotated[
+        str | None,
+        typer.Option(
+            "--dir", help="Directory to store entries in, by default <cache dir>-server"
+        ),
+    ] = None,
+) -> None:
+    """Serve a shared cache for --remote-cache over HTTP."""
+    exit_code, message = commands.cache_serve(host=host, port=port, directory=directory)
+    if exit_code != 0:
+        log.error(message)
+    raise typer.Exit(exit_code)
+
+
 @cli.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class ArchiveMode(Enum):
+    """How a StaticLibrary is archived."""
+
+    # `ar -rc` followed by ranlib, which works with any ar.
+    RANLIB = "ranlib"
+    # `ar -rcs`, which writes the symbol index in the same pass.
+    INDEXED = "indexed"
+    # `ar -rcsT`, a thin archive which refers to the objects in place
+    # instead of copying them.
+    THIN = "thin"
@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from ezbuild.log import debug
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+LOG_FILE = ".ezbuild_log"
+
+_HEADER = "# ezbuild log v1"
+
+# The log is rewritten with only the latest entry of every step once it has
+# this many lines and at least three times as many as there are steps.
+_COMPACT_LINES = 1000
+_COMPACT_RATIO = 3
+
+
+@dataclass
+class LogEntry:
+    """A single run of a build step."""
+
+    output: str
+    kind: str
+    # Milliseconds since the epoch.
+    start: int
+    end: int
+    command: str
+    status: int
+
+    @property
+    def duration(self) -> float:
+        """Duration of the step in seconds."""
+        return (self.end - self.start) / 1000
+
+    def format(self) -> str:
+        return "\t".join(
+            [
+                str(self.start),
+                str(self.end),
+                str(self.status),
+                self.kind,
+                self.command,
+                self.output,
+            ]
+        )
+
+    @classmethod
+    def parse(cls, line: str) -> LogEntry | None:
+        fields = line.rstrip("\n").split("\t", 5)
+        if len(fields) != 6:
+            return None
+
+        start, end, status, kind, command, output = fields
+        try:
+            return cls(
+                output=output,
+                kind=kind,
+                start=int(start),
+                end=int(end),
+                command=command,
+                status=int(status),
+            )
+        except ValueError:
+            return None
+
+
+class BuildLog:
+    """
+    Append-only record of every compile, archive, ranlib and link step run
+    by previous builds, one tab separated line per step:
+    start and end in milliseconds since the epoch, exit status, step kind,
+    command_hash() of the command line and output path.
+    Persisted in the build directory next to the build state.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[tuple[str, str], LogEntry] = {}
+        self._lines = 0
+        self._pending: list[LogEntry] = []
+
+    @classmethod
+    def load(cls, build_dir: Path) -> BuildLog:
+        log = cls(build_dir / LOG_FILE)
+        try:
+            with log.path.open("r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return log
+        except OSError:
+            debug(f"Ignoring unreadable {log.path}")
+            return log
+
+        if not lines or lines[0].rstrip("\n") != _HEADER:
+            debug(f"Ignoring {log.path} written by another version")
+            return log
+
+        for line in lines[1:]:
+            entry = LogEntry.parse(line)
+            if entry is not None:
+                log.entries[(entry.output, entry.kind)] = entry
+                log._lines += 1
+        return log
+
+    def record(self, entry: LogEntry) -> None:
+        self.entries[(entry.output, entry.kind)] = entry
+        self._pending.append(entry)
+
+    def duration(self, output: str, kind: str) -> float | None:
+        """Duration in seconds of the last successful run of a step."""
+        entry = self.entries.get((output, kind))
+        if entry is None or entry.status != 0:
+            return None
+        return entry.duration
+
+    def typical_duration(self, kind: str) -> float | None:
+        """Mean duration in seconds of the successful steps of a kind."""
+        durations = [
+            entry.duration
+            for entry in self.entries.values()
+            if entry.kind == kind and entry.status == 0
+        ]
+        if not durations:
+            return None
+        return sum(durations) / len(durations)
+
+    def save(self) -> None:
+        """Append the entries recorded since loading, compacting if needed."""
+        if not self._pending:
+            return
+
+        self._lines += len(self._pending)
+        if self._lines >= _COMPACT_LINES and self._lines >= _COMPACT_RATIO * len(
+            self.entries
+        ):
+            self._compact()
+        elif self.path.exists() and self._lines > len(self._pending):
+            with self.path.open("a") as f:
+                f.writelines(f"{entry.format()}\n" for entry in self._pending)
+        else:
+            self._compact()
+
+        self._pending.clear()
+
+    def _compact(self) -> None:
+        temp = self.path.with_name(self.path.name + ".tmp")
+        with temp.open("w") as f:
+            f.write(f"{_HEADER}\n")
+            f.writelines(f"{entry.format()}\n" for entry in self.entries.values())
+        temp.replace(self.path)
+        self._lines = len(self.entries)
@@ -0,0 +1,128 @@
+import json
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+from ezbuild.log import debug
+
+STATE_FILE = ".ezbuild_state"
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return Path(path).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def file_hash(path: str) -> str:
+    """Return the sha256 hex digest of a file's contents."""
+    digest = sha256()
+    with Path(path).open("rb") as f:
+        while chunk := f.read(1 << 16):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def command_hash(*commands: list[str]) -> str:
+    """Return a fingerprint of one or more command lines."""
+    return sha256(json.dumps(commands).encode()).hexdigest()
+
+
+class BuildState:
+    """
+    Remembers what every output of the previous builds was produced from.
+    Persisted as JSON in the build directory so the next build can skip
+    outputs that are already up to date.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, build_dir: Path) -> BuildState:
+        state = cls(build_dir / STATE_FILE)
+        if not state.path.exists():
+            return state
+
+        try:
+            with state.path.open("r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            debug(f"Ignoring unreadable {state.path}")
+            return state
+
+        if isinstance(entries, dict):
+            state.entries = entries
+        return state
+
+    def save(self) -> None:
+        temp = self.path.with_name(self.path.name + ".tmp")
+        with temp.open("w") as f:
+            json.dump(self.entries, f)
+        temp.replace(self.path)
+
+    def is_up_to_date(
+        self,
+        output: str,
+        inputs: list[str],
+        use_hash: bool = False,
+        command: str | None = None,
+    ) -> bool:
+        """
+        Check whether output exists, was built from exactly these inputs and
+        is newer than every one of them and every recorded dependency.
+        With use_hash an input newer than the output still counts as up to
+        date if its contents match the ones recorded when output was built.
+        command is the command_hash() of the command line that would build
+        output; a different fingerprint than the recorded one makes it stale.
+        """
+        entry = self.entries.get(output)
+        if entry is None or entry.get("inputs") != inputs:
+            return False
+
+        if command is not None and entry.get("command") != command:
+            return False
+
+        output_mtime = _mtime(output)
+        if output_mtime is None:
+            return False
+
+        hashes: dict[str, str] = entry.get("hashes", {})
+        for path in [*inputs, *entry.get("deps", [])]:
+            input_mtime = _mtime(path)
+            if input_mtime is None:
+                return False
+            if input_mtime <= output_mtime:
+                continue
+            if use_hash and path in hashes and hashes[path] == file_hash(path):
+                continue
+            return False
+
+        return True
+
+    def record(
+        self,
+        output: str,
+        inputs: list[str],
+        use_hash: bool = False,
+        deps: list[str] | None = None,
+        command: str | None = None,
+    ) -> None:
+        """
+        Remember that output was just built from inputs.
+        deps are additional files output depends on, e.g. included headers
+        reported by the compiler, and command is the command_hash() of the
+        command line that built it.
+        """
+        entry: dict[str, Any] = {"inputs": inputs}
+        if command is not None:
+            entry["command"] = command
+        if deps:
+            entry["deps"] = deps
+        if use_hash:
+            entry["hashes"] = {
+                path: file_hash(path) for path in [*inputs, *(deps or [])]
+            }
+        self.entries[output] = entry
@@ -0,0 +1,427 @@
+import json
+from dataclasses import asdict, dataclass, field
+from fcntl import LOCK_EX, flock
+from hashlib import sha256
+from os import utime
+from pathlib import Path
+from secrets import token_hex
+from shutil import copyfile, rmtree, which
+from subprocess import run
+from threading import Lock, Thread, get_ident
+from time import time
+from typing import TYPE_CHECKING
+
+from ezbuild.build_state import file_hash
+from ezbuild.executor import (
+    COMPILE_KINDS,
+    LINK_KINDS,
+    JobResult,
+    response_file_argv,
+    run_job,
+)
+from ezbuild.log import debug, error
+from ezbuild.python_environment import PythonEnvironment
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from ezbuild.executor import Job
+    from ezbuild.remote_cache import RemoteCache
+
+# Bump whenever the key derivation changes so old entries are never reused.
+_KEY_VERSION = "1"
+
+# Steps whose output is cached besides compiles. ranlib rewrites the archive
+# in place, so it always runs after the archive was restored.
+_CACHED_LINK_KINDS = [*LINK_KINDS, "ar"]
+
+# Links also read the system libraries, libc and crt files, which the key
+# does not cover, so their outputs are only shared with the same machine.
+_LOCAL_KINDS = LINK_KINDS
+
+DEFAULT_MAX_SIZE = 5 * 1024**3
+
+# Trimming stops below the maximum so that the next few builds do not have
+# to evict again right away.
+_TRIM_RATIO = 0.9
+
+# Number of evictions kept in the statistics.
+_EVICTION_HISTORY = 20
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(size: str) -> int:
+    """Parse a size such as "512M" or "5G" into bytes."""
+    value = size.strip().upper().removesuffix("B").removesuffix("I")
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    number = value.removesuffix(unit) if unit else value
+
+    try:
+        result = int(float(number) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid size: {size}") from None
+
+    if result < 0:
+        raise ValueError(f"Invalid size: {size}")
+    return result
+
+
+def format_size(size: int) -> str:
+    """Format a number of bytes for humans."""
+    if size < 1024:
+        return f"{size} B"
+
+    value = size / 1024
+    for unit in ["KiB", "MiB", "GiB"]:
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def configured_max_size() -> int:
+    """Maximum cache size from EZBUILD_CACHE_MAX_SIZE, or the default."""
+    size = PythonEnvironment.cache_max_size()
+    if not size:
+        return DEFAULT_MAX_SIZE
+
+    try:
+        return parse_size(size)
+    except ValueError:
+        error(f"Ignoring invalid EZBUILD_CACHE_MAX_SIZE: {size}")
+        return DEFAULT_MAX_SIZE
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bytes_saved: int = 0
+    evictions: list[dict[str, int]] = field(default_factory=list)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _without_pair(argv: list[str], flag: str, value: str) -> list[str]:
+    """Remove every occurrence of `flag value` from argv."""
+    result: list[str] = []
+    i = 0
+    while i < len(argv):
+        if argv[i] == flag and i + 1 < len(argv) and argv[i + 1] == value:
+            i += 2
+            continue
+        result.append(argv[i])
+        i += 1
+    return result
+
+
+def preprocess_argv(argv: list[str], output: str) -> list[str]:
+    """Turn a compile command line into one that preprocesses to stdout."""
+    argv = _without_pair(argv, "-o", output)
+    return ["-E" if arg == "-c" else arg for arg in argv]
+
+
+def normalize_argv(argv: list[str], output: str, depfile: str) -> list[str]:
+    """
+    Strip a compile command line of the compiler and of the paths that only
+    name where results are written, which do not affect the object itself.
+    """
+    argv = _without_pair(argv[1:], "-o", output)
+    return _without_pair(argv, "-MF", depfile)
+
+
+def compiler_identity(compiler: str) -> str:
+    """Identify a compiler by its resolved path, size and modification time."""
+    path = Path(which(compiler) or compiler).resolve()
+    stat = path.stat()
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _temp_file(destination: Path) -> Path:
+    """
+    Create an empty file next to destination to be renamed over it.
+    Concurrent builds share the cache, so the name is random and created
+    exclusively; unlike mkstemp the file keeps the permissions of the umask.
+    """
+    while True:
+        temp = destination.with_name(f"{destination.name}.{token_hex(8)}.tmp")
+        try:
+            temp.open("xb").close()
+        except FileExistsError:
+            continue
+        return temp
+
+
+def _copy_atomic(source: Path, destination: Path) -> None:
+    temp = _temp_file(destination)
+    copyfile(source, temp)
+    temp.replace(destination)
+
+
+def _write_atomic(data: bytes, destination: Path) -> None:
+    temp = _temp_file(destination)
+    temp.write_bytes(data)
+    temp.replace(destination)
+
+
+def _make_executable(path: Path) -> None:
+    """Add execute permission wherever path is readable, like `chmod +x`."""
+    mode = path.stat().st_mode
+    path.chmod(mode | (mode & 0o444) >> 2)
+
+
+class ObjectCache:
+    """
+    Content-addressed store of compiled objects and linked outputs.
+    Objects are keyed by the preprocessed source, the normalized compile
+    command line and the compiler, so identical compiles from any branch or
+    checkout share one entry. Linked outputs are keyed by the command line
+    and the contents of their inputs.
+    With a remote cache, local misses are looked up remotely and new entries
+    are uploaded, so builds on different machines share their objects and
+    archives.
+    """
+
+    def __init__(self, root: Path, remote: RemoteCache | None = None) -> None:
+        self.root = root
+        self.remote = remote
+        self.hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = Lock()
+        self._compilers: dict[str, str] = {}
+        self._trim_thread: Thread | None = None
+
+    def key(self, job: Job, preprocessed: bytes) -> str:
+        compiler = job.argv[0]
+        if compiler not in self._compilers:
+            self._compilers[compiler] = compiler_identity(compiler)
+
+        digest = sha256(_KEY_VERSION.encode())
+        digest.update(self._compilers[compiler].encode())
+        digest.update(
+            json.dumps(normalize_argv(job.argv, job.output, job.depfile)).encode()
+        )
+        digest.update(preprocessed)
+        return digest.hexdigest()
+
+    def link_key(self, job: Job) -> str:
+        """Key of a link or archive step, from its command line and inputs."""
+        tool = job.argv[0]
+        if tool not in self._compilers:
+            self._compilers[tool] = compiler_identity(tool)
+
+        digest = sha256(_KEY_VERSION.encode())
+        digest.update(self._compilers[tool].encode())
+        digest.update(json.dumps(job.argv[1:]).encode())
+        for path in job.inputs:
+            digest.update(file_hash(path).encode())
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / key[2:]
+
+    def get(self, key: str, output: str, remote: bool = True) -> bool:
+        """
+        Restore the cached object for key to output, if there is one.
+        Without remote, only the local cache is looked up.
+        """
+        entry = self.entry_path(key)
+        try:
+            _copy_atomic(entry, Path(output))
+            # The modification time of an entry records when it was last used.
+            utime(entry)
+        except FileNotFoundError:
+            return remote and self._get_remote(key, output)
+        return True
+
+    def put(self, key: str, output: str, remote: bool = True) -> None:
+        """
+        Store the object at output under key.
+        Without remote, it is not uploaded to the remote cache.
+        """
+        entry = self.entry_path(key)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            _copy_atomic(Path(output), entry)
+        except OSError as e:
+            debug(f"Could not store {output} in the cache: {e}")
+
+        if remote and self.remote is not None:
+            self.remote.put(key, Path(output).read_bytes())
+
+    def _get_remote(self, key: str, output: str) -> bool:
+        if self.remote is None:
+            return False
+
+        data = self.remote.get(key)
+        if data is None:
+            return False
+
+        _write_atomic(data, Path(output))
+        entry = self.entry_path(key)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(data, entry)
+        except OSError as e:
+            debug(f"Could not store {output} in the cache: {e}")
+
+        with self._lock:
+            self.remote_hits += 1
+        return True
+
+    def run(self, job: Job) -> JobResult:
+        """
+        Run a job, restoring its output from the cache when possible.
+        Jobs that are neither compiles nor cacheable link steps just run.
+        """
+        if job.kind in COMPILE_KINDS:
+            return self._run_compile(job)
+        if job.kind in _CACHED_LINK_KINDS:
+            return self._run_link(job)
+        return run_job(job)
+
+    def _run_compile(self, job: Job) -> JobResult:
+        """
+        The preprocessor run that computes the key also writes the job's
+        depfile, so dependency tracking works for cache hits as well.
+        """
+        argv = preprocess_argv(job.argv, job.output)
+        rspfile = str(Path(job.rspfile).with_suffix(".E.rsp")) if job.rspfile else ""
+        preprocessed = run(response_file_argv(argv, rspfile), capture_output=True)
+        if preprocessed.returncode != 0:
+            # Let the real compile report the error.
+            return run_job(job)
+
+        return self._run_cached(job, self.key(job, preprocessed.stdout))
+
+    def _run_link(self, job: Job) -> JobResult:
+        try:
+            key = self.link_key(job)
+        except OSError:
+            # A missing input; let the real command report it.
+            return run_job(job)
+
+        if job.kind == "ar":
+            # ar adds to an existing archive, which would make the stored
+            # archive depend on what was in the build directory before.
+            Path(job.output).unlink(missing_ok=True)
+
+        result = self._run_cached(job, key)
+        if result.cached and job.kind in LINK_KINDS:
+            _make_executable(Path(job.output))
+        return result
+
+    def _run_cached(self, job: Job, key: str) -> JobResult:
+        remote = job.kind not in _LOCAL_KINDS
+        if self.get(key, job.output, remote):
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += Path(job.output).stat().st_size
+            return JobResult(job=job, returncode=0, stderr="", cached=True)
+
+        with self._lock:
+            self.misses += 1
+
+        result = run_job(job)
+        if result.returncode == 0:
+            self.put(key, job.output, remote)
+        return result
+
+    def entries(self) -> list[Path]:
+        objects = self.root / "objects"
+        if not objects.exists():
+            return []
+        return [path for path in objects.glob("*/*") if not path.name.endswith(".tmp")]
+
+    def size(self) -> tuple[int, int]:
+        """Return the number of entries and their total size in bytes."""
+        sizes = [path.stat().st_size for path in self.entries()]
+        return len(sizes), sum(sizes)
+
+    def trim(self, max_size: int) -> tuple[int, int]:
+        """
+        Evict least recently used entries until the cache fits in max_size.
+        Returns the number of evicted entries and the bytes freed.
+        """
+        entries: list[tuple[int, int, Path]] = []
+        for path in self.entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= max_size:
+            return 0, 0
+
+        evicted, freed = 0, 0
+        for _, size, path in sorted(entries):
+            if total <= max_size * _TRIM_RATIO:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+            freed += size
+
+        debug(f"Evicted {evicted} cache entries ({format_size(freed)})")
+        self._update_stats(
+            lambda stats: stats.evictions.append(
+                {"time": int(time()), "entries": evicted, "bytes": freed}
+            )
+        )
+        return evicted, freed
+
+    def start_trim(self, max_size: int) -> None:
+        """Trim the cache on a background thread while the build runs."""
+        self._trim_thread = Thread(target=self.trim, args=(max_size,), daemon=True)
+        self._trim_thread.start()
+
+    def clear(self) -> None:
+        """Remove every entry and all statistics."""
+        if self.root.exists():
+            rmtree(self.root)
+
+    def stats(self) -> CacheStats:
+        path = self.root / "stats.json"
+        try:
+            with path.open("r") as f:
+                return CacheStats(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return CacheStats()
+
+    def close(self) -> None:
+        """Wait for a background trim and add this build's counters to the stats."""
+        if self._trim_thread is not None:
+            self._trim_thread.join()
+            self._trim_thread = None
+
+        def add_counters(stats: CacheStats) -> None:
+            stats.hits += self.hits
+            stats.misses += self.misses
+            stats.bytes_saved += self.bytes_saved
+
+        self._update_stats(add_counters)
+
+    def _update_stats(self, update: Callable[[CacheStats], None]) -> None:
+        """Apply update to the stored statistics, safe across processes."""
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with (self.root / "stats.lock").open("w") as lock:
+                flock(lock, LOCK_EX)
+                stats = self.stats()
+                update(stats)
+                stats.evictions = stats.evictions[-_EVICTION_HISTORY:]
+
+                temp = self.root / f"stats.json.{get_ident()}.tmp"
+                with temp.open("w") as f:
+                    json.dump(asdict(stats), f)
+                temp.replace(self.root / "stats.json")
+        except OSError as e:
+            debug(f"Could not update cache statistics: {e}")
@@ -1,6 +1,18 @@
 from .build import build
+from .cache import cache_clear, cache_serve, cache_stats, cache_trim
 from .clean import clean
+from .generate import generate
 from .init import init
 from .run import run
 
-__all__ = ["build", "clean", "init", "run"]
+__all__ = [
+    "build",
+    "cache_clear",
+    "cache_serve",
+    "cache_stats",
+    "cache_trim",
+    "clean",
+    "generate",
+    "init",
+    "run",
+]
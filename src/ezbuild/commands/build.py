@@ -1,14 +1,19 @@
 import json
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
-from shlex import split
-from subprocess import run
 from typing import TYPE_CHECKING, Annotated
 
-from typer import Argument
+from typer import Argument, Option
 
-from ezbuild import pkg_config
-from ezbuild.compile_command import CompileCommand
-from ezbuild.dep_tree import CyclicDependencyError, DepTree
+from ezbuild import pkg_config, steps
+from ezbuild.archive_mode import ArchiveMode
+from ezbuild.build_log import BuildLog, LogEntry
+from ezbuild.build_state import BuildState, command_hash
+from ezbuild.cache import ObjectCache, configured_max_size, parse_size
+from ezbuild.dep_tree import CyclicDependencyError, DepTree, UnknownTargetError
+from ezbuild.depfile import read_depfile
 from ezbuild.environment import (
     Environment,
     Program,
@@ -16,66 +21,576 @@ from ezbuild.environment import (
     StaticLibrary,
     SystemLibrary,
 )
+from ezbuild.executor import COMPILE_KINDS, LINK_KINDS, Job, JobPool, default_jobs
+from ezbuild.jobserver import jobserver
 from ezbuild.language import Language
-from ezbuild.log import ar, cc, ccld, cxx, cxxld, debug, info, ranlib
+from ezbuild.log import ar, cc, ccld, cxx, cxxld, debug, error, info, ranlib
+from ezbuild.python_environment import PythonEnvironment
+from ezbuild.remote_cache import RemoteCache
 from ezbuild.safe_exec import SafeBuildError, safe_execute
+from ezbuild.stats import BuildStats
+from ezbuild.trace import Trace
 from ezbuild.utils import fs
 
 if TYPE_CHECKING:
-    from ezbuild.dep_tree import Target
-
-
-def _format_define(define: str) -> str:
-    if " " in define:
-        return f'"-D{define}"'
-    return f"-D{define}"
-
+    from collections.abc import Callable
 
-def _collect_public_defines(target: Target, targets: dict[str, Target]) -> list[str]:
+    from ezbuild.compile_command import CompileCommand
+    from ezbuild.dep_tree import Target
+    from ezbuild.executor import JobResult
+
+# Links run in their own pool, since each one can need gigabytes of memory.
+_LINK_POOL = "link"
+# Memory a link is expected to need unless --link-memory says otherwise.
+DEFAULT_LINK_MEMORY = "1G"
+
+# Assumed duration in seconds of a step that no build has logged yet.
+_DEFAULT_DURATION = 1.0
+
+_STEP_LOGGERS: dict[str, Callable[[str], None]] = {
+    "cc": cc,
+    "cxx": cxx,
+    "ccld": ccld,
+    "cxxld": cxxld,
+    "ar": ar,
+    "ranlib": ranlib,
+}
+
+_STEP_FAILURES: dict[str, tuple[int, str]] = {
+    "cc": (6, "Compilation failed"),
+    "cxx": (6, "Compilation failed"),
+    "ccld": (7, "Linking failed"),
+    "cxxld": (7, "Linking failed"),
+    "ar": (8, "Archiving failed"),
+    "ranlib": (9, "Ranlib failed"),
+}
+
+
+# Fraction of the members of an archive that may be replaced or deleted in
+# place before writing the archive from scratch is cheaper.
+_MAX_ARCHIVE_UPDATE = 0.5
+
+
+def _merge_compile_commands(
+    path: Path, compile_commands: list[dict[str, str]]
+) -> list[dict[str, str]]:
     """
-    Collect all public defines from the target's dependencies.
-    Uses BFS to traverse the dependency tree.
+    Add the entries of a previous compile_commands.json for targets that
+    were not part of this build, so building a subset of the targets does
+    not drop the others.
+    """
+    try:
+        with path.open("r") as f:
+            existing = json.load(f)
+    except (OSError, ValueError):
+        return compile_commands
+
+    if not isinstance(existing, list):
+        return compile_commands
+
+    # Every target compiles into its own directory.
+    directories = {command["directory"] for command in compile_commands}
+    kept = [
+        entry
+        for entry in existing
+        if isinstance(entry, dict) and entry.get("directory") not in directories
+    ]
+    return [*kept, *compile_commands]
+
+
+def _failure(result: JobResult) -> tuple[int, str]:
+    exit_code, message = _STEP_FAILURES[result.job.kind]
+    return exit_code, f"{message}: {result.stderr}"
+
+
+@dataclass
+class _TargetBuild:
+    """Progress of a single target through the build."""
+
+    name: str
+    target: Target
+    artifact: Path
+    compile_commands: list[CompileCommand] = field(default_factory=list)
+    pending_compiles: int = 0
+    link_jobs: deque[Job] = field(default_factory=deque)
+    link_command: str = ""
+    rebuilt: bool = False
+    # Whether DepTree reported every dependency as built.
+    dependencies_done: bool = False
+    failed: bool = False
+
+
+class _Builder:
+    """
+    Drives the jobs of every target through the job pool.
+    Compile flags only depend on the build file, so every target starts
+    compiling right away. A target is linked once its objects are compiled
+    and DepTree reports all of its dependencies as built, so only links wait
+    for the artifacts of dependencies.
+    Jobs whose output is up to date according to the build state are skipped.
+    Queued jobs are prioritized by the longest chain of work that waits on
+    them, estimated from the durations in the build log, so the critical path
+    of the build starts as early as possible.
+    The first failing job ends the build, unless keep_going is set: then a
+    target with a failed job is not linked and DepTree cancels its dependents,
+    while everything else is still built and the failures reported at the end.
     """
-    public_defines: list[str] = []
-    visited: set[str] = set()
-    queue: list[str] = [dep for dep in target.dependencies if dep in targets]
-
-    while queue:
-        dep_name = queue.pop(0)
-        if dep_name in visited:
-            continue
-        visited.add(dep_name)
-
-        dep_target = targets[dep_name]
-        public_defines.extend(dep_target.public_defines)
-
-        for trans_dep in dep_target.dependencies:
-            if trans_dep in targets and trans_dep not in visited:
-                queue.append(trans_dep)
-
-    return public_defines
-
-
-def build(
-    name: Annotated[str | None, Argument(help="Name of the project to build")] = None,
-) -> tuple[int, str]:
-    """Build the project."""
 
-    cwd = Path.cwd()
+    def __init__(
+        self,
+        pool: JobPool,
+        dep_tree: DepTree,
+        build_env: Environment,
+        system_libs: dict[str, SystemLibrary],
+        cwd: Path,
+        build_dir: Path,
+        state: BuildState,
+        build_log: BuildLog,
+        trace: Trace,
+        always_make: bool = False,
+        use_hash: bool = False,
+        cache: ObjectCache | None = None,
+        link_memory: int = 0,
+        keep_going: bool = False,
+    ) -> None:
+        self.pool = pool
+        self.dep_tree = dep_tree
+        self.targets = dep_tree.targets
+        self.build_env = build_env
+        self.system_libs = system_libs
+        self.cwd = cwd
+        self.build_dir = build_dir
+        self.state = state
+        self.build_log = build_log
+        self.trace = trace
+        self.always_make = always_make
+        self.use_hash = use_hash
+        self.cache = cache
+        self.link_memory = link_memory
+        self.keep_going = keep_going
+        self.builds: dict[str, _TargetBuild] = {}
+        self.artifacts: dict[str, Path] = {}
+        self.rebuilt: set[str] = set()
+        self.compile_commands: list[CompileCommand] = []
+        self.results: list[JobResult] = []
+        self.failures: list[JobResult] = []
+        self.cancelled: list[str] = []
+        self._typical_durations = {
+            kind: build_log.typical_duration(kind) for kind in _STEP_LOGGERS
+        }
+        self._link_costs: dict[str, float] = {}
+        self._downstream: dict[str, float] = {}
+
+    def run(self) -> tuple[int, str]:
+        self._estimate_critical_paths()
+
+        for name in self.dep_tree.selected():
+            self._start(name)
+
+        while True:
+            # Linking a target whose artifact is up to date finishes it right
+            # away, which can make its dependents ready without any job running.
+            while ready := self.dep_tree.pop_ready():
+                for name in ready:
+                    self._dependencies_done(name)
+
+            if self.pool.idle():
+                return self._report()
+
+            for result in self.pool.wait():
+                self._record(result)
+                if result.returncode != 0 and not self.keep_going:
+                    return _failure(result)
+                if result.returncode != 0:
+                    self._fail(result)
+                else:
+                    self._finish(result.job)
+
+    def _fail(self, result: JobResult) -> None:
+        """Give up on the target of a failed job, but not on its other jobs."""
+        _, message = _failure(result)
+        error(message)
+        self.failures.append(result)
+
+        target_build = self.builds[result.job.target]
+        if not target_build.failed:
+            target_build.failed = True
+            self.cancelled.extend(self.dep_tree.mark_failed(target_build.name))
+
+    def _report(self) -> tuple[int, str]:
+        """Summarize the failures of a keep-going build."""
+        if not self.failures:
+            return 0, ""
+
+        error("Failed steps:")
+        for result in self.failures:
+            message = _STEP_FAILURES[result.job.kind][1]
+            error(f"  {message}: {result.job.label}")
+        if self.cancelled:
+            names = ", ".join(self.targets[name].name for name in self.cancelled)
+            error(f"Not built because a dependency failed: {names}")
+
+        exit_code = _STEP_FAILURES[self.failures[0].job.kind][0]
+        return exit_code, f"{len(self.failures)} of {len(self.results)} steps failed"
+
+    def _estimate(self, output: str, kind: str) -> float:
+        """Expected duration of a step, from its last run or similar steps."""
+        duration = self.build_log.duration(output, kind)
+        if duration is None:
+            duration = self._typical_durations[kind]
+        return _DEFAULT_DURATION if duration is None else duration
+
+    def _estimate_critical_paths(self) -> None:
+        """
+        Compiles do not wait for other targets, so the chain of work waiting
+        on a target is its link followed by the links of its dependents.
+        """
+        for name in self.dep_tree.selected():
+            target = self.targets[name]
+            artifact = steps.artifact_path(
+                target, self.build_dir / "bin", self.build_dir / "lib"
+            )
+            self._link_costs[name] = sum(
+                self._estimate(str(artifact), kind)
+                for kind in steps.link_kinds(target, self.build_env)
+            )
+
+        paths = self.dep_tree.critical_paths(self._link_costs.__getitem__)
+        self._downstream = {
+            name: paths[name] - self._link_costs[name] for name in paths
+        }
+
+    def _record(self, result: JobResult) -> None:
+        """Add a finished job to the trace and, unless cached, the build log."""
+        self.results.append(result)
+        job = result.job
+        self.trace.complete(
+            f"{job.kind.upper()} {Path(job.label).name}",
+            job.kind,
+            result.start,
+            result.end,
+            lane=result.worker,
+            args={
+                "output": job.output,
+                "returncode": result.returncode,
+                "cached": result.cached,
+            },
+        )
+
+        # Restoring an output from the cache did not run the step.
+        if result.cached:
+            return
+
+        self.build_log.record(
+            LogEntry(
+                output=result.job.output,
+                kind=result.job.kind,
+                start=int(result.start * 1000),
+                end=int(result.end * 1000),
+                command=command_hash(result.job.argv),
+                status=result.returncode,
+            )
+        )
+
+    def _submit(self, job: Job) -> None:
+        _STEP_LOGGERS[job.kind](job.label)
+        self.pool.submit(job)
+
+    def _is_up_to_date(self, job: Job, command: str) -> bool:
+        if self.always_make:
+            return False
+
+        if self.state.is_up_to_date(
+            job.output, job.inputs, self.use_hash, command=command
+        ):
+            debug(f"{job.output} is up to date")
+            return True
+
+        return False
+
+    def _start(self, name: str) -> None:
+        target = self.targets[name]
+        info(f"Building {target.name}")
+        steps.ensure_toolchain(self.build_env, target)
+
+        int_dir = self.build_dir / target.name
+        fs.create_dir_if_not_exists(int_dir)
+
+        target_build = _TargetBuild(
+            name=name,
+            target=target,
+            artifact=steps.artifact_path(
+                target, self.build_dir / "bin", self.build_dir / "lib"
+            ),
+        )
+        self.builds[name] = target_build
+
+        compile_flags = steps.compile_flags(target, self.targets, self.system_libs)
+        compile_jobs: list[Job] = []
+        for source in target.sources:
+            compile_job = steps.compile_job(
+                name, target, source, self.cwd, int_dir, self.build_env, compile_flags
+            )
+            if compile_job is None:
+                continue
+
+            compile_command, job = compile_job
+            Path(compile_command.output).parent.mkdir(parents=True, exist_ok=True)
+            target_build.compile_commands.append(compile_command)
+            compile_jobs.append(job)
+
+        self.compile_commands.extend(target_build.compile_commands)
+        for job in compile_jobs:
+            if self._is_up_to_date(job, command_hash(job.argv)):
+                continue
+
+            if self.cache is not None:
+                job.runner = self.cache.run
+
+            job.priority = (
+                self._estimate(job.output, job.kind)
+                + self._link_costs[name]
+                + self._downstream[name]
+            )
+            target_build.pending_compiles += 1
+            target_build.rebuilt = True
+            self._submit(job)
+
+    def _dependencies_done(self, name: str) -> None:
+        target_build = self.builds[name]
+        target_build.dependencies_done = True
+        if target_build.pending_compiles == 0 and not target_build.failed:
+            self._link(target_build)
+
+    def _link(self, target_build: _TargetBuild) -> None:
+        target = target_build.target
+        fs.create_dir_if_not_exists(target_build.artifact.parent)
+
+        dep_libs: list[str] = []
+        for dep in target.dependencies:
+            if dep in self.artifacts:
+                dep_libs.append(str(self.artifacts[dep]))
+
+        link_flags: list[str] = []
+        for sys_dep in target.system_dependencies:
+            link_flags.extend(self.system_libs[sys_dep].link_flags)
+
+        target_build.link_jobs = deque(
+            steps.link_jobs(
+                target_build.name,
+                target,
+                self.build_env,
+                [command.output for command in target_build.compile_commands],
+                dep_libs,
+                link_flags,
+                target_build.artifact,
+                self.build_dir / target.name,
+            )
+        )
+        target_build.link_command = command_hash(
+            *[job.argv for job in target_build.link_jobs]
+        )
+        for job in target_build.link_jobs:
+            job.priority = (
+                self._link_costs[target_build.name]
+                + self._downstream[target_build.name]
+            )
+            if self.cache is not None:
+                job.runner = self.cache.run
+            if job.kind in LINK_KINDS:
+                job.pool = _LINK_POOL
+                job.memory = self.link_memory
+
+        deps_rebuilt = any(dep in self.rebuilt for dep in target.dependencies)
+        if (
+            not target_build.rebuilt
+            and not deps_rebuilt
+            and self._is_up_to_date(
+                target_build.link_jobs[-1], target_build.link_command
+            )
+        ):
+            self._done(target_build)
+            return
+
+        target_build.rebuilt = True
+        if isinstance(target, StaticLibrary):
+            update = self._archive_update(target_build)
+            if update is None:
+                # ar adds to an existing archive, which would keep the objects
+                # of removed sources, and cannot make it thin or back.
+                target_build.artifact.unlink(missing_ok=True)
+            elif not update:
+                # Only a dependency was rebuilt, the archive is unchanged.
+                self._done(target_build)
+                return
+            else:
+                target_build.link_jobs = deque(update)
+            # A failed update leaves the archive half updated, so archive
+            # from scratch next time.
+            self.state.entries.pop(str(target_build.artifact), None)
+        self._submit(target_build.link_jobs.popleft())
+
+    def _archive_update(self, target_build: _TargetBuild) -> list[Job] | None:
+        """
+        Return the jobs which update the existing archive of a static library
+        in place, replacing the objects rebuilt since it was written and
+        deleting the ones of removed sources. Returns None if the archive
+        has to be written from scratch, because there is no usable archive
+        or updating it would replace most of its members anyway.
+        """
+        artifact = str(target_build.artifact)
+        entry = self.state.entries.get(artifact)
+        if self.always_make or entry is None:
+            return None
+        try:
+            archive_mtime = target_build.artifact.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        objects = target_build.link_jobs[0].inputs
+        names = [Path(path).name for path in objects]
+        # ar replaces and deletes members by file name.
+        if len(set(names)) != len(names):
+            return None
+
+        previous: list[str] = entry.get("inputs", [])
+        name, target = target_build.name, target_build.target
+        int_dir = self.build_dir / target.name
+        previous_jobs = steps.link_jobs(
+            name,
+            target,
+            self.build_env,
+            previous,
+            [],
+            [],
+            target_build.artifact,
+            int_dir,
+        )
+        # A different tool or archive mode needs a new archive.
+        if command_hash(*[job.argv for job in previous_jobs]) != entry.get("command"):
+            return None
+
+        members, current = set(previous), set(objects)
+        removed = [path for path in previous if path not in current]
+        changed = []
+        for path in objects:
+            try:
+                if path not in members or Path(path).stat().st_mtime_ns > archive_mtime:
+                    changed.append(path)
+            except FileNotFoundError:
+                return None
+
+        if len(changed) + len(removed) > len(objects) * _MAX_ARCHIVE_UPDATE:
+            return None
+        if not changed and not removed:
+            return []
+
+        mode = self.build_env.archive_mode(target)
+        jobs = steps.link_jobs(
+            name,
+            target,
+            self.build_env,
+            changed,
+            [],
+            [],
+            target_build.artifact,
+            int_dir,
+        )
+        if not changed:
+            # Only ranlib, if any, is needed after deleting.
+            jobs = jobs[1:]
+        if removed:
+            if mode == ArchiveMode.THIN:
+                # Thin archives name their members by path, not file name.
+                flags, names = "-dsP", removed
+            else:
+                flags = "-ds" if mode == ArchiveMode.INDEXED else "-d"
+                names = [Path(path).name for path in removed]
+            jobs.insert(
+                0,
+                Job(
+                    argv=[self.build_env["AR"], flags, artifact, *names],
+                    output=artifact,
+                    target=name,
+                    kind="ar",
+                    label=artifact,
+                    # Not the replace job's, which would rewrite it each time.
+                    rspfile=str(int_dir / f"{target_build.artifact.name}.d.rsp"),
+                ),
+            )
+
+        for job in jobs:
+            # The archive is recorded as built from all of its objects, and
+            # the cache would store it as if it only held the changed ones.
+            job.inputs = objects
+            job.priority = target_build.link_jobs[0].priority
+        return jobs
+
+    def _done(self, target_build: _TargetBuild) -> None:
+        if target_build.rebuilt:
+            self.rebuilt.add(target_build.name)
+
+        self.artifacts[target_build.name] = target_build.artifact
+        self.dep_tree.mark_done(target_build.name)
+
+    def _finish(self, job: Job) -> None:
+        target_build = self.builds[job.target]
+
+        if job.kind in COMPILE_KINDS:
+            deps = [
+                dep for dep in read_depfile(job.depfile) or [] if dep not in job.inputs
+            ]
+            self.state.record(
+                job.output,
+                job.inputs,
+                self.use_hash,
+                deps=deps,
+                command=command_hash(job.argv),
+            )
+            target_build.pending_compiles -= 1
+            if (
+                target_build.pending_compiles == 0
+                and target_build.dependencies_done
+                and not target_build.failed
+            ):
+                self._link(target_build)
+        elif target_build.link_jobs:
+            self._submit(target_build.link_jobs.popleft())
+        else:
+            self.state.record(
+                job.output,
+                job.inputs,
+                self.use_hash,
+                command=target_build.link_command,
+            )
+            self._done(target_build)
+
+
+class BuildFileError(Exception):
+    """build.ezbuild is missing, invalid or does not describe anything to build."""
+
+    def __init__(self, exit_code: int, message: str) -> None:
+        self.exit_code = exit_code
+        super().__init__(message)
+
+
+def load_build_file(cwd: Path) -> tuple[Environment, dict[str, Target]]:
+    """
+    Evaluate cwd/build.ezbuild and return its environment and its targets,
+    keyed by the names of the variables they are assigned to.
+    Raises BuildFileError if there is nothing to build.
+    """
     build_file = cwd / "build.ezbuild"
-    build_dir = cwd / "build"
-    bin_dir = build_dir / "bin"
-    lib_dir = build_dir / "lib"
-    compile_commands: list[CompileCommand] = []
 
     if not build_file.exists():
-        return 1, "build.ezbuild does not exist"
+        raise BuildFileError(1, "build.ezbuild does not exist")
 
     debug("Reading build.ezbuild")
-    with Path.open(cwd / "build.ezbuild", "r") as f:
+    with Path.open(build_file, "r") as f:
         build_ezbuild = f.read()
 
     namespace: dict[str, object] = {
+        "ArchiveMode": ArchiveMode,
         "Environment": Environment,
         "Language": Language,
         "Program": Program,
@@ -86,7 +601,7 @@ def build(
     try:
         result_namespace = safe_execute(build_ezbuild, namespace)
     except SafeBuildError as e:
-        return 2, f"Build file validation failed: {e}"
+        raise BuildFileError(2, f"Build file validation failed: {e}") from e
 
     build_env: Environment | None = None
     targets: dict[str, Target] = {}
@@ -109,387 +624,194 @@ def build(
             targets[var_name] = value
 
     if build_env is None:
-        return 3, "No build environment found"
+        raise BuildFileError(3, "No build environment found")
 
     if len(targets) == 0:
-        return 4, "No targets found"
+        raise BuildFileError(4, "No targets found")
 
-    fs.create_dir_if_not_exists(build_dir)
+    return build_env, targets
 
-    try:
-        dep_tree = DepTree(targets)
-        build_order = dep_tree.get_build_order()
-    except CyclicDependencyError as e:
-        return 5, f"Cyclic dependency error: {e}"
-
-    build_artifacts: dict[str, Path] = {}
 
+def query_system_libraries(
+    targets: list[Target], trace: Trace | None = None
+) -> dict[str, SystemLibrary]:
+    """Look up every system library the targets depend on with pkg-config."""
     system_libs: dict[str, SystemLibrary] = {}
-    for target in build_order:
+    for target in targets:
         for sys_dep in target.system_dependencies:
-            if sys_dep not in system_libs:
+            if sys_dep in system_libs:
+                continue
+            with trace.span(f"pkg-config {sys_dep}") if trace else nullcontext():
                 system_libs[sys_dep] = pkg_config.query_package(sys_dep)
+    return system_libs
 
-    for target in build_order:
-        info(f"Building {target.name}")
-
-        if isinstance(target, Program):
-            debug(f"Building program {target.name}")
-
-            if Language.C in target.languages:
-                build_env.ensure_cc()
-                build_env.ensure_ccld()
-
-            if Language.CXX in target.languages:
-                build_env.ensure_cc()
-                build_env.ensure_cxx()
-                build_env.ensure_ccld()
-                build_env.ensure_cxxld()
-
-            int_dir = build_dir / target.name
-            fs.create_dir_if_not_exists(int_dir)
-
-            local_compile_commands: list[CompileCommand] = []
-            public_defines = _collect_public_defines(target, targets)
-            all_defines = target.defines + target.public_defines + public_defines
-
-            for source in target.sources:
-                source_path = cwd / source
-                _temp = int_dir / source
-                compile_command = CompileCommand()
-                compile_command.directory = str(int_dir)
-                compile_command.file = str(cwd / source)
-                compile_command.output = str(
-                    _temp.parent / ((int_dir / source).name + ".o")
-                )
-
-                if source_path.suffix == ".c":
-                    compile_flags: list[str] = []
-                    for sys_dep in target.system_dependencies:
-                        compile_flags.extend(system_libs[sys_dep].compile_flags)
-
-                    for define in all_defines:
-                        compile_flags.append(_format_define(define))
-
-                    compile_command.command = " ".join(
-                        [
-                            build_env["CC"],
-                            *compile_flags,
-                            "-c",
-                            "-o",
-                            compile_command.output,
-                            compile_command.file,
-                        ]
-                    )
-                    cc(f"{compile_command.file}")
-
-                elif source_path.suffix in [".cpp", ".cxx", ".cc"]:
-                    compile_flags: list[str] = []
-                    for sys_dep in target.system_dependencies:
-                        compile_flags.extend(system_libs[sys_dep].compile_flags)
-
-                    for define in all_defines:
-                        compile_flags.append(_format_define(define))
-
-                    compile_command.command = " ".join(
-                        [
-                            build_env["CXX"],
-                            *compile_flags,
-                            "-c",
-                            "-o",
-                            compile_command.output,
-                            compile_command.file,
-                        ]
-                    )
-                    cxx(f"{compile_command.file}")
-
-                cmd_list = split(compile_command.command)
-                result = run(cmd_list, capture_output=True)
-                if result.returncode != 0:
-                    return 6, f"Compilation failed: {result.stderr.decode()}"
-
-                local_compile_commands.append(compile_command)
-
-            fs.create_dir_if_not_exists(bin_dir)
-
-            dep_libs: list[str] = []
-            for dep in target.dependencies:
-                if dep in build_artifacts:
-                    dep_libs.append(str(build_artifacts[dep]))
-
-            link_flags: list[str] = []
-            for sys_dep in target.system_dependencies:
-                link_flags.extend(system_libs[sys_dep].link_flags)
-
-            if Language.CXX in target.languages:
-                cmd_list = [
-                    build_env["CXXLD"],
-                    "-o",
-                    str(bin_dir / target.name),
-                    *[
-                        local_compile_command.output
-                        for local_compile_command in local_compile_commands
-                    ],
-                    *dep_libs,
-                    *link_flags,
-                ]
-                cxxld(f"{bin_dir / target.name}")
 
-            else:
-                cmd_list = [
-                    build_env["CCLD"],
-                    "-o",
-                    str(bin_dir / target.name),
-                    *[
-                        local_compile_command.output
-                        for local_compile_command in local_compile_commands
-                    ],
-                    *dep_libs,
-                    *link_flags,
-                ]
-                ccld(f"{bin_dir / target.name}")
-
-            result = run(cmd_list, capture_output=True)
-            if result.returncode != 0:
-                return 7, f"Linking failed: {result.stderr.decode()}"
-
-            build_artifacts[target.name] = bin_dir / target.name
-            compile_commands.extend(local_compile_commands)
+def build(
+    names: Annotated[
+        list[str] | None,
+        Argument(help="Targets to build along with their dependencies"),
+    ] = None,
+    jobs: Annotated[
+        int | None,
+        Option("--jobs", "-j", help="Number of jobs to run in parallel"),
+    ] = None,
+    link_jobs: Annotated[
+        int | None,
+        Option("--link-jobs", help="Number of links to run in parallel"),
+    ] = None,
+    link_memory: Annotated[
+        str,
+        Option(
+            "--link-memory",
+            help="Memory a link needs; further links wait until it is available",
+        ),
+    ] = DEFAULT_LINK_MEMORY,
+    load_average: Annotated[
+        float | None,
+        Option(
+            "--load-average",
+            "-l",
+            help="Start no new jobs while the load average is at least this",
+        ),
+    ] = None,
+    keep_going: Annotated[
+        bool,
+        Option(
+            "--keep-going",
+            "-k",
+            help="Keep building what does not depend on a failed step",
+        ),
+    ] = False,
+    always_make: Annotated[
+        bool,
+        Option("--always-make", "-B", help="Rebuild outputs that are up to date"),
+    ] = False,
+    use_hash: Annotated[
+        bool,
+        Option("--hash", help="Compare file contents when timestamps differ"),
+    ] = False,
+    use_cache: Annotated[
+        bool | None,
+        Option("--cache/--no-cache", help="Reuse objects from the local cache"),
+    ] = None,
+    remote_cache: Annotated[
+        str | None,
+        Option("--remote-cache", help="URL of a shared cache to read and upload to"),
+    ] = None,
+    trace_path: Annotated[
+        Path | None,
+        Option("--trace", help="Write a Chrome trace of the build to this file"),
+    ] = None,
+    show_stats: Annotated[
+        bool,
+        Option("--stats", help="Print timings and the slowest steps at the end"),
+    ] = False,
+) -> tuple[int, str]:
+    """Build the project."""
 
-        if isinstance(target, StaticLibrary):
-            debug(f"Building static library {target.name}")
-
-            if Language.C in target.languages:
-                build_env.ensure_cc()
-
-            if Language.CXX in target.languages:
-                build_env.ensure_cc()
-                build_env.ensure_cxx()
-
-            build_env.ensure_ar()
-            build_env.ensure_ranlib()
-
-            int_dir = build_dir / target.name
-            fs.create_dir_if_not_exists(int_dir)
-            local_compile_commands: list[CompileCommand] = []
-            public_defines = _collect_public_defines(target, targets)
-            all_defines = target.defines + target.public_defines + public_defines
-            for source in target.sources:
-                source_path = cwd / source
-                _temp = int_dir / source
-                compile_command = CompileCommand()
-                compile_command.directory = str(int_dir)
-                compile_command.file = str(cwd / source)
-                compile_command.output = str(
-                    _temp.parent / ((int_dir / source).name + ".o")
-                )
-
-                if source_path.suffix == ".c":
-                    compile_flags: list[str] = []
-                    for sys_dep in target.system_dependencies:
-                        compile_flags.extend(system_libs[sys_dep].compile_flags)
-
-                    for define in all_defines:
-                        compile_flags.append(_format_define(define))
-
-                    compile_command.command = " ".join(
-                        [
-                            build_env["CC"],
-                            *compile_flags,
-                            "-c",
-                            "-o",
-                            compile_command.output,
-                            compile_command.file,
-                        ]
-                    )
-                    cc(f"{compile_command.file}")
-
-                elif source_path.suffix in [".cpp", ".cxx", ".cc"]:
-                    compile_flags: list[str] = []
-                    for sys_dep in target.system_dependencies:
-                        compile_flags.extend(system_libs[sys_dep].compile_flags)
-
-                    for define in all_defines:
-                        compile_flags.append(_format_define(define))
-
-                    compile_command.command = " ".join(
-                        [
-                            build_env["CXX"],
-                            *compile_flags,
-                            "-c",
-                            "-o",
-                            compile_command.output,
-                            compile_command.file,
-                        ]
-                    )
-                    cxx(f"{compile_command.file}")
-
-                cmd_list = split(compile_command.command)
-                result = run(cmd_list, capture_output=True)
-                if result.returncode != 0:
-                    return 6, f"Compilation failed: {result.stderr.decode()}"
-
-                local_compile_commands.append(compile_command)
-
-            fs.create_dir_if_not_exists(lib_dir)
-            cmd_list = [
-                build_env["AR"],
-                "-rc",
-                str(lib_dir / f"{target.name}.a"),
-                *[
-                    local_compile_command.output
-                    for local_compile_command in local_compile_commands
-                ],
-            ]
+    stats = BuildStats()
+    cwd = Path.cwd()
+    build_dir = cwd / "build"
+    trace = Trace()
 
-            ar(f"{lib_dir / f'{target.name}.a'}")
-            result = run(cmd_list, capture_output=True)
+    try:
+        link_memory_bytes = parse_size(link_memory)
+    except ValueError as e:
+        return 12, str(e)
 
-            if result.returncode != 0:
-                return 8, f"Archiving failed: {result.stderr.decode()}"
+    try:
+        with trace.span("Evaluate build.ezbuild"):
+            build_env, targets = load_build_file(cwd)
+    except BuildFileError as e:
+        return e.exit_code, str(e)
 
-            cmd_list = [
-                build_env["RANLIB"],
-                str(lib_dir / f"{target.name}.a"),
-            ]
+    fs.create_dir_if_not_exists(build_dir)
 
-            ranlib(f"{lib_dir / f'{target.name}.a'}")
-            result = run(cmd_list, capture_output=True)
-
-            if result.returncode != 0:
-                return 9, f"Ranlib failed: {result.stderr.decode()}"
-
-            build_artifacts[target.name] = lib_dir / f"{target.name}.a"
-            compile_commands.extend(local_compile_commands)
-
-        if isinstance(target, SharedLibrary):
-            debug(f"Building shared library {target.name}")
-
-            if Language.C in target.languages:
-                build_env.ensure_cc()
-                build_env.ensure_ccld()
-
-            if Language.CXX in target.languages:
-                build_env.ensure_cc()
-                build_env.ensure_cxx()
-                build_env.ensure_ccld()
-                build_env.ensure_cxxld()
-
-            int_dir = build_dir / target.name
-            fs.create_dir_if_not_exists(int_dir)
-
-            local_compile_commands: list[CompileCommand] = []
-            public_defines = _collect_public_defines(target, targets)
-            all_defines = target.defines + target.public_defines + public_defines
-            for source in target.sources:
-                source_path = cwd / source
-                _temp = int_dir / source
-                compile_command = CompileCommand()
-                compile_command.directory = str(int_dir)
-                compile_command.file = str(cwd / source)
-                compile_command.output = str(
-                    _temp.parent / ((int_dir / source).name + ".o")
-                )
-
-                if source_path.suffix == ".c":
-                    compile_flags: list[str] = []
-                    for sys_dep in target.system_dependencies:
-                        compile_flags.extend(system_libs[sys_dep].compile_flags)
-
-                    for define in all_defines:
-                        compile_flags.append(_format_define(define))
-
-                    compile_command.command = " ".join(
-                        [
-                            build_env["CC"],
-                            *compile_flags,
-                            "-fPIC",
-                            "-c",
-                            "-o",
-                            compile_command.output,
-                            compile_command.file,
-                        ]
-                    )
-                    cc(f"{compile_command.file}")
-                elif source_path.suffix in [".cpp", ".cxx", ".cc"]:
-                    compile_flags: list[str] = []
-                    for sys_dep in target.system_dependencies:
-                        compile_flags.extend(system_libs[sys_dep].compile_flags)
-
-                    for define in all_defines:
-                        compile_flags.append(_format_define(define))
-
-                    compile_command.command = " ".join(
-                        [
-                            build_env["CXX"],
-                            *compile_flags,
-                            "-fPIC",
-                            "-c",
-                            "-o",
-                            compile_command.output,
-                            compile_command.file,
-                        ]
-                    )
-                    cxx(f"{compile_command.file}")
-
-                cmd_list = split(compile_command.command)
-                result = run(cmd_list, capture_output=True)
-                if result.returncode != 0:
-                    return 6, f"Compilation failed: {result.stderr.decode()}"
-
-                local_compile_commands.append(compile_command)
-
-            fs.create_dir_if_not_exists(lib_dir)
-
-            dep_libs: list[str] = []
-            for dep in target.dependencies:
-                if dep in build_artifacts:
-                    dep_libs.append(str(build_artifacts[dep]))
-
-            link_flags: list[str] = []
-            for sys_dep in target.system_dependencies:
-                link_flags.extend(system_libs[sys_dep].link_flags)
-
-            if Language.CXX in target.languages:
-                cmd_list = [
-                    build_env["CXXLD"],
-                    "-shared",
-                    "-o",
-                    str(lib_dir / f"{target.name}.so"),
-                    *[
-                        local_compile_command.output
-                        for local_compile_command in local_compile_commands
-                    ],
-                    *dep_libs,
-                    *link_flags,
-                ]
-                cxxld(f"{lib_dir / f'{target.name}.so'}")
-            else:
-                cmd_list = [
-                    build_env["CCLD"],
-                    "-shared",
-                    "-o",
-                    str(lib_dir / f"{target.name}.so"),
-                    *[
-                        local_compile_command.output
-                        for local_compile_command in local_compile_commands
-                    ],
-                    *dep_libs,
-                    *link_flags,
-                ]
-                ccld(f"{lib_dir / f'{target.name}.so'}")
-
-            result = run(cmd_list, capture_output=True)
-
-            if result.returncode != 0:
-                return 7, f"Linking failed: {result.stderr.decode()}"
-
-            build_artifacts[target.name] = lib_dir / f"{target.name}.so"
-            compile_commands.extend(local_compile_commands)
+    try:
+        with trace.span("Sort targets"):
+            dep_tree = DepTree(targets)
+            dep_tree.start(names)
+    except CyclicDependencyError as e:
+        return 5, f"Cyclic dependency error: {e}"
+    except UnknownTargetError as e:
+        return 10, str(e)
+
+    system_libs = query_system_libraries(
+        [targets[selected] for selected in dep_tree.selected()], trace
+    )
+
+    state = BuildState.load(build_dir)
+    build_log = BuildLog.load(build_dir)
+
+    if remote_cache is None:
+        remote_cache = PythonEnvironment.remote_cache()
+    if use_cache is None:
+        use_cache = PythonEnvironment.cache() or bool(remote_cache)
+
+    cache: ObjectCache | None = None
+    if use_cache:
+        remote = RemoteCache(remote_cache) if remote_cache else None
+        cache = ObjectCache(PythonEnvironment.cache_dir(), remote=remote)
+        cache.start_trim(configured_max_size())
+
+    jobs = jobs or default_jobs()
+    pools = {_LINK_POOL: link_jobs or max(1, jobs // 2)}
+    with (
+        jobserver(jobs) as tokens,
+        JobPool(jobs, pools, load_average, tokens) as pool,
+    ):
+        builder = _Builder(
+            pool,
+            dep_tree,
+            build_env,
+            system_libs,
+            cwd,
+            build_dir,
+            state,
+            build_log,
+            trace,
+            always_make=always_make,
+            use_hash=use_hash,
+            cache=cache,
+            link_memory=link_memory_bytes,
+            keep_going=keep_going,
+        )
+        try:
+            exit_code, message = builder.run()
+        finally:
+            state.save()
+            build_log.save()
+            if cache is not None:
+                cache.close()
+            if trace_path is not None:
+                trace.save(trace_path)
+                info(f"Wrote trace to {trace_path}")
+
+        if cache is not None and cache.remote is not None:
+            info(
+                f"Cache: {cache.hits} hits ({cache.remote_hits} remote), "
+                f"{cache.misses} misses"
+            )
+        elif cache is not None:
+            info(f"Cache: {cache.hits} hits, {cache.misses} misses")
+
+        if show_stats:
+            for line in stats.summary(builder.results):
+                info(line)
+
+        if exit_code != 0:
+            return exit_code, message
 
     debug("Writing compile_commands.json")
 
-    with Path.open(build_dir / "compile_commands.json", "w") as f:
+    compile_commands_path = build_dir / "compile_commands.json"
+    compile_commands = [command.entry() for command in builder.compile_commands]
+    if names:
+        compile_commands = _merge_compile_commands(
+            compile_commands_path, compile_commands
+        )
+
+    with Path.open(compile_commands_path, "w") as f:
         f.write(json.dumps(compile_commands, indent=2))
         info("Wrote compile_commands.json")
 
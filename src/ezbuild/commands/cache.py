@@ -0,0 +1,102 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated
+
+from typer import Option
+
+from ezbuild.cache import ObjectCache, configured_max_size, format_size, parse_size
+from ezbuild.log import info
+from ezbuild.python_environment import PythonEnvironment
+from ezbuild.remote_cache import CacheServer
+
+
+def cache_stats() -> tuple[int, str]:
+    """Show object cache statistics."""
+    cache = ObjectCache(PythonEnvironment.cache_dir())
+    entries, size = cache.size()
+    stats = cache.stats()
+
+    info(f"Cache directory: {cache.root}")
+    info(
+        f"Entries: {entries} "
+        f"({format_size(size)} of {format_size(configured_max_size())})"
+    )
+    info(f"Hits: {stats.hits}, misses: {stats.misses} (hit rate {stats.hit_rate:.1%})")
+    info(f"Bytes saved: {format_size(stats.bytes_saved)}")
+
+    if not stats.evictions:
+        info("No evictions")
+        return 0, ""
+
+    info("Evictions:")
+    for eviction in stats.evictions:
+        when = datetime.fromtimestamp(eviction["time"]).strftime("%Y-%m-%d %H:%M:%S")
+        info(
+            f"  {when}: {eviction['entries']} entries, {format_size(eviction['bytes'])}"
+        )
+
+    return 0, ""
+
+
+def cache_trim(
+    max_size: Annotated[
+        str | None,
+        Option("--max-size", help="Size to trim the cache to, e.g. 512M or 5G"),
+    ] = None,
+) -> tuple[int, str]:
+    """Evict least recently used objects until the cache fits its size limit."""
+    try:
+        limit = parse_size(max_size) if max_size else configured_max_size()
+    except ValueError as e:
+        return 1, str(e)
+
+    cache = ObjectCache(PythonEnvironment.cache_dir())
+    evicted, freed = cache.trim(limit)
+    info(f"Evicted {evicted} entries ({format_size(freed)})")
+    return 0, ""
+
+
+def cache_clear() -> None:
+    """Remove every object from the cache."""
+    cache = ObjectCache(PythonEnvironment.cache_dir())
+    if not cache.root.exists():
+        info("Cache is already empty")
+        return
+
+    info(f"Clearing {cache.root}")
+    cache.clear()
+    info("Cleared cache")
+
+
+def cache_serve(
+    host: Annotated[str, Option("--host", help="Address to listen on")] = "127.0.0.1",
+    port: Annotated[int, Option("--port", help="Port to listen on")] = 8765,
+    directory: Annotated[
+        str | None,
+        Option(
+            "--dir", help="Directory to store entries in, by default <cache dir>-server"
+        ),
+    ] = None,
+) -> tuple[int, str]:
+    """Serve a shared cache for --remote-cache over HTTP."""
+    if directory:
+        root = Path(directory)
+    else:
+        # Next to the local cache rather than inside it, so that
+        # `ezbuild cache clear` leaves the shared entries alone.
+        cache_dir = PythonEnvironment.cache_dir()
+        root = cache_dir.with_name(f"{cache_dir.name}-server")
+
+    try:
+        server = CacheServer((host, port), root)
+    except OSError as e:
+        return 1, f"Could not listen on {host}:{port}: {e}"
+
+    info(f"Serving {root} on http://{host}:{server.server_port}")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            info("Stopped cache server")
+
+    return 0, ""
@@ -0,0 +1,234 @@
+import json
+import sys
+from pathlib import Path
+from shlex import join, quote
+from typing import TYPE_CHECKING, Annotated
+
+from typer import Option
+
+from ezbuild import steps
+from ezbuild.archive_mode import ArchiveMode
+from ezbuild.commands.build import (
+    BuildFileError,
+    load_build_file,
+    query_system_libraries,
+)
+from ezbuild.dep_tree import CyclicDependencyError, DepTree
+from ezbuild.environment import SharedLibrary, StaticLibrary
+from ezbuild.executor import COMPILE_KINDS, LINK_KINDS, default_jobs
+from ezbuild.language import Language
+from ezbuild.log import debug, info
+from ezbuild.ninja import NinjaWriter, escape
+from ezbuild.utils import fs
+
+if TYPE_CHECKING:
+    from ezbuild.compile_command import CompileCommand
+    from ezbuild.dep_tree import Target
+    from ezbuild.environment import Environment, SystemLibrary
+
+NINJA_FILE = "build.ninja"
+
+# Tools as they are named in the environment and in build.ninja.
+_TOOLS = {
+    "CC": "cc",
+    "CXX": "cxx",
+    "CCLD": "ccld",
+    "CXXLD": "cxxld",
+    "AR": "ar",
+    "RANLIB": "ranlib",
+}
+
+
+def _write_rules(writer: NinjaWriter, link_jobs: int) -> None:
+    writer.pool("link_pool", link_jobs)
+    writer.newline()
+
+    for kind in COMPILE_KINDS:
+        writer.rule(
+            kind,
+            f"${kind} $cflags -MMD -MF $depfile -c -o $out $in",
+            depfile="$depfile",
+            deps="gcc",
+            description=f"{kind.upper()} $in",
+        )
+        writer.newline()
+
+    for kind in LINK_KINDS:
+        writer.rule(
+            kind,
+            f"${kind} $ldshared -o $out $in $ldflags",
+            pool="link_pool",
+            description=f"{kind.upper()} $out",
+        )
+        writer.newline()
+
+    # ar adds to an existing archive, so start from scratch like a clean build.
+    writer.rule(
+        "ar",
+        "rm -f $out && $ar -rc $out $in && $ranlib $out",
+        description="AR $out",
+    )
+    writer.newline()
+
+    # Archives which ar indexes itself, $arflags depends on the archive mode.
+    writer.rule(
+        "ar_indexed",
+        "rm -f $out && $ar $arflags $out $in",
+        description="AR $out",
+    )
+    writer.newline()
+
+    writer.rule(
+        "regenerate",
+        "$regenerate",
+        generator=1,
+        description="Regenerating $out",
+    )
+    writer.newline()
+
+
+def _write_target(
+    writer: NinjaWriter,
+    name: str,
+    targets: dict[str, Target],
+    build_env: Environment,
+    system_libs: dict[str, SystemLibrary],
+    cwd: Path,
+    build_dir: Path,
+) -> tuple[str, list[CompileCommand]]:
+    """Write the build statements of a target and return its artifact."""
+    target = targets[name]
+    int_dir = build_dir / target.name
+    compile_flags = steps.compile_flags(target, targets, system_libs)
+    cflags = escape(join(compile_flags))
+
+    writer.comment(f"{name}: {target.name}")
+
+    compile_commands: list[CompileCommand] = []
+    for source in target.sources:
+        compile_job = steps.compile_job(
+            name, target, source, cwd, int_dir, build_env, compile_flags
+        )
+        if compile_job is None:
+            continue
+
+        compile_command, job = compile_job
+        compile_commands.append(compile_command)
+        writer.build(
+            [job.output],
+            job.kind,
+            [compile_command.file],
+            variables={"cflags": cflags, "depfile": escape(job.depfile)},
+        )
+
+    objects = [command.output for command in compile_commands]
+    artifact = str(steps.artifact_path(target, build_dir / "bin", build_dir / "lib"))
+
+    if isinstance(target, StaticLibrary):
+        mode = build_env.archive_mode(target)
+        if mode == ArchiveMode.RANLIB:
+            writer.build([artifact], "ar", objects)
+        else:
+            writer.build(
+                [artifact],
+                "ar_indexed",
+                objects,
+                variables={"arflags": steps.AR_FLAGS[mode]},
+            )
+    else:
+        dep_libs = [
+            str(steps.artifact_path(targets[dep], build_dir / "bin", build_dir / "lib"))
+            for dep in target.dependencies
+        ]
+        link_flags: list[str] = []
+        for sys_dep in target.system_dependencies:
+            link_flags.extend(system_libs[sys_dep].link_flags)
+
+        kind = "cxxld" if Language.CXX in target.languages else "ccld"
+        variables = {"ldflags": escape(join(link_flags))}
+        if isinstance(target, SharedLibrary):
+            variables["ldshared"] = "-shared"
+        writer.build([artifact], kind, [*objects, *dep_libs], variables=variables)
+
+    for alias in dict.fromkeys([name, target.name]):
+        writer.build([alias], "phony", [artifact])
+    writer.newline()
+
+    return artifact, compile_commands
+
+
+def generate(
+    ninja: Annotated[
+        bool, Option("--ninja", help="Generate build/build.ninja for ninja")
+    ] = False,
+    link_jobs: Annotated[
+        int | None,
+        Option("--link-jobs", min=1, help="Number of links ninja runs in parallel"),
+    ] = None,
+) -> tuple[int, str]:
+    """Generate build files for another build tool."""
+    if not ninja:
+        return 11, "No generator selected, use --ninja"
+
+    cwd = Path.cwd()
+    build_dir = cwd / "build"
+
+    try:
+        build_env, targets = load_build_file(cwd)
+    except BuildFileError as e:
+        return e.exit_code, str(e)
+
+    try:
+        order = DepTree(targets).topological_sort()
+    except CyclicDependencyError as e:
+        return 5, f"Cyclic dependency error: {e}"
+
+    for target in targets.values():
+        steps.ensure_toolchain(build_env, target)
+    system_libs = query_system_libraries(list(targets.values()))
+
+    fs.create_dir_if_not_exists(build_dir)
+    ninja_file = build_dir / NINJA_FILE
+
+    writer = NinjaWriter()
+    writer.comment("Generated by ezbuild from build.ezbuild, do not edit.")
+    writer.variable("ninja_required_version", "1.3")
+    writer.variable("builddir", escape(str(build_dir)))
+    writer.newline()
+
+    for key, variable in _TOOLS.items():
+        if build_env[key]:
+            writer.variable(variable, escape(quote(build_env[key])))
+    regenerate = [sys.executable, "-m", "ezbuild", "generate", "--ninja"]
+    if link_jobs:
+        regenerate.extend(["--link-jobs", str(link_jobs)])
+    writer.variable("regenerate", escape(f"cd {quote(str(cwd))} && {join(regenerate)}"))
+    writer.newline()
+
+    _write_rules(writer, link_jobs or max(1, default_jobs() // 2))
+
+    artifacts: list[str] = []
+    compile_commands: list[CompileCommand] = []
+    for name in order:
+        artifact, target_commands = _write_target(
+            writer, name, targets, build_env, system_libs, cwd, build_dir
+        )
+        artifacts.append(artifact)
+        compile_commands.extend(target_commands)
+
+    # ninja only notices that its manifest is out of date when the output
+    # matches the manifest path it was given, i.e. `ninja -C build`.
+    writer.build([NINJA_FILE], "regenerate", implicit=[str(cwd / "build.ezbuild")])
+    writer.newline()
+    writer.default(artifacts)
+
+    debug(f"Writing {ninja_file}")
+    with Path.open(ninja_file, "w") as f:
+        f.write(writer.text())
+    info(f"Wrote {ninja_file}, build with `ninja -C {build_dir}`")
+
+    with Path.open(build_dir / "compile_commands.json", "w") as f:
+        f.write(json.dumps([command.entry() for command in compile_commands], indent=2))
+        info("Wrote compile_commands.json")
+
+    return 0, ""
@@ -18,7 +18,7 @@ def run(
     bin_dir = build_dir / "bin"
 
     if not (bin_dir / name).exists():
-        exit_code, msg = build(name=name)
+        exit_code, msg = build(names=[name])
         if exit_code != 0:
             return 1, f"Failed to build project {name}: {msg}"
 
@@ -1,12 +1,26 @@
-class CompileCommand(dict[str, str]):
+from shlex import join, split
+from typing import Any
+
+
+class CompileCommand(dict[str, Any]):
+    """
+    A compile step, with its command line kept as an argv list in arguments.
+    The shell string in command is only rendered for compile_commands.json.
+    """
+
     def __init__(
         self,
         directory: str = "",
-        command: str = "",
+        arguments: list[str] | None = None,
         file: str = "",
         output: str = "",
     ) -> None:
-        super().__init__(directory=directory, command=command, file=file, output=output)
+        super().__init__(
+            directory=directory,
+            arguments=arguments or [],
+            file=file,
+            output=output,
+        )
 
     @property
     def directory(self) -> str:
@@ -16,13 +30,21 @@ class CompileCommand(dict[str, str]):
     def directory(self, value: str) -> None:
         self["directory"] = value
 
+    @property
+    def arguments(self) -> list[str]:
+        return self["arguments"]
+
+    @arguments.setter
+    def arguments(self, value: list[str]) -> None:
+        self["arguments"] = value
+
     @property
     def command(self) -> str:
-        return self["command"]
+        return join(self.arguments)
 
     @command.setter
     def command(self, value: str) -> None:
-        self["command"] = value
+        self.arguments = split(value)
 
     @property
     def file(self) -> str:
@@ -39,3 +61,12 @@ class CompileCommand(dict[str, str]):
     @output.setter
     def output(self, value: str) -> None:
         self["output"] = value
+
+    def entry(self) -> dict[str, str]:
+        """Return the compile_commands.json entry of this command."""
+        return {
+            "directory": self.directory,
+            "command": self.command,
+            "file": self.file,
+            "output": self.output,
+        }
@@ -2,6 +2,8 @@ from collections import deque
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from ezbuild.environment import Program, SharedLibrary, StaticLibrary
 
 type Target = Program | StaticLibrary | SharedLibrary
@@ -22,11 +24,22 @@ class MissingDependencyError(Exception):
         )
 
 
+class UnknownTargetError(Exception):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        super().__init__(f"Target '{name}' does not exist")
+
+
 class DepTree:
     def __init__(self, targets: dict[str, Target]) -> None:
         self.targets = targets
         self.graph: dict[str, list[str]] = {}
         self.in_degree: dict[str, int] = {}
+        self._order: list[str] = []
+        self._remaining: dict[str, int] = {}
+        self._ready: deque[str] = deque()
+        self._done: set[str] = set()
+        self._cancelled: set[str] = set()
 
     def build_graph(self) -> None:
         """Build adjacency list and in-degree count from targets."""
@@ -129,3 +142,125 @@ class DepTree:
         """
         order = self.topological_sort()
         return [self.targets[name] for name in order]
+
+    def find(self, name: str) -> str:
+        """
+        Return the key of a target given either its key or its name.
+        Raises UnknownTargetError if there is no such target.
+        """
+        if name in self.targets:
+            return name
+
+        for key, target in self.targets.items():
+            if target.name == name:
+                return key
+
+        raise UnknownTargetError(name)
+
+    def closure(self, names: list[str]) -> set[str]:
+        """
+        Return the keys of the named targets and of everything they
+        transitively depend on.
+        Raises UnknownTargetError if a name does not match any target.
+        """
+        result: set[str] = set()
+        stack = [self.find(name) for name in names]
+
+        while stack:
+            current = stack.pop()
+            if current in result:
+                continue
+            result.add(current)
+            stack.extend(self.targets[current].dependencies)
+
+        return result
+
+    def start(self, names: list[str] | None = None) -> None:
+        """
+        Prepare the graph for wavefront traversal.
+        Targets are handed out by pop_ready() once all of their dependencies
+        have been reported to mark_done().
+        With names only the named targets and their dependencies are handed
+        out; otherwise every target is.
+        Raises CyclicDependencyError if a cycle is detected and
+        UnknownTargetError if a name does not match any target.
+        """
+        order = self.topological_sort()
+
+        selected = self.closure(names) if names else set(self.targets)
+        self._order = [name for name in order if name in selected]
+        self._remaining = {name: 0 for name in self.targets if name in selected}
+        for name in self._remaining:
+            for neighbor in self.graph[name]:
+                if neighbor in self._remaining:
+                    self._remaining[neighbor] += 1
+
+        self._ready = deque(
+            name for name, degree in self._remaining.items() if degree == 0
+        )
+        self._done = set()
+        self._cancelled = set()
+
+    def pop_ready(self) -> list[str]:
+        """Return the targets that became ready since the last call."""
+        ready = list(self._ready)
+        self._ready.clear()
+        return ready
+
+    def mark_done(self, name: str) -> list[str]:
+        """
+        Mark a target as built and release the dependents waiting on it.
+        Returns the dependents whose dependencies are now all built.
+        """
+        if name in self._done:
+            return []
+        self._done.add(name)
+
+        released: list[str] = []
+        for neighbor in self.graph[name]:
+            if neighbor not in self._remaining:
+                continue
+            self._remaining[neighbor] -= 1
+            if self._remaining[neighbor] == 0:
+                released.append(neighbor)
+
+        self._ready.extend(released)
+        return released
+
+    def mark_failed(self, name: str) -> list[str]:
+        """
+        Mark a target as failed, which cancels the selected targets depending
+        on it directly or indirectly: they never become ready.
+        Returns the targets cancelled by this call in build order.
+        """
+        cancelled: set[str] = set()
+        pending = [name]
+        while pending:
+            for neighbor in self.graph[pending.pop()]:
+                if neighbor in self._remaining and neighbor not in self._cancelled:
+                    self._cancelled.add(neighbor)
+                    cancelled.add(neighbor)
+                    pending.append(neighbor)
+
+        return [target for target in self._order if target in cancelled]
+
+    def critical_paths(self, cost: Callable[[str], float]) -> dict[str, float]:
+        """
+        Return the length of the longest chain of selected targets starting
+        at every selected target and continuing through its dependents,
+        where cost gives the length of a single target.
+        Must be called after start().
+        """
+        paths: dict[str, float] = {}
+        for name in reversed(self._order):
+            downstream = [paths[d] for d in self.graph[name] if d in paths]
+            paths[name] = cost(name) + max(downstream, default=0.0)
+        return paths
+
+    def selected(self) -> list[str]:
+        """Return the keys of the targets handed out by the current traversal."""
+        return list(self._remaining)
+
+    def is_complete(self) -> bool:
+        """Check whether every selected target has been marked as done."""
+        return len(self._done) == len(self._remaining)
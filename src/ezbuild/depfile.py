@@ -0,0 +1,76 @@
+from pathlib import Path
+
+
+def parse_depfile(content: str) -> list[str]:
+    """
+    Parse a Makefile-style dependency file as written by `cc -MMD -MF`.
+    Returns the prerequisites of all rules in order, without duplicates.
+    """
+    # Join continuation lines first so every rule is on a single line.
+    content = content.replace("\\\r\n", " ").replace("\\\n", " ")
+
+    deps: list[str] = []
+    seen: set[str] = set()
+
+    for line in content.splitlines():
+        words = _split_words(line)
+        if ":" not in words:
+            continue
+
+        for word in words[words.index(":") + 1 :]:
+            if word not in seen:
+                seen.add(word)
+                deps.append(word)
+
+    return deps
+
+
+def _split_words(line: str) -> list[str]:
+    """
+    Split a depfile line into words, with ":" as a word of its own.
+    Handles the escapes GCC and Clang emit: "\\ " for spaces, "\\#" and "$$".
+    """
+    words: list[str] = []
+    word: list[str] = []
+    i = 0
+
+    def flush() -> None:
+        if word:
+            words.append("".join(word))
+            word.clear()
+
+    while i < len(line):
+        char = line[i]
+        next_char = line[i + 1] if i + 1 < len(line) else ""
+
+        if char == "\\" and next_char in (" ", "#"):
+            word.append(next_char)
+            i += 2
+            continue
+
+        if char == "$" and next_char == "$":
+            word.append("$")
+            i += 2
+            continue
+
+        if char in (" ", "\t"):
+            flush()
+        elif char == ":" and next_char in (" ", "\t", ""):
+            flush()
+            words.append(":")
+        else:
+            word.append(char)
+
+        i += 1
+
+    flush()
+    return words
+
+
+def read_depfile(path: str) -> list[str] | None:
+    """Read and parse a dependency file. Returns None if it does not exist."""
+    try:
+        with Path(path).open("r") as f:
+            return parse_depfile(f.read())
+    except FileNotFoundError:
+        return None
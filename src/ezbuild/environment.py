@@ -6,6 +6,7 @@ from typing import TYPE_CHECKING, Any
 from typer import Exit
 
 from ezbuild import pkg_config
+from ezbuild.archive_mode import ArchiveMode
 from ezbuild.log import debug, error
 
 if TYPE_CHECKING:
@@ -49,6 +50,8 @@ class StaticLibrary:
     system_dependencies: list[str] = field(default_factory=list)
     defines: list[str] = field(default_factory=list)
     public_defines: list[str] = field(default_factory=list)
+    # None uses the ARCHIVE_MODE of the environment.
+    archive_mode: ArchiveMode | None = None
 
 
 @dataclass
@@ -113,6 +116,7 @@ class Environment:
         system_dependencies: None | list[str] = None,
         defines: None | list[str] = None,
         public_defines: None | list[str] = None,
+        archive_mode: None | ArchiveMode = None,
     ) -> StaticLibrary:
         defines_list = defines or []
         _validate_defines(defines_list)
@@ -126,6 +130,7 @@ class Environment:
             system_dependencies=system_dependencies or [],
             defines=defines_list,
             public_defines=public_defines_list,
+            archive_mode=archive_mode,
         )
         self.static_libraries.append(static_library)
         return static_library
@@ -250,6 +255,15 @@ class Environment:
         else:
             debug("RANLIB is set")
 
+    def archive_mode(self, library: StaticLibrary) -> ArchiveMode:
+        """Return the archive mode of the library, ARCHIVE_MODE if it has none."""
+        mode = library.archive_mode or self["ARCHIVE_MODE"] or ArchiveMode.RANLIB
+        try:
+            return ArchiveMode(mode)
+        except ValueError:
+            error(f"Unknown archive mode '{mode}'")
+            raise Exit from None
+
     def ensure_pkg_config(self) -> None:
         if platform not in ["linux", "darwin"]:
             error("pkg-config is only supported on Unix systems")
@@ -0,0 +1,304 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from heapq import heappop, heappush
+from itertools import count
+from math import floor
+from os import getloadavg, process_cpu_count
+from pathlib import Path
+from shlex import quote
+from subprocess import run
+from threading import Lock, local
+from time import time
+from typing import TYPE_CHECKING, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from ezbuild.jobserver import Jobserver
+
+
+# Command lines longer than this many bytes are passed in a response file.
+# Linux allows at most ARG_MAX (usually 2 MiB) for the command line and the
+# environment together, and copying long command lines slows down spawning.
+RESPONSE_FILE_THRESHOLD = 32 * 1024
+
+# Seconds between attempts to take a jobserver token while jobs are running.
+JOBSERVER_POLL = 0.05
+
+# Mount point of the cgroup v2 hierarchy, and the cgroups of this process.
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+PROC_CGROUP = Path("/proc/self/cgroup")
+
+
+def cgroup_cpu_limit() -> int | None:
+    """
+    Number of CPUs the cgroup v2 cpu.max quotas of this process and of its
+    parent cgroups allow, rounded down but at least 1. None if unlimited.
+    """
+    try:
+        lines = PROC_CGROUP.read_text().splitlines()
+    except OSError:
+        return None
+
+    # With cgroup v2 the only line is "0::/path/of/the/cgroup".
+    path = next((line[3:] for line in lines if line.startswith("0::")), None)
+    if path is None:
+        return None
+
+    limit = None
+    cgroup = CGROUP_ROOT / path.lstrip("/")
+    for directory in [cgroup, *cgroup.parents]:
+        if not directory.is_relative_to(CGROUP_ROOT):
+            break
+        try:
+            quota, period = (directory / "cpu.max").read_text().split()
+            if quota == "max":
+                continue
+            cpus = max(1, floor(int(quota) / int(period)))
+        except (OSError, ValueError, ZeroDivisionError):
+            continue
+        limit = cpus if limit is None else min(limit, cpus)
+    return limit
+
+
+def default_jobs() -> int:
+    """
+    Number of jobs to run in parallel when none is requested: the CPUs this
+    process may run on, limited by the CPU quota of its cgroup.
+    """
+    jobs = process_cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return jobs if limit is None else min(jobs, limit)
+
+
+def available_memory() -> int | None:
+    """Bytes of memory available to new processes, None if unknown."""
+    try:
+        with Path("/proc/meminfo").open() as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+# Kinds of the jobs which compile a source and which link a program or a
+# shared library, out of all kinds of Job.
+COMPILE_KINDS = ["cc", "cxx"]
+LINK_KINDS = ["ccld", "cxxld"]
+
+
+@dataclass
+class Job:
+    """A single subprocess invocation produced by the build, e.g. one compile."""
+
+    argv: list[str]
+    output: str
+    target: str = ""
+    kind: str = ""
+    label: str = ""
+    inputs: list[str] = field(default_factory=list)
+    depfile: str = ""
+    # Where to write the arguments if the command line is too long.
+    rspfile: str = ""
+    runner: Callable[[Job], JobResult] | None = None
+    # Queued jobs with a higher priority are started first.
+    priority: float = 0.0
+    # Name of the JobPool pool which limits how many such jobs run at once.
+    pool: str = ""
+    # Bytes of memory the job is expected to need at its peak.
+    memory: int = 0
+
+
+@dataclass
+class JobResult:
+    job: Job
+    returncode: int
+    stderr: str
+    cached: bool = False
+    # Wall clock times in seconds since the epoch and the number of the
+    # worker which ran the job, counted from 1, set by JobPool.
+    start: float = 0.0
+    end: float = 0.0
+    worker: int = 0
+
+
+def response_file_argv(argv: list[str], rspfile: str) -> list[str]:
+    """
+    Return argv, or if it is longer than RESPONSE_FILE_THRESHOLD, a command
+    line which reads its arguments from `@rspfile` like gcc, clang and ar do.
+    The response file is only rewritten when its contents change.
+    """
+    if not rspfile or sum(len(arg) + 1 for arg in argv) <= RESPONSE_FILE_THRESHOLD:
+        return argv
+
+    contents = "\n".join(quote(arg) for arg in argv[1:]) + "\n"
+    path = Path(rspfile)
+    try:
+        unchanged = path.read_text() == contents
+    except OSError:
+        unchanged = False
+
+    if not unchanged:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(contents)
+    return [argv[0], f"@{rspfile}"]
+
+
+def run_job(job: Job) -> JobResult:
+    """Run the job's command line and capture its result."""
+    # Descriptors are only inheritable when meant for children, like the
+    # pipe of the jobserver, so they are kept open.
+    result = run(
+        response_file_argv(job.argv, job.rspfile), capture_output=True, close_fds=False
+    )
+    return JobResult(
+        job=job, returncode=result.returncode, stderr=result.stderr.decode()
+    )
+
+
+class JobPool:
+    """
+    Runs jobs on a fixed number of worker threads.
+    Submitted jobs are queued and started by wait() whenever a worker is free,
+    highest priority first and in submission order among equal priorities.
+    Jobs in a named pool additionally wait while the pool's depth is reached,
+    and jobs which need memory wait while less than that is available and
+    another such job is running, so that at least one of them always runs.
+    With max_load, like make -l, no further job starts while one is running
+    and the 1-minute load average is at least max_load.
+    With a jobserver, every job beyond the first needs one of its tokens.
+    """
+
+    def __init__(
+        self,
+        jobs: int,
+        pools: dict[str, int] | None = None,
+        max_load: float | None = None,
+        jobserver: Jobserver | None = None,
+    ) -> None:
+        if jobs < 1:
+            raise ValueError(f"Number of jobs must be at least 1, got {jobs}")
+        for name, depth in (pools or {}).items():
+            if depth < 1:
+                raise ValueError(
+                    f"Depth of pool {name} must be at least 1, got {depth}"
+                )
+
+        self.jobs = jobs
+        self.pools = pools or {}
+        self.max_load = max_load
+        self.jobserver = jobserver
+        self._awaiting_token = False
+        self._pending: list[tuple[float, int, Job]] = []
+        self._sequence = count()
+        self._running: dict[Future[JobResult], Job] = {}
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+        self._workers = count(1)
+        self._workers_lock = Lock()
+        self._worker = local()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def submit(self, job: Job) -> None:
+        heappush(self._pending, (-job.priority, next(self._sequence), job))
+
+    def idle(self) -> bool:
+        return not self._pending and not self._running
+
+    def wait(self) -> list[JobResult]:
+        """
+        Start queued jobs on the free workers, then block until at least one
+        running job finishes and return all finished ones.
+        """
+        self._dispatch()
+        if not self._running:
+            return []
+
+        while True:
+            # Tokens are not announced, so they are polled for while waiting.
+            timeout = JOBSERVER_POLL if self._awaiting_token else None
+            done, _ = wait(self._running, timeout, return_when=FIRST_COMPLETED)
+            if done:
+                break
+            self._dispatch()
+
+        for future in done:
+            del self._running[future]
+        # The first running job needs no token.
+        while self.jobserver and self.jobserver.tokens > max(0, len(self._running) - 1):
+            self.jobserver.release()
+        return [future.result() for future in done]
+
+    def close(self) -> None:
+        """Drop jobs that have not started yet and wait for running ones."""
+        self._pending.clear()
+        self._executor.shutdown(wait=True)
+        self._running.clear()
+
+    def _dispatch(self) -> None:
+        deferred = []
+        memory: int | None = None
+        self._awaiting_token = False
+        load = getloadavg()[0] if self.max_load is not None else 0.0
+        while self._pending and len(self._running) < self.jobs:
+            # Jobs started just now do not show in the load average yet.
+            if self.max_load is not None and self._running and load >= self.max_load:
+                break
+
+            entry = heappop(self._pending)
+            job = entry[2]
+
+            if job.pool and self._pool_full(job.pool):
+                deferred.append(entry)
+                continue
+
+            if job.memory and any(other.memory for other in self._running.values()):
+                if memory is None:
+                    memory = self._free_memory()
+                if memory is not None and memory < job.memory:
+                    deferred.append(entry)
+                    continue
+                if memory is not None:
+                    memory -= job.memory
+
+            if self.jobserver and self._running and not self.jobserver.acquire():
+                deferred.append(entry)
+                self._awaiting_token = True
+                break
+
+            self._running[self._executor.submit(self._run, job)] = job
+            load += 1
+
+        for entry in deferred:
+            heappush(self._pending, entry)
+
+    def _free_memory(self) -> int | None:
+        """
+        Available memory minus what the running jobs declared: jobs which
+        started a moment ago have not allocated their memory yet.
+        """
+        available = available_memory()
+        if available is None:
+            return None
+        return available - sum(job.memory for job in self._running.values())
+
+    def _pool_full(self, pool: str) -> bool:
+        depth = self.pools.get(pool, self.jobs)
+        return sum(job.pool == pool for job in self._running.values()) >= depth
+
+    def _run(self, job: Job) -> JobResult:
+        if not hasattr(self._worker, "number"):
+            with self._workers_lock:
+                self._worker.number = next(self._workers)
+
+        start = time()
+        result = (job.runner or run_job)(job)
+        result.start, result.end = start, time()
+        result.worker = self._worker.number
+        return result
@@ -0,0 +1,174 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from re import findall
+from stat import S_ISFIFO
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING
+
+from ezbuild.log import debug, info
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Byte of the tokens ezbuild serves, the same GNU make uses.
+_TOKEN = b"+"
+
+
+def _auth(makeflags: str) -> str | None:
+    # Later options override earlier ones, as with make itself.
+    # --jobserver-fds is the name GNU make used before 4.2.
+    matches = findall(r"--jobserver-(?:auth|fds)=(\S+)", makeflags)
+    return matches[-1] if matches else None
+
+
+class Jobserver:
+    """
+    Client of a GNU make jobserver, which shares a budget of parallel jobs
+    between make and every build it runs.
+    Every client may run one job without a token; each further job needs a
+    token read from the jobserver, which is written back when it finishes.
+    Tokens are taken without blocking, so a client never waits on the
+    jobserver while it can run its own job.
+    """
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self._tokens: list[bytes] = []
+
+    @classmethod
+    def from_makeflags(cls, makeflags: str) -> Jobserver | None:
+        """
+        Join the jobserver advertised in MAKEFLAGS, either a named pipe
+        (fifo:PATH, GNU make 4.4) or a pair of inherited pipe descriptors
+        (R,W). Returns None if there is none or it is not accessible.
+        """
+        auth = _auth(makeflags)
+        if auth is None:
+            return None
+
+        if auth.startswith("fifo:"):
+            path = auth.removeprefix("fifo:")
+        else:
+            try:
+                read_fd = int(auth.split(",")[0])
+            except ValueError:
+                info(f"Unsupported jobserver {auth}, ignoring it")
+                return None
+            # Reopening the inherited pipe gives a descriptor of our own,
+            # which can be made non-blocking without affecting make.
+            path = f"/proc/self/fd/{read_fd}"
+
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        except OSError as e:
+            # make only passes its pipe to recipes marked with "+".
+            info(f"Cannot access jobserver {auth}, ignoring it: {e}")
+            return None
+
+        if not S_ISFIFO(os.fstat(fd).st_mode):
+            os.close(fd)
+            info(f"Cannot access jobserver {auth}, ignoring it: not a pipe")
+            return None
+
+        debug(f"Joined jobserver {auth}")
+        return cls(fd)
+
+    @property
+    def tokens(self) -> int:
+        """Number of tokens currently held."""
+        return len(self._tokens)
+
+    def acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        try:
+            token = os.read(self.fd, 1)
+        except BlockingIOError:
+            return False
+        if not token:
+            return False
+
+        self._tokens.append(token)
+        return True
+
+    def release(self) -> None:
+        """Give back a token taken by acquire."""
+        os.write(self.fd, self._tokens.pop())
+
+    def close(self) -> None:
+        """Give back every token held and leave the jobserver."""
+        while self._tokens:
+            self.release()
+        os.close(self.fd)
+
+
+def _serve(jobs: int) -> tuple[Jobserver, int, int]:
+    """
+    Create a pipe holding jobs - 1 tokens. Returns a client of it along with
+    the read and write descriptors child processes inherit.
+    The pipe is a named one, opened separately for the children and for
+    ezbuild, so that only ezbuild's descriptor is non-blocking. Its name is
+    removed again right away.
+    """
+    fds: list[int] = []
+    try:
+        with TemporaryDirectory(prefix="ezbuild-jobserver-") as temp_dir:
+            fifo = Path(temp_dir) / "fifo"
+            os.mkfifo(fifo, 0o600)
+            # Opening for reading first lets the blocking write end open.
+            fds.append(os.open(fifo, os.O_RDONLY | os.O_NONBLOCK))
+            fds.append(os.open(fifo, os.O_WRONLY))
+            fds.append(os.open(fifo, os.O_RDWR | os.O_NONBLOCK))
+        read_fd, write_fd, fd = fds
+        os.set_blocking(read_fd, True)
+        os.set_inheritable(read_fd, True)
+        os.set_inheritable(write_fd, True)
+        os.write(fd, _TOKEN * (jobs - 1))
+    except OSError:
+        for opened in fds:
+            os.close(opened)
+        raise
+
+    return Jobserver(fd), read_fd, write_fd
+
+
+@contextmanager
+def jobserver(jobs: int) -> Iterator[Jobserver | None]:
+    """
+    Join the jobserver of a parent make, or else serve jobs - 1 tokens from
+    a pipe of our own and advertise it in MAKEFLAGS for the duration, so
+    tools like make or gcc -flto=jobserver run by the build share the budget.
+    Child processes inherit the pipe, which is why run_job keeps inheritable
+    descriptors open.
+    Yields None if no jobserver could be set up.
+    """
+    makeflags = os.environ.get("MAKEFLAGS", "")
+    client = Jobserver.from_makeflags(makeflags)
+    if client is not None:
+        try:
+            yield client
+        finally:
+            client.close()
+        return
+
+    try:
+        client, read_fd, write_fd = _serve(jobs)
+    except OSError as e:
+        info(f"Cannot start a jobserver, running without one: {e}")
+        yield None
+        return
+
+    # The descriptor style is understood by every make since 4.2 and by
+    # older gcc, unlike fifo:PATH.
+    flags = f"{makeflags} -j{jobs} --jobserver-auth={read_fd},{write_fd}".strip()
+    os.environ["MAKEFLAGS"] = flags
+    try:
+        yield client
+    finally:
+        client.close()
+        os.close(read_fd)
+        os.close(write_fd)
+        if makeflags:
+            os.environ["MAKEFLAGS"] = makeflags
+        else:
+            os.environ.pop("MAKEFLAGS", None)
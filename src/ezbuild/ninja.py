@@ -0,0 +1,64 @@
+def escape_path(path: str) -> str:
+    """Escape a path for use in the outputs or inputs of a build statement."""
+    return path.replace("$", "$$").replace(" ", "$ ").replace(":", "$:")
+
+
+def escape(value: str) -> str:
+    """Escape a variable value, which ninja would otherwise expand."""
+    return value.replace("$", "$$")
+
+
+class NinjaWriter:
+    """Builds the text of a build.ninja file statement by statement."""
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def comment(self, text: str) -> None:
+        self.lines.append(f"# {text}")
+
+    def newline(self) -> None:
+        self.lines.append("")
+
+    def variable(self, name: str, value: str | int, indent: int = 0) -> None:
+        self.lines.append(f"{'  ' * indent}{name} = {value}")
+
+    def pool(self, name: str, depth: int) -> None:
+        self.lines.append(f"pool {name}")
+        self.variable("depth", depth, indent=1)
+
+    def rule(self, name: str, command: str, **variables: str | int) -> None:
+        """Add a rule. command and variables may refer to ninja variables."""
+        self.lines.append(f"rule {name}")
+        self.variable("command", command, indent=1)
+        for key, value in variables.items():
+            self.variable(key, value, indent=1)
+
+    def build(
+        self,
+        outputs: list[str],
+        rule: str,
+        inputs: list[str] | None = None,
+        implicit: list[str] | None = None,
+        variables: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Add a build statement. Paths are escaped here, variable values have
+        to be escaped by the caller. Empty variables are left out.
+        """
+        parts = ["build", " ".join(escape_path(path) for path in outputs) + ":", rule]
+        parts.extend(escape_path(path) for path in inputs or [])
+        if implicit:
+            parts.append("|")
+            parts.extend(escape_path(path) for path in implicit)
+
+        self.lines.append(" ".join(parts))
+        for key, value in (variables or {}).items():
+            if value:
+                self.variable(key, value, indent=1)
+
+    def default(self, paths: list[str]) -> None:
+        self.lines.append("default " + " ".join(escape_path(path) for path in paths))
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -1,9 +1,40 @@
 from os import environ
+from pathlib import Path
+
+
+def _default_cache_dir() -> Path:
+    if cache_dir := environ.get("EZBUILD_CACHE_DIR"):
+        return Path(cache_dir)
+
+    if xdg_cache_home := environ.get("XDG_CACHE_HOME"):
+        return Path(xdg_cache_home) / "ezbuild"
+
+    return Path.home() / ".cache" / "ezbuild"
 
 
 class PythonEnvironment:
     _debug: bool = environ.get("EZBUILD_DEBUG") == "1"
+    _cache: bool = environ.get("EZBUILD_CACHE") == "1"
+    _cache_dir: Path = _default_cache_dir()
+    _cache_max_size: str | None = environ.get("EZBUILD_CACHE_MAX_SIZE")
+    _remote_cache: str | None = environ.get("EZBUILD_REMOTE_CACHE")
 
     @classmethod
     def debug(cls) -> bool:
         return cls._debug
+
+    @classmethod
+    def cache(cls) -> bool:
+        return cls._cache
+
+    @classmethod
+    def cache_dir(cls) -> Path:
+        return cls._cache_dir
+
+    @classmethod
+    def cache_max_size(cls) -> str | None:
+        return cls._cache_max_size
+
+    @classmethod
+    def remote_cache(cls) -> str | None:
+        return cls._remote_cache
@@ -0,0 +1,132 @@
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from re import fullmatch
+from threading import Lock, get_ident
+from typing import TYPE_CHECKING
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from ezbuild.log import debug, error
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Seconds to wait for the server before giving up on a request.
+_TIMEOUT = 10
+
+
+def _valid_key(key: str) -> bool:
+    return fullmatch(r"[0-9a-f]{64}", key) is not None
+
+
+class RemoteCache:
+    """
+    Client of a shared cache speaking a minimal HTTP protocol:
+    `GET <url>/<key>` returns the stored bytes or 404, and
+    `PUT <url>/<key>` stores the request body.
+    The first connection failure disables the cache for the rest of the
+    build, so an unreachable server does not slow down every job.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip("/")
+        self.enabled = True
+        self._lock = Lock()
+
+    def get(self, key: str) -> bytes | None:
+        """Fetch the entry stored under key, or None if there is none."""
+        if not self.enabled:
+            return None
+
+        try:
+            with urlopen(f"{self.url}/{key}", timeout=_TIMEOUT) as response:
+                return response.read()
+        except HTTPError as e:
+            if e.code != HTTPStatus.NOT_FOUND:
+                debug(f"Remote cache GET {key} failed: {e}")
+        except (URLError, OSError) as e:
+            self._disable(e)
+        return None
+
+    def put(self, key: str, data: bytes) -> bool:
+        """Store data under key. Returns whether the server accepted it."""
+        if not self.enabled:
+            return False
+
+        request = Request(f"{self.url}/{key}", data=data, method="PUT")
+        request.add_header("Content-Type", "application/octet-stream")
+        try:
+            with urlopen(request, timeout=_TIMEOUT):
+                return True
+        except HTTPError as e:
+            debug(f"Remote cache PUT {key} failed: {e}")
+        except (URLError, OSError) as e:
+            self._disable(e)
+        return False
+
+    def _disable(self, reason: Exception) -> None:
+        with self._lock:
+            if self.enabled:
+                error(f"Disabling remote cache {self.url}: {reason}")
+                self.enabled = False
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """Serves the GET/PUT protocol of RemoteCache from a directory."""
+
+    server: CacheServer
+
+    def do_GET(self) -> None:
+        entry = self._entry()
+        if entry is None:
+            return
+
+        try:
+            data = entry.read_bytes()
+        except FileNotFoundError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self) -> None:
+        entry = self._entry()
+        if entry is None:
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.send_error(HTTPStatus.LENGTH_REQUIRED)
+            return
+
+        data = self.rfile.read(int(length))
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        temp = entry.with_name(f"{entry.name}.{get_ident()}.tmp")
+        temp.write_bytes(data)
+        temp.replace(entry)
+
+        self.send_response(HTTPStatus.CREATED)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        debug(f"{self.address_string()} {format % args}")
+
+    def _entry(self) -> Path | None:
+        key = self.path.strip("/")
+        if not _valid_key(key):
+            self.send_error(HTTPStatus.BAD_REQUEST, "Invalid cache key")
+            return None
+        return self.server.directory / key[:2] / key[2:]
+
+
+class CacheServer(ThreadingHTTPServer):
+    """Reference server for RemoteCache, storing entries under directory."""
+
+    def __init__(self, address: tuple[str, int], directory: Path) -> None:
+        super().__init__(address, CacheRequestHandler)
+        self.directory = directory
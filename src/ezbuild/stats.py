@@ -0,0 +1,67 @@
+from resource import RUSAGE_CHILDREN, RUSAGE_SELF, getrusage
+from time import time
+from typing import TYPE_CHECKING
+
+from ezbuild.executor import COMPILE_KINDS
+
+if TYPE_CHECKING:
+    from ezbuild.executor import JobResult
+
+# Number of slowest compiles and links listed in the summary.
+SLOWEST = 10
+
+
+def _cpu_time(who: int) -> float:
+    usage = getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _slowest(results: list[JobResult], count: int) -> list[str]:
+    results = sorted(results, key=lambda result: result.end - result.start)
+    return [
+        f"  {result.end - result.start:7.2f}s  {result.job.kind.upper():6} "
+        f"{result.job.label}"
+        for result in reversed(results[-count:])
+    ]
+
+
+class BuildStats:
+    """
+    Measures a build from its creation for the summary printed by --stats.
+    CPU time of the compilers and linkers is taken from the resource usage of
+    the finished child processes, so it covers every tool ezbuild ran.
+    """
+
+    def __init__(self) -> None:
+        self.start = time()
+        self._self_cpu = _cpu_time(RUSAGE_SELF)
+        self._children_cpu = _cpu_time(RUSAGE_CHILDREN)
+
+    def summary(self, results: list[JobResult], slowest: int = SLOWEST) -> list[str]:
+        """Return the lines of the summary of a build that ran results."""
+        wall = time() - self.start
+        self_cpu = _cpu_time(RUSAGE_SELF) - self._self_cpu
+        children_cpu = _cpu_time(RUSAGE_CHILDREN) - self._children_cpu
+
+        ran = [result for result in results if not result.cached]
+        busy = sum(result.end - result.start for result in results)
+        parallelism = busy / wall if wall > 0 else 0.0
+
+        lines = [
+            f"Wall time: {wall:.2f}s",
+            f"CPU time: {children_cpu:.2f}s in tools, {self_cpu:.2f}s in ezbuild",
+            f"Jobs: {len(results)} ({len(results) - len(ran)} from cache), "
+            f"parallelism {parallelism:.2f}",
+        ]
+
+        compiles = [result for result in ran if result.job.kind in COMPILE_KINDS]
+        if compiles:
+            lines.append("Slowest compiles:")
+            lines.extend(_slowest(compiles, slowest))
+
+        links = [result for result in ran if result.job.kind not in COMPILE_KINDS]
+        if links:
+            lines.append("Slowest links:")
+            lines.extend(_slowest(links, slowest))
+
+        return lines
@@ -0,0 +1,235 @@
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ezbuild.archive_mode import ArchiveMode
+from ezbuild.compile_command import CompileCommand
+from ezbuild.environment import SharedLibrary, StaticLibrary
+from ezbuild.executor import Job
+from ezbuild.language import Language
+
+if TYPE_CHECKING:
+    from ezbuild.dep_tree import Target
+    from ezbuild.environment import Environment, SystemLibrary
+
+_CXX_SUFFIXES = [".cpp", ".cxx", ".cc"]
+
+# Flags of `ar` in each archive mode, `s` writes the symbol index.
+AR_FLAGS = {
+    ArchiveMode.RANLIB: "-rc",
+    ArchiveMode.INDEXED: "-rcs",
+    ArchiveMode.THIN: "-rcsT",
+}
+
+
+def _format_define(define: str) -> str:
+    return f"-D{define}"
+
+
+def _collect_public_defines(target: Target, targets: dict[str, Target]) -> list[str]:
+    """
+    Collect all public defines from the target's dependencies.
+    Uses BFS to traverse the dependency tree.
+    """
+    public_defines: list[str] = []
+    visited: set[str] = set()
+    queue: list[str] = [dep for dep in target.dependencies if dep in targets]
+
+    while queue:
+        dep_name = queue.pop(0)
+        if dep_name in visited:
+            continue
+        visited.add(dep_name)
+
+        dep_target = targets[dep_name]
+        public_defines.extend(dep_target.public_defines)
+
+        for trans_dep in dep_target.dependencies:
+            if trans_dep in targets and trans_dep not in visited:
+                queue.append(trans_dep)
+
+    return public_defines
+
+
+def ensure_toolchain(build_env: Environment, target: Target) -> None:
+    """Make sure every tool needed to build the target is set."""
+    links = not isinstance(target, StaticLibrary)
+
+    if Language.C in target.languages:
+        build_env.ensure_cc()
+        if links:
+            build_env.ensure_ccld()
+
+    if Language.CXX in target.languages:
+        build_env.ensure_cc()
+        build_env.ensure_cxx()
+        if links:
+            build_env.ensure_ccld()
+            build_env.ensure_cxxld()
+
+    if isinstance(target, StaticLibrary):
+        build_env.ensure_ar()
+        if build_env.archive_mode(target) == ArchiveMode.RANLIB:
+            build_env.ensure_ranlib()
+
+
+def artifact_path(target: Target, bin_dir: Path, lib_dir: Path) -> Path:
+    if isinstance(target, StaticLibrary):
+        return lib_dir / f"{target.name}.a"
+    if isinstance(target, SharedLibrary):
+        return lib_dir / f"{target.name}.so"
+    return bin_dir / target.name
+
+
+def compile_flags(
+    target: Target,
+    targets: dict[str, Target],
+    system_libs: dict[str, SystemLibrary],
+) -> list[str]:
+    compile_flags: list[str] = []
+    for sys_dep in target.system_dependencies:
+        compile_flags.extend(system_libs[sys_dep].compile_flags)
+
+    public_defines = _collect_public_defines(target, targets)
+    for define in target.defines + target.public_defines + public_defines:
+        compile_flags.append(_format_define(define))
+
+    if isinstance(target, SharedLibrary):
+        compile_flags.append("-fPIC")
+
+    return compile_flags
+
+
+def _source_kind(source: str) -> str | None:
+    """Return the kind of compile step for a source, None if it is not compiled."""
+    suffix = Path(source).suffix
+    if suffix == ".c":
+        return "cc"
+    if suffix in _CXX_SUFFIXES:
+        return "cxx"
+    return None
+
+
+def link_kinds(target: Target, build_env: Environment) -> list[str]:
+    """Return the kinds of the steps which produce the target's artifact."""
+    if isinstance(target, StaticLibrary):
+        if build_env.archive_mode(target) == ArchiveMode.RANLIB:
+            return ["ar", "ranlib"]
+        return ["ar"]
+    if Language.CXX in target.languages:
+        return ["cxxld"]
+    return ["ccld"]
+
+
+def compile_job(
+    name: str,
+    target: Target,
+    source: str,
+    cwd: Path,
+    int_dir: Path,
+    build_env: Environment,
+    compile_flags: list[str],
+) -> tuple[CompileCommand, Job] | None:
+    """
+    Create the compile command for a single source of the target.
+    Returns None for sources that are not compiled (e.g. headers).
+    """
+    kind = _source_kind(source)
+    if kind is None:
+        return None
+    compiler = build_env[kind.upper()]
+
+    compile_command = CompileCommand()
+    compile_command.directory = str(int_dir)
+    compile_command.file = str(cwd / source)
+    compile_command.output = str(int_dir / f"{source}.o")
+    depfile = str(int_dir / f"{source}.d")
+    compile_command.arguments = [
+        compiler,
+        *compile_flags,
+        "-MMD",
+        "-MF",
+        depfile,
+        "-c",
+        "-o",
+        compile_command.output,
+        compile_command.file,
+    ]
+
+    job = Job(
+        argv=compile_command.arguments,
+        output=compile_command.output,
+        target=name,
+        kind=kind,
+        label=compile_command.file,
+        inputs=[compile_command.file],
+        depfile=depfile,
+        rspfile=str(int_dir / f"{source}.rsp"),
+    )
+    return compile_command, job
+
+
+def link_jobs(
+    name: str,
+    target: Target,
+    build_env: Environment,
+    objects: list[str],
+    dep_libs: list[str],
+    link_flags: list[str],
+    artifact: Path,
+    int_dir: Path,
+) -> list[Job]:
+    """Create the jobs which turn the target's objects into its artifact."""
+    inputs = [*objects, *dep_libs]
+    rspfile = str(int_dir / f"{artifact.name}.rsp")
+
+    if isinstance(target, StaticLibrary):
+        # The archive only depends on its own objects.
+        inputs = objects
+        mode = build_env.archive_mode(target)
+        jobs = [
+            Job(
+                argv=[build_env["AR"], AR_FLAGS[mode], str(artifact), *objects],
+                output=str(artifact),
+                target=name,
+                kind="ar",
+                label=str(artifact),
+                inputs=inputs,
+                rspfile=rspfile,
+            )
+        ]
+        if mode == ArchiveMode.RANLIB:
+            jobs.append(
+                Job(
+                    argv=[build_env["RANLIB"], str(artifact)],
+                    output=str(artifact),
+                    target=name,
+                    kind="ranlib",
+                    label=str(artifact),
+                    inputs=inputs,
+                )
+            )
+        return jobs
+
+    [kind] = link_kinds(target, build_env)
+    linker = build_env[kind.upper()]
+
+    shared = ["-shared"] if isinstance(target, SharedLibrary) else []
+    return [
+        Job(
+            argv=[
+                linker,
+                *shared,
+                "-o",
+                str(artifact),
+                *objects,
+                *dep_libs,
+                *link_flags,
+            ],
+            output=str(artifact),
+            target=name,
+            kind=kind,
+            label=str(artifact),
+            inputs=inputs,
+            rspfile=rspfile,
+        )
+    ]
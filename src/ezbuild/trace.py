@@ -0,0 +1,73 @@
+import json
+from contextlib import contextmanager
+from time import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+# Lane of the work ezbuild does itself, worker lanes are numbered from 1.
+MAIN_LANE = 0
+
+
+class Trace:
+    """
+    Collects spans of a build as Chrome trace events, which chrome://tracing
+    and Perfetto can display with one lane per worker.
+    Times are wall clock seconds since the epoch, like JobResult.start.
+    """
+
+    def __init__(self) -> None:
+        self.origin = time()
+        self.events: list[dict[str, Any]] = []
+        self._lanes: set[int] = set()
+
+    @contextmanager
+    def span(self, name: str, category: str = "ezbuild", **args: Any) -> Iterator[None]:
+        """Record the time spent in the with block on the main lane."""
+        start = time()
+        try:
+            yield
+        finally:
+            self.complete(name, category, start, time(), args=args)
+
+    def complete(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        lane: int = MAIN_LANE,
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        """Record a span that ran from start to end on a lane."""
+        if lane not in self._lanes:
+            self._lanes.add(lane)
+            self.events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": lane,
+                    "args": {"name": f"worker {lane}" if lane else "ezbuild"},
+                }
+            )
+
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6),
+                "dur": round((end - start) * 1e6),
+                "pid": 1,
+                "tid": lane,
+                "args": args or {},
+            }
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
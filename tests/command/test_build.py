@@ -1,11 +1,25 @@
+import json
 import os
+import shlex
+import shutil
+import subprocess
+from pathlib import Path
+from threading import Thread
 from typing import TYPE_CHECKING
 
+import pytest
+
 from ezbuild import Language, Program, SharedLibrary, StaticLibrary
-from ezbuild.commands.build import _collect_public_defines, _format_define, build
+from ezbuild.build_log import LOG_FILE, BuildLog
+from ezbuild.cache import ObjectCache
+from ezbuild.commands.build import _Builder, build
+from ezbuild.executor import JobPool
+from ezbuild.python_environment import PythonEnvironment
+from ezbuild.remote_cache import CacheServer
+from ezbuild.steps import _collect_public_defines, _format_define
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from pytest_mock import MockerFixture, MockType
 
 
 def test_format_define_simple() -> None:
@@ -15,9 +29,9 @@ def test_format_define_simple() -> None:
 
 
 def test_format_define_with_spaces() -> None:
-    """Test formatting a define with spaces (should be quoted)."""
+    """Test formatting a define with spaces (kept as a single argument)."""
     result = _format_define('MESSAGE="Hello World"')
-    assert result == '"-DMESSAGE="Hello World""'
+    assert result == '-DMESSAGE="Hello World"'
 
 
 def test_format_define_no_value() -> None:
@@ -390,3 +404,1054 @@ myapp = Program(
     with (tmp_path / "build" / "compile_commands.json").open("r") as f:
         compile_commands = json.load(f)
     assert len(compile_commands) > 0
+
+
+def test_build_define_with_spaces(tmp_path: Path) -> None:
+    """Test that a string define with spaces reaches the compiler intact."""
+    os.chdir(tmp_path)
+
+    (tmp_path / "build.ezbuild").write_text(
+        """
+env = Environment()
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"],
+    defines=['GREETING="Hello World"'],
+)
+"""
+    )
+    (tmp_path / "main.c").write_text(
+        '#include <string.h>\nint main(void) { return strcmp(GREETING, "Hello World"); }'
+    )
+
+    assert build() == (0, "")
+    assert subprocess.run([tmp_path / "build" / "bin" / "myapp"]).returncode == 0
+
+    with (tmp_path / "build" / "compile_commands.json").open() as f:
+        [entry] = json.load(f)
+    assert '-DGREETING="Hello World"' in shlex.split(entry["command"])
+
+
+def test_build_program_multiple_sources_in_parallel(tmp_path: Path) -> None:
+    """Test building a program whose sources are compiled in parallel."""
+    os.chdir(tmp_path)
+
+    build_file_content = """
+env = Environment()
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c", "a.c", "b.c"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "a.c").write_text("int a(void) { return 1; }")
+    (tmp_path / "b.c").write_text("int b(void) { return 2; }")
+    (tmp_path / "main.c").write_text(
+        "int a(void); int b(void); int main(void) { return a() + b() - 3; }"
+    )
+
+    exit_code, message = build(jobs=4)
+    assert exit_code == 0
+    assert message == ""
+    assert (tmp_path / "build" / "myapp" / "a.c.o").exists()
+    assert (tmp_path / "build" / "myapp" / "b.c.o").exists()
+    assert (tmp_path / "build" / "bin" / "myapp").exists()
+
+
+def test_build_single_job(tmp_path: Path) -> None:
+    """Test building with a single job."""
+    os.chdir(tmp_path)
+
+    build_file_content = """
+env = Environment()
+mylib = StaticLibrary(
+    name="mylib",
+    languages=[Language.C],
+    sources=["a.c", "b.c"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "a.c").write_text("int a(void) { return 1; }")
+    (tmp_path / "b.c").write_text("int b(void) { return 2; }")
+
+    exit_code, message = build(jobs=1)
+    assert exit_code == 0
+    assert message == ""
+    assert (tmp_path / "build" / "lib" / "mylib.a").exists()
+
+
+def test_build_compilation_failure(tmp_path: Path) -> None:
+    """Test that a failing compile stops the build."""
+    os.chdir(tmp_path)
+
+    build_file_content = """
+env = Environment()
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c", "broken.c"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "main.c").write_text("int main(void) { return 0; }")
+    (tmp_path / "broken.c").write_text("int broken(void) { return }")
+
+    exit_code, message = build(jobs=2)
+    assert exit_code == 6
+    assert message.startswith("Compilation failed")
+    assert not (tmp_path / "build" / "bin" / "myapp").exists()
+
+
+def test_build_independent_libraries(tmp_path: Path) -> None:
+    """Test building a program that depends on two independent libraries."""
+    os.chdir(tmp_path)
+
+    build_file_content = """
+env = Environment()
+lib1 = StaticLibrary(
+    name="lib1",
+    languages=[Language.C],
+    sources=["lib1.c"]
+)
+lib2 = StaticLibrary(
+    name="lib2",
+    languages=[Language.C],
+    sources=["lib2.c"]
+)
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"],
+    dependencies=["lib1", "lib2"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "lib1.c").write_text("int one(void) { return 1; }")
+    (tmp_path / "lib2.c").write_text("int two(void) { return 2; }")
+    (tmp_path / "main.c").write_text(
+        "int one(void); int two(void); int main(void) { return one() + two() - 3; }"
+    )
+
+    exit_code, message = build(jobs=4)
+    assert exit_code == 0
+    assert message == ""
+    assert (tmp_path / "build" / "lib" / "lib1.a").exists()
+    assert (tmp_path / "build" / "lib" / "lib2.a").exists()
+    assert (tmp_path / "build" / "bin" / "myapp").exists()
+
+
+def test_build_cyclic_dependency(tmp_path: Path) -> None:
+    """Test build when targets depend on each other."""
+    os.chdir(tmp_path)
+
+    build_file_content = """
+env = Environment()
+lib1 = StaticLibrary(
+    name="lib1",
+    languages=[Language.C],
+    sources=["lib1.c"],
+    dependencies=["lib2"]
+)
+lib2 = StaticLibrary(
+    name="lib2",
+    languages=[Language.C],
+    sources=["lib2.c"],
+    dependencies=["lib1"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+
+    exit_code, message = build()
+    assert exit_code == 5
+    assert message.startswith("Cyclic dependency error")
+
+
+def test_build_target_name_differs_from_variable(tmp_path: Path) -> None:
+    """Test that dependencies are tracked by variable name, not target name."""
+    os.chdir(tmp_path)
+
+    build_file_content = """
+env = Environment()
+mylib = StaticLibrary(
+    name="mylib",
+    languages=[Language.C],
+    sources=["lib.c"]
+)
+app = Program(
+    name="my-application",
+    languages=[Language.C],
+    sources=["main.c"],
+    dependencies=["mylib"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "lib.c").write_text("int one(void) { return 1; }")
+    (tmp_path / "main.c").write_text(
+        "int one(void); int main(void) { return one() - 1; }"
+    )
+
+    exit_code, message = build()
+    assert exit_code == 0
+    assert message == ""
+    assert (tmp_path / "build" / "bin" / "my-application").exists()
+
+
+def _write_app_with_library(tmp_path: Path) -> None:
+    build_file_content = """
+env = Environment()
+mylib = StaticLibrary(
+    name="mylib",
+    languages=[Language.C],
+    sources=["lib.c"]
+)
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"],
+    dependencies=["mylib"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "lib.c").write_text("int one(void) { return 1; }")
+    (tmp_path / "main.c").write_text(
+        "int one(void); int main(void) { return one() - 1; }"
+    )
+
+
+def _mtimes(tmp_path: Path) -> dict[str, int]:
+    outputs = [
+        tmp_path / "build" / "mylib" / "lib.c.o",
+        tmp_path / "build" / "myapp" / "main.c.o",
+        tmp_path / "build" / "lib" / "mylib.a",
+        tmp_path / "build" / "bin" / "myapp",
+    ]
+    return {path.name: path.stat().st_mtime_ns for path in outputs}
+
+
+def _age_outputs(tmp_path: Path) -> None:
+    """Move every file back in time so later writes are clearly newer."""
+    for path in tmp_path.rglob("*"):
+        if path.is_file():
+            os.utime(path, ns=(10**18, 10**18))
+
+
+def test_build_noop_rebuild_skips_everything(tmp_path: Path) -> None:
+    """Test that a second build without changes does not run any job."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    before = _mtimes(tmp_path)
+
+    assert build() == (0, "")
+    assert _mtimes(tmp_path) == before
+
+
+def test_build_rebuilds_changed_source(tmp_path: Path) -> None:
+    """Test that only the changed source and the affected links are rebuilt."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    _age_outputs(tmp_path)
+    before = _mtimes(tmp_path)
+
+    (tmp_path / "lib.c").write_text("int one(void) { return 2 - 1; }")
+    assert build() == (0, "")
+    after = _mtimes(tmp_path)
+
+    assert after["lib.c.o"] != before["lib.c.o"]
+    assert after["mylib.a"] != before["mylib.a"]
+    assert after["myapp"] != before["myapp"]
+    assert after["main.c.o"] == before["main.c.o"]
+
+
+def test_build_relinks_when_source_removed(tmp_path: Path) -> None:
+    """Test that removing a source from a target relinks it."""
+    os.chdir(tmp_path)
+    build_file_content = """
+env = Environment()
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c", "extra.c"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "main.c").write_text("int main(void) { return 0; }")
+    (tmp_path / "extra.c").write_text("int extra(void) { return 0; }")
+
+    assert build() == (0, "")
+    _age_outputs(tmp_path)
+    app = tmp_path / "build" / "bin" / "myapp"
+    before = app.stat().st_mtime_ns
+
+    (tmp_path / "build.ezbuild").write_text(
+        build_file_content.replace(', "extra.c"', "")
+    )
+    _age_outputs(tmp_path)
+    assert build() == (0, "")
+    assert app.stat().st_mtime_ns != before
+
+
+def test_build_always_make_rebuilds_everything(tmp_path: Path) -> None:
+    """Test that always_make ignores up to date outputs."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    _age_outputs(tmp_path)
+    before = _mtimes(tmp_path)
+
+    assert build(always_make=True) == (0, "")
+    after = _mtimes(tmp_path)
+    assert all(after[name] != before[name] for name in before)
+
+
+def test_build_hash_skips_touched_source(tmp_path: Path) -> None:
+    """Test that use_hash does not rebuild a source whose contents are unchanged."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build(use_hash=True) == (0, "")
+    _age_outputs(tmp_path)
+    before = _mtimes(tmp_path)
+
+    (tmp_path / "lib.c").touch()
+    assert build(use_hash=True) == (0, "")
+    assert _mtimes(tmp_path) == before
+
+
+def test_build_relinks_missing_dependent_of_up_to_date_library(tmp_path: Path) -> None:
+    """Test that dependents of an up to date library are still built."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    (tmp_path / "build" / "bin" / "myapp").unlink()
+
+    assert build() == (0, "")
+    assert (tmp_path / "build" / "bin" / "myapp").exists()
+
+
+def test_build_rebuilds_includers_of_changed_header(tmp_path: Path) -> None:
+    """Test that changing a header recompiles only the sources including it."""
+    os.chdir(tmp_path)
+    build_file_content = """
+env = Environment()
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c", "other.c"]
+)
+"""
+    (tmp_path / "build.ezbuild").write_text(build_file_content)
+    (tmp_path / "lib.h").write_text("#define VALUE 0\n")
+    (tmp_path / "main.c").write_text(
+        '#include "lib.h"\nint other(void); int main(void) { return VALUE + other(); }'
+    )
+    (tmp_path / "other.c").write_text("int other(void) { return 0; }")
+
+    assert build() == (0, "")
+    assert (tmp_path / "build" / "myapp" / "main.c.d").exists()
+    _age_outputs(tmp_path)
+
+    main_o = tmp_path / "build" / "myapp" / "main.c.o"
+    other_o = tmp_path / "build" / "myapp" / "other.c.o"
+    main_before = main_o.stat().st_mtime_ns
+    other_before = other_o.stat().st_mtime_ns
+
+    (tmp_path / "lib.h").write_text("#define VALUE 1\n")
+    assert build() == (0, "")
+    assert main_o.stat().st_mtime_ns != main_before
+    assert other_o.stat().st_mtime_ns == other_before
+
+
+def test_build_rebuilds_objects_with_changed_defines(tmp_path: Path) -> None:
+    """Test that changing a target's defines only recompiles that target."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    _age_outputs(tmp_path)
+    before = _mtimes(tmp_path)
+
+    build_file = tmp_path / "build.ezbuild"
+    build_file.write_text(
+        build_file.read_text().replace(
+            'sources=["main.c"],', 'sources=["main.c"],\n    defines=["APP_DEBUG"],'
+        )
+    )
+    assert build() == (0, "")
+    after = _mtimes(tmp_path)
+
+    assert after["main.c.o"] != before["main.c.o"]
+    assert after["myapp"] != before["myapp"]
+    assert after["lib.c.o"] == before["lib.c.o"]
+    assert after["mylib.a"] == before["mylib.a"]
+
+
+def test_build_rebuilds_dependents_with_changed_public_defines(tmp_path: Path) -> None:
+    """Test that changing public defines recompiles the library and its users."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    _age_outputs(tmp_path)
+    before = _mtimes(tmp_path)
+
+    build_file = tmp_path / "build.ezbuild"
+    build_file.write_text(
+        build_file.read_text().replace(
+            'sources=["lib.c"]', 'sources=["lib.c"],\n    public_defines=["LIB_V2"]'
+        )
+    )
+    assert build() == (0, "")
+    after = _mtimes(tmp_path)
+
+    assert all(after[name] != before[name] for name in before)
+
+
+def test_build_restores_objects_from_cache(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that a clean rebuild restores its outputs from the local cache."""
+    project = tmp_path / "project"
+    project.mkdir()
+    os.chdir(project)
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "cache")
+    _write_app_with_library(project)
+
+    assert build(use_cache=True) == (0, "")
+    obj = project / "build" / "myapp" / "main.c.o"
+    content = obj.read_bytes()
+    assert (tmp_path / "cache" / "objects").exists()
+
+    shutil.rmtree(project / "build")
+    cache_run = mocker.spy(ObjectCache, "run")
+    assert build(use_cache=True) == (0, "")
+    assert obj.read_bytes() == content
+    assert os.access(project / "build" / "bin" / "myapp", os.X_OK)
+
+    # ranlib rewrites the restored archive in place, so only it runs again.
+    results = cache_run.spy_return_list
+    assert len(results) == 5
+    assert [result.job.kind for result in results if not result.cached] == ["ranlib"]
+
+
+def test_build_without_cache_does_not_touch_cache(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that the cache is not used unless enabled."""
+    project = tmp_path / "project"
+    project.mkdir()
+    os.chdir(project)
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "cache")
+    mocker.patch.object(PythonEnvironment, "_cache", False)
+    mocker.patch.object(PythonEnvironment, "_remote_cache", None)
+    _write_app_with_library(project)
+
+    assert build() == (0, "")
+    assert not (tmp_path / "cache").exists()
+
+
+def test_build_shares_outputs_through_remote_cache(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """
+    Test that a build with an empty local cache restores its objects and
+    archives from the remote, while programs are linked again.
+    """
+    project = tmp_path / "project"
+    project.mkdir()
+    os.chdir(project)
+    _write_app_with_library(project)
+
+    server = CacheServer(("127.0.0.1", 0), tmp_path / "server")
+    thread = Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "one")
+        assert build(remote_cache=url) == (0, "")
+        assert (tmp_path / "server").exists()
+
+        shutil.rmtree(project / "build")
+        mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "two")
+        get_remote = mocker.spy(ObjectCache, "_get_remote")
+        assert build(remote_cache=url) == (0, "")
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    assert all(get_remote.spy_return_list)
+    assert get_remote.call_count == 3
+    assert os.access(project / "build" / "bin" / "myapp", os.X_OK)
+
+
+def _write_two_programs(tmp_path: Path) -> None:
+    _write_app_with_library(tmp_path)
+    with (tmp_path / "build.ezbuild").open("a") as f:
+        f.write(
+            """
+other = Program(
+    name="other-app",
+    languages=[Language.C],
+    sources=["other.c"]
+)
+"""
+        )
+    (tmp_path / "other.c").write_text("int main(void) { return 0; }")
+
+
+def test_build_named_target_builds_dependency_closure(tmp_path: Path) -> None:
+    """Test that building a named target skips unrelated targets."""
+    os.chdir(tmp_path)
+    _write_two_programs(tmp_path)
+
+    assert build(names=["myapp"]) == (0, "")
+    assert (tmp_path / "build" / "lib" / "mylib.a").exists()
+    assert (tmp_path / "build" / "bin" / "myapp").exists()
+    assert not (tmp_path / "build" / "bin" / "other-app").exists()
+
+
+def test_build_multiple_names(tmp_path: Path) -> None:
+    """Test that several targets can be requested by key or by name."""
+    os.chdir(tmp_path)
+    _write_two_programs(tmp_path)
+
+    assert build(names=["mylib", "other-app"]) == (0, "")
+    assert (tmp_path / "build" / "lib" / "mylib.a").exists()
+    assert (tmp_path / "build" / "bin" / "other-app").exists()
+    assert not (tmp_path / "build" / "bin" / "myapp").exists()
+
+
+def test_build_unknown_name(tmp_path: Path) -> None:
+    """Test that building a target that does not exist fails."""
+    os.chdir(tmp_path)
+    _write_two_programs(tmp_path)
+
+    exit_code, message = build(names=["missing"])
+    assert exit_code == 10
+    assert "'missing' does not exist" in message
+
+
+def test_build_named_target_keeps_other_compile_commands(tmp_path: Path) -> None:
+    """Test that building a subset keeps compile_commands.json complete."""
+    os.chdir(tmp_path)
+    _write_two_programs(tmp_path)
+
+    assert build(names=["other"]) == (0, "")
+    assert build(names=["myapp"]) == (0, "")
+    assert build(names=["myapp"]) == (0, "")
+
+    with (tmp_path / "build" / "compile_commands.json").open() as f:
+        files = sorted(Path(entry["file"]).name for entry in json.load(f))
+    assert files == ["lib.c", "main.c", "other.c"]
+
+
+def test_build_writes_build_log(tmp_path: Path) -> None:
+    """Test that every step that runs is appended to the build log."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    log = BuildLog.load(tmp_path / "build")
+    assert sorted(kind for _, kind in log.entries) == [
+        "ar",
+        "cc",
+        "cc",
+        "ccld",
+        "ranlib",
+    ]
+    assert all(entry.status == 0 for entry in log.entries.values())
+    assert all(entry.start <= entry.end for entry in log.entries.values())
+
+    main_o = str(tmp_path / "build" / "myapp" / "main.c.o")
+    assert log.duration(main_o, "cc") is not None
+
+    # Nothing runs in a no-op build, so nothing is logged.
+    lines = (tmp_path / "build" / LOG_FILE).read_text()
+    assert build() == (0, "")
+    assert (tmp_path / "build" / LOG_FILE).read_text() == lines
+
+
+def _write_project_with_failures(tmp_path: Path) -> None:
+    (tmp_path / "build.ezbuild").write_text(
+        """
+env = Environment()
+mylib = StaticLibrary(name="mylib", languages=[Language.C], sources=["lib.c"])
+myapp = Program(
+    name="myapp", languages=[Language.C], sources=["main.c"], dependencies=["mylib"]
+)
+tool = Program(name="tool", languages=[Language.C], sources=["tool.c"])
+broken = Program(name="broken", languages=[Language.C], sources=["broken.c"])
+"""
+    )
+    (tmp_path / "lib.c").write_text("int one(void) { return }")
+    (tmp_path / "main.c").write_text("int main(void) { return 0; }")
+    (tmp_path / "tool.c").write_text("int main(void) { return 0; }")
+    (tmp_path / "broken.c").write_text("int main(void) { return }")
+
+
+def test_build_keep_going(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that -k builds everything not depending on a failed step."""
+    os.chdir(tmp_path)
+    _write_project_with_failures(tmp_path)
+
+    assert build(jobs=1, keep_going=True) == (6, "2 of 5 steps failed")
+    build_dir = tmp_path / "build"
+    assert (build_dir / "bin" / "tool").exists()
+    # Compiles of dependents do not wait for the failed library.
+    assert (build_dir / "myapp" / "main.c.o").exists()
+    assert not (build_dir / "bin" / "myapp").exists()
+    assert not (build_dir / "bin" / "broken").exists()
+
+    output = capsys.readouterr().out
+    lines = [line.split("] ", 1)[1] for line in output.splitlines() if "] " in line]
+    report = lines[lines.index("Failed steps:") :]
+    assert sorted(report[1:3]) == [
+        f"  Compilation failed: {tmp_path / 'broken.c'}",
+        f"  Compilation failed: {tmp_path / 'lib.c'}",
+    ]
+    assert report[3] == "Not built because a dependency failed: myapp"
+
+
+def test_build_keep_going_after_link_failure(tmp_path: Path) -> None:
+    """Test that a failed link is reported with the link exit code."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    (tmp_path / "main.c").write_text("int two(void); int main(void) { return two(); }")
+
+    assert build(keep_going=True) == (7, "1 of 5 steps failed")
+    assert (tmp_path / "build" / "lib" / "mylib.a").exists()
+
+
+def test_build_log_records_failures(tmp_path: Path) -> None:
+    """Test that a failing step is logged with its exit status."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    (tmp_path / "main.c").write_text("int main(void) { return }")
+
+    exit_code, _ = build()
+    assert exit_code == 6
+
+    log = BuildLog.load(tmp_path / "build")
+    main_o = str(tmp_path / "build" / "myapp" / "main.c.o")
+    assert log.entries[(main_o, "cc")].status != 0
+
+
+def _compile_starts(tmp_path: Path) -> dict[str, int]:
+    log = BuildLog.load(tmp_path / "build")
+    return {
+        Path(output).name: entry.start
+        for (output, kind), entry in log.entries.items()
+        if kind == "cc"
+    }
+
+
+def test_build_starts_critical_path_first(tmp_path: Path) -> None:
+    """Test that the library an app waits on compiles before unrelated work."""
+    os.chdir(tmp_path)
+    (tmp_path / "build.ezbuild").write_text(
+        """
+env = Environment()
+other = Program(name="other", languages=[Language.C], sources=["other.c"])
+mylib = StaticLibrary(name="mylib", languages=[Language.C], sources=["lib.c"])
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"],
+    dependencies=["mylib"]
+)
+"""
+    )
+    (tmp_path / "other.c").write_text("int main(void) { return 0; }")
+    (tmp_path / "lib.c").write_text("int one(void) { return 1; }")
+    (tmp_path / "main.c").write_text(
+        "int one(void); int main(void) { return one() - 1; }"
+    )
+
+    assert build(jobs=1) == (0, "")
+    starts = _compile_starts(tmp_path)
+    assert starts["lib.c.o"] < starts["other.c.o"]
+
+
+def test_build_compiles_before_dependencies_are_linked(tmp_path: Path) -> None:
+    """Test that a program compiles while its library is still being archived."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build(jobs=2) == (0, "")
+    log = BuildLog.load(tmp_path / "build")
+    main_o = log.entries[(str(tmp_path / "build" / "myapp" / "main.c.o"), "cc")]
+    archive = log.entries[(str(tmp_path / "build" / "lib" / "mylib.a"), "ar")]
+    link = log.entries[(str(tmp_path / "build" / "bin" / "myapp"), "ccld")]
+    assert main_o.start <= archive.start
+    assert link.start >= archive.end
+
+
+def test_build_puts_links_in_link_pool(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that only links run in the link pool and need --link-memory."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    pool = mocker.patch("ezbuild.commands.build.JobPool", wraps=JobPool)
+    submit = mocker.spy(JobPool, "submit")
+
+    assert build(jobs=4, link_jobs=1, link_memory="2M") == (0, "")
+    assert pool.call_args.args[:3] == (4, {"link": 1}, None)
+    jobs = {call.args[1].kind: call.args[1] for call in submit.call_args_list}
+    assert (jobs["ccld"].pool, jobs["ccld"].memory) == ("link", 2 * 1024 * 1024)
+    assert (jobs["cc"].pool, jobs["cc"].memory) == ("", 0)
+    assert (jobs["ar"].pool, jobs["ar"].memory) == ("", 0)
+
+
+def test_build_default_link_jobs(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that half as many links as jobs run at once by default."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    pool = mocker.patch("ezbuild.commands.build.JobPool", wraps=JobPool)
+
+    assert build(jobs=5) == (0, "")
+    assert pool.call_args.args[:3] == (5, {"link": 2}, None)
+
+
+def test_build_load_average(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that -l is passed on to the job pool."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    pool = mocker.patch("ezbuild.commands.build.JobPool", wraps=JobPool)
+
+    assert build(jobs=2, load_average=100.0) == (0, "")
+    assert pool.call_args.args[:3] == (2, {"link": 1}, 100.0)
+
+
+def test_build_invalid_link_memory(tmp_path: Path) -> None:
+    """Test that an invalid --link-memory is rejected."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build(link_memory="lots") == (12, "Invalid size: lots")
+
+
+def test_build_starts_slowest_compile_first(tmp_path: Path) -> None:
+    """Test that compiles which took longest last time are started first."""
+    os.chdir(tmp_path)
+    sources = ["a.c", "b.c", "c.c"]
+    (tmp_path / "build.ezbuild").write_text(
+        f"""
+env = Environment()
+myapp = Program(name="myapp", languages=[Language.C], sources={sources})
+"""
+    )
+    (tmp_path / "a.c").write_text("int main(void) { return 0; }")
+    (tmp_path / "b.c").write_text("int b;")
+    (tmp_path / "c.c").write_text("int c;")
+
+    assert build(jobs=1) == (0, "")
+    log = BuildLog.load(tmp_path / "build")
+    slow = (str(tmp_path / "build" / "myapp" / "c.c.o"), "cc")
+    log.entries[slow].end = log.entries[slow].start + 60_000
+    log.record(log.entries[slow])
+    log.save()
+
+    assert build(jobs=1, always_make=True) == (0, "")
+    starts = _compile_starts(tmp_path)
+    assert min(starts, key=starts.__getitem__) == "c.c.o"
+
+
+def test_build_writes_trace(tmp_path: Path) -> None:
+    """Test that --trace writes spans for ezbuild's own work and every job."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    trace_path = tmp_path / "build" / "trace.json"
+    assert build(jobs=2, trace_path=trace_path) == (0, "")
+    with trace_path.open() as f:
+        events = json.load(f)["traceEvents"]
+
+    spans = [event for event in events if event["ph"] == "X"]
+    main = [event["name"] for event in spans if event["tid"] == 0]
+    assert main == ["Evaluate build.ezbuild", "Sort targets"]
+
+    jobs = sorted(event["name"] for event in spans if event["tid"] != 0)
+    assert jobs == [
+        "AR mylib.a",
+        "CC lib.c",
+        "CC main.c",
+        "CCLD myapp",
+        "RANLIB mylib.a",
+    ]
+    assert {event["tid"] for event in spans} <= {0, 1, 2}
+
+
+def test_build_without_trace(tmp_path: Path) -> None:
+    """Test that no trace is written unless requested."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    json_files = [path.name for path in (tmp_path / "build").glob("*.json")]
+    assert json_files == ["compile_commands.json"]
+
+
+def test_build_stats(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that --stats prints timings and the slowest steps."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build(jobs=2, show_stats=True) == (0, "")
+    output = capsys.readouterr().out
+    assert "Wall time: " in output
+    assert "CPU time: " in output
+    assert "Jobs: 5 (0 from cache), parallelism " in output
+    lines = [line.split("] ", 1)[1] for line in output.splitlines() if "] " in line]
+    compiles = lines[
+        lines.index("Slowest compiles:") + 1 : lines.index("Slowest links:")
+    ]
+    assert sorted(line.split()[-1] for line in compiles) == [
+        str(tmp_path / "lib.c"),
+        str(tmp_path / "main.c"),
+    ]
+
+
+def test_build_without_stats(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that the summary is only printed with --stats."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    assert "Wall time: " not in capsys.readouterr().out
+
+
+def test_build_with_response_files(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that long command lines are passed to the tools in response files."""
+    mocker.patch("ezbuild.executor.RESPONSE_FILE_THRESHOLD", 0)
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build() == (0, "")
+    assert subprocess.run([tmp_path / "build" / "bin" / "myapp"]).returncode == 0
+    rspfiles = sorted(path.name for path in (tmp_path / "build").rglob("*.rsp"))
+    assert rspfiles == ["lib.c.rsp", "main.c.rsp", "myapp.rsp", "mylib.a.rsp"]
+
+
+def test_build_with_response_files_and_cache(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that the cache preprocesses through a response file too."""
+    mocker.patch("ezbuild.executor.RESPONSE_FILE_THRESHOLD", 0)
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "cache")
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+
+    assert build(use_cache=True) == (0, "")
+    assert (tmp_path / "build" / "myapp" / "main.c.E.rsp").exists()
+    shutil.rmtree(tmp_path / "build")
+    assert build(use_cache=True) == (0, "")
+    assert subprocess.run([tmp_path / "build" / "bin" / "myapp"]).returncode == 0
+
+
+def _build_file_with_archive_mode(tmp_path: Path, mode: str) -> None:
+    build_file = tmp_path / "build.ezbuild"
+    build_file.write_text(
+        build_file.read_text().replace(
+            'sources=["lib.c"]', f'sources=["lib.c"],\n    archive_mode={mode}'
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    ("mode", "magic"),
+    [("ArchiveMode.INDEXED", b"!<arch>\n"), ("ArchiveMode.THIN", b"!<thin>\n")],
+)
+def test_build_archive_mode_skips_ranlib(
+    tmp_path: Path, mocker: MockerFixture, mode: str, magic: bytes
+) -> None:
+    """Test that ar indexes the archive itself outside of the ranlib mode."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    _build_file_with_archive_mode(tmp_path, mode)
+    record = mocker.spy(_Builder, "_record")
+
+    assert build() == (0, "")
+    kinds = [call.args[1].job.kind for call in record.call_args_list]
+    assert "ranlib" not in kinds
+    assert "ar" in kinds
+    archive = tmp_path / "build" / "lib" / "mylib.a"
+    assert archive.read_bytes().startswith(magic)
+    assert subprocess.run([tmp_path / "build" / "bin" / "myapp"]).returncode == 0
+
+
+def test_build_switches_archive_mode(tmp_path: Path) -> None:
+    """Test that an existing archive is replaced when the archive mode changes."""
+    os.chdir(tmp_path)
+    _write_app_with_library(tmp_path)
+    _build_file_with_archive_mode(tmp_path, "ArchiveMode.THIN")
+    assert build() == (0, "")
+
+    _write_app_with_library(tmp_path)
+    assert build() == (0, "")
+    archive = tmp_path / "build" / "lib" / "mylib.a"
+    assert archive.read_bytes().startswith(b"!<arch>\n")
+
+
+def _write_library_of_four(tmp_path: Path, sources: str = "abcd") -> None:
+    (tmp_path / "build.ezbuild").write_text(
+        f"""
+env = Environment()
+base = StaticLibrary(name="base", languages=[Language.C], sources=["base.c"])
+mylib = StaticLibrary(
+    name="mylib",
+    languages=[Language.C],
+    sources={[f"{source}.c" for source in sources]!r},
+    dependencies=["base"],
+)
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"],
+    dependencies=["mylib", "base"],
+)
+"""
+    )
+    if (tmp_path / "main.c").exists():
+        return
+    (tmp_path / "base.c").write_text("int base(void) { return 0; }")
+    for source in "abcd":
+        (tmp_path / f"{source}.c").write_text(f"int {source}(void) {{ return 0; }}")
+    (tmp_path / "main.c").write_text("int a(void); int main(void) { return a(); }")
+
+
+def _archive_runs(record: MockType, archive: str) -> list[list[str]]:
+    return [
+        [Path(arg).name for arg in call.args[1].job.argv[1:]]
+        for call in record.call_args_list
+        if call.args[1].job.kind == "ar" and call.args[1].job.output.endswith(archive)
+    ]
+
+
+def _members(archive: Path) -> list[str]:
+    result = subprocess.run(["ar", "t", archive], capture_output=True, text=True)
+    return sorted(result.stdout.split())
+
+
+def _edit(path: Path) -> None:
+    path.write_text(path.read_text() + "\n")
+
+
+def test_build_updates_archive_in_place(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that only the rebuilt object is replaced in an existing archive."""
+    os.chdir(tmp_path)
+    _write_library_of_four(tmp_path)
+    assert build() == (0, "")
+
+    record = mocker.spy(_Builder, "_record")
+    _edit(tmp_path / "b.c")
+    assert build() == (0, "")
+
+    assert _archive_runs(record, "mylib.a") == [["-rc", "mylib.a", "b.c.o"]]
+    archive = tmp_path / "build" / "lib" / "mylib.a"
+    assert _members(archive) == ["a.c.o", "b.c.o", "c.c.o", "d.c.o"]
+    assert subprocess.run([tmp_path / "build" / "bin" / "myapp"]).returncode == 0
+
+    record.reset_mock()
+    assert build() == (0, "")
+    assert _archive_runs(record, "mylib.a") == []
+
+
+def test_build_deletes_removed_archive_members(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that objects of removed sources are deleted from the archive."""
+    os.chdir(tmp_path)
+    _write_library_of_four(tmp_path)
+    assert build() == (0, "")
+
+    record = mocker.spy(_Builder, "_record")
+    _write_library_of_four(tmp_path, sources="abc")
+    assert build() == (0, "")
+
+    assert _archive_runs(record, "mylib.a") == [["-d", "mylib.a", "d.c.o"]]
+    archive = tmp_path / "build" / "lib" / "mylib.a"
+    assert _members(archive) == ["a.c.o", "b.c.o", "c.c.o"]
+    [delete] = [
+        call.args[1].job
+        for call in record.call_args_list
+        if call.args[1].job.argv[1] == "-d"
+    ]
+    assert delete.rspfile == str(tmp_path / "build" / "mylib" / "mylib.a.d.rsp")
+
+
+def test_build_rewrites_archive_after_many_changes(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that the archive is written from scratch if most members changed."""
+    os.chdir(tmp_path)
+    _write_library_of_four(tmp_path)
+    assert build() == (0, "")
+
+    record = mocker.spy(_Builder, "_record")
+    for source in "abc":
+        _edit(tmp_path / f"{source}.c")
+    assert build() == (0, "")
+
+    assert _archive_runs(record, "mylib.a") == [
+        ["-rc", "mylib.a", "a.c.o", "b.c.o", "c.c.o", "d.c.o"]
+    ]
+
+
+def test_build_keeps_archive_when_only_dependency_changed(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that rebuilding a dependency does not rewrite a dependent archive."""
+    os.chdir(tmp_path)
+    _write_library_of_four(tmp_path)
+    assert build() == (0, "")
+
+    record = mocker.spy(_Builder, "_record")
+    _edit(tmp_path / "base.c")
+    assert build() == (0, "")
+
+    assert _archive_runs(record, "mylib.a") == []
+    assert _archive_runs(record, "base.a") == [["-rc", "base.a", "base.c.o"]]
+    links = [call.args[1].job.kind for call in record.call_args_list]
+    assert "ccld" in links
+
+
+def _use_thin_archives(tmp_path: Path) -> None:
+    build_file = tmp_path / "build.ezbuild"
+    build_file.write_text(
+        build_file.read_text().replace(
+            "env = Environment()\n",
+            'env = Environment()\nenv["ARCHIVE_MODE"] = ArchiveMode.THIN\n',
+        )
+    )
+
+
+def test_build_deletes_removed_thin_archive_members(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that members of thin archives are deleted by their path."""
+    os.chdir(tmp_path)
+    _write_library_of_four(tmp_path)
+    _use_thin_archives(tmp_path)
+    assert build() == (0, "")
+
+    record = mocker.spy(_Builder, "_record")
+    _write_library_of_four(tmp_path, sources="abc")
+    _use_thin_archives(tmp_path)
+    assert build() == (0, "")
+
+    assert _archive_runs(record, "mylib.a") == [["-dsP", "mylib.a", "d.c.o"]]
+    archive = tmp_path / "build" / "lib" / "mylib.a"
+    assert [Path(member).name for member in _members(archive)] == [
+        "a.c.o",
+        "b.c.o",
+        "c.c.o",
+    ]
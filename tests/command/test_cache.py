@@ -0,0 +1,108 @@
+from socket import socket
+from typing import TYPE_CHECKING
+
+from ezbuild.cache import ObjectCache
+from ezbuild.commands.cache import cache_clear, cache_serve, cache_stats, cache_trim
+from ezbuild.python_environment import PythonEnvironment
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def _cache(tmp_path: Path, mocker: MockerFixture, entries: int) -> ObjectCache:
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "cache")
+    mocker.patch.object(PythonEnvironment, "_cache_max_size", "")
+    cache = ObjectCache(tmp_path / "cache")
+    obj = tmp_path / "entry.o"
+    obj.write_bytes(b"x" * 1024)
+    for i in range(entries):
+        cache.put(f"{i:02x}" * 32, str(obj))
+    return cache
+
+
+def test_cache_stats_empty(tmp_path: Path, mocker: MockerFixture) -> None:
+    _cache(tmp_path, mocker, 0)
+    info = mocker.patch("ezbuild.commands.cache.info")
+
+    assert cache_stats() == (0, "")
+    messages = [call.args[0] for call in info.call_args_list]
+    assert f"Cache directory: {tmp_path / 'cache'}" in messages
+    assert "Entries: 0 (0 B of 5.0 GiB)" in messages
+    assert "No evictions" in messages
+
+
+def test_cache_stats_reports_counters(tmp_path: Path, mocker: MockerFixture) -> None:
+    cache = _cache(tmp_path, mocker, 4)
+    cache.hits, cache.misses, cache.bytes_saved = 3, 1, 2048
+    cache.close()
+    cache.trim(2048)
+    info = mocker.patch("ezbuild.commands.cache.info")
+
+    assert cache_stats() == (0, "")
+    messages = [call.args[0] for call in info.call_args_list]
+    assert "Entries: 1 (1.0 KiB of 5.0 GiB)" in messages
+    assert "Hits: 3, misses: 1 (hit rate 75.0%)" in messages
+    assert "Bytes saved: 2.0 KiB" in messages
+    assert "Evictions:" in messages
+    assert messages[-1].endswith(": 3 entries, 3.0 KiB")
+
+
+def test_cache_trim(tmp_path: Path, mocker: MockerFixture) -> None:
+    cache = _cache(tmp_path, mocker, 4)
+
+    assert cache_trim(max_size="2K") == (0, "")
+    assert cache.size() == (1, 1024)
+
+
+def test_cache_trim_uses_configured_max_size(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    cache = _cache(tmp_path, mocker, 4)
+    mocker.patch.object(PythonEnvironment, "_cache_max_size", "3K")
+
+    assert cache_trim() == (0, "")
+    assert cache.size() == (2, 2048)
+
+
+def test_cache_trim_invalid_size(tmp_path: Path, mocker: MockerFixture) -> None:
+    cache = _cache(tmp_path, mocker, 1)
+
+    assert cache_trim(max_size="lots") == (1, "Invalid size: lots")
+    assert cache.size() == (1, 1024)
+
+
+def test_cache_clear(tmp_path: Path, mocker: MockerFixture) -> None:
+    _cache(tmp_path, mocker, 2)
+
+    cache_clear()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_cache_clear_empty(tmp_path: Path, mocker: MockerFixture) -> None:
+    _cache(tmp_path, mocker, 0)
+    info = mocker.patch("ezbuild.commands.cache.info")
+
+    cache_clear()
+    info.assert_called_once_with("Cache is already empty")
+
+
+def test_cache_serve_address_in_use(tmp_path: Path) -> None:
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        port = sock.getsockname()[1]
+
+        exit_code, message = cache_serve(port=port, directory=str(tmp_path))
+    assert exit_code == 1
+    assert message.startswith(f"Could not listen on 127.0.0.1:{port}")
+
+
+def test_cache_serve_default_directory(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that clearing the local cache does not remove the served entries."""
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "ezbuild")
+    server = mocker.patch("ezbuild.commands.cache.CacheServer")
+
+    assert cache_serve() == (0, "")
+    server.assert_called_once_with(("127.0.0.1", 8765), tmp_path / "ezbuild-server")
@@ -0,0 +1,171 @@
+import json
+import os
+from shutil import which
+from subprocess import run
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ezbuild.commands.generate import generate
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _write_project(tmp_path: Path) -> None:
+    (tmp_path / "build.ezbuild").write_text(
+        """
+env = Environment()
+mylib = StaticLibrary(
+    name="mylib",
+    languages=[Language.C],
+    sources=["lib.c", "lib.h"],
+    public_defines=["USE_LIB"]
+)
+shared = SharedLibrary(
+    name="myshared",
+    languages=[Language.C],
+    sources=["shared.c"]
+)
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"],
+    dependencies=["mylib", "shared"]
+)
+"""
+    )
+    (tmp_path / "lib.h").write_text("int one(void);\n")
+    (tmp_path / "lib.c").write_text('#include "lib.h"\nint one(void) { return 1; }')
+    (tmp_path / "shared.c").write_text("int two(void) { return 2; }")
+    (tmp_path / "main.c").write_text(
+        '#include "lib.h"\n'
+        "int two(void);\n"
+        "int main(void) { return USE_LIB + one() + two() - 4; }"
+    )
+
+
+def _ninja_file(tmp_path: Path) -> str:
+    return (tmp_path / "build" / "build.ninja").read_text()
+
+
+def test_generate_requires_generator(tmp_path: Path) -> None:
+    """Test that generate without a generator fails."""
+    os.chdir(tmp_path)
+    _write_project(tmp_path)
+
+    assert generate() == (11, "No generator selected, use --ninja")
+    assert not (tmp_path / "build").exists()
+
+
+def test_generate_no_build_file(tmp_path: Path) -> None:
+    """Test that generate fails without build.ezbuild."""
+    os.chdir(tmp_path)
+    assert generate(ninja=True) == (1, "build.ezbuild does not exist")
+
+
+def test_generate_ninja_statements(tmp_path: Path) -> None:
+    """Test the build statements written for every kind of target."""
+    os.chdir(tmp_path)
+    _write_project(tmp_path)
+
+    assert generate(ninja=True, link_jobs=3) == (0, "")
+    ninja = _ninja_file(tmp_path)
+    build_dir = tmp_path / "build"
+
+    assert "pool link_pool\n  depth = 3\n" in ninja
+    assert "  deps = gcc\n" in ninja
+    assert (
+        f"build {build_dir}/mylib/lib.c.o: cc {tmp_path}/lib.c\n"
+        f"  cflags = -DUSE_LIB\n"
+        f"  depfile = {build_dir}/mylib/lib.c.d\n"
+    ) in ninja
+    assert f"build {build_dir}/lib/mylib.a: ar {build_dir}/mylib/lib.c.o\n" in ninja
+    assert (
+        f"build {build_dir}/lib/myshared.so: ccld {build_dir}/myshared/shared.c.o\n"
+        "  ldshared = -shared\n"
+    ) in ninja
+    assert (
+        f"build {build_dir}/bin/myapp: ccld {build_dir}/myapp/main.c.o "
+        f"{build_dir}/lib/mylib.a {build_dir}/lib/myshared.so\n"
+    ) in ninja
+    assert f"build shared: phony {build_dir}/lib/myshared.so\n" in ninja
+    assert f"build myshared: phony {build_dir}/lib/myshared.so\n" in ninja
+    assert "--link-jobs 3" in ninja
+    assert f"build build.ninja: regenerate | {tmp_path}/build.ezbuild\n" in ninja
+    assert ninja.endswith(
+        f"default {build_dir}/lib/mylib.a {build_dir}/lib/myshared.so "
+        f"{build_dir}/bin/myapp\n"
+    )
+    # Headers are not compiled; ninja learns about them from depfiles.
+    assert "lib.h" not in ninja
+
+
+def test_generate_writes_compile_commands(tmp_path: Path) -> None:
+    """Test that generate writes the same compile_commands.json as build."""
+    os.chdir(tmp_path)
+    _write_project(tmp_path)
+
+    assert generate(ninja=True) == (0, "")
+    with (tmp_path / "build" / "compile_commands.json").open() as f:
+        compile_commands = json.load(f)
+    assert sorted(entry["output"] for entry in compile_commands) == [
+        str(tmp_path / "build" / "myapp" / "main.c.o"),
+        str(tmp_path / "build" / "mylib" / "lib.c.o"),
+        str(tmp_path / "build" / "myshared" / "shared.c.o"),
+    ]
+
+
+def test_generate_cyclic_dependency(tmp_path: Path) -> None:
+    """Test that generate reports cyclic dependencies."""
+    os.chdir(tmp_path)
+    (tmp_path / "build.ezbuild").write_text(
+        """
+env = Environment()
+a = StaticLibrary(name="a", languages=[Language.C], sources=["a.c"], dependencies=["b"])
+b = StaticLibrary(name="b", languages=[Language.C], sources=["b.c"], dependencies=["a"])
+"""
+    )
+    exit_code, _ = generate(ninja=True)
+    assert exit_code == 5
+
+
+@pytest.mark.skipif(which("ninja") is None, reason="ninja is not installed")
+def test_generate_ninja_builds(tmp_path: Path) -> None:
+    """Test that ninja builds the generated manifest and tracks headers."""
+    os.chdir(tmp_path)
+    _write_project(tmp_path)
+    assert generate(ninja=True) == (0, "")
+
+    result = run(["ninja", "-C", "build"], capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout
+    env = {**os.environ, "LD_LIBRARY_PATH": str(tmp_path / "build" / "lib")}
+    assert run([tmp_path / "build" / "bin" / "myapp"], env=env).returncode == 0
+
+    result = run(["ninja", "-C", "build"], capture_output=True, text=True)
+    assert "no work to do" in result.stdout
+
+    (tmp_path / "lib.h").write_text("int one(void);\n\n")
+    result = run(["ninja", "-C", "build"], capture_output=True, text=True)
+    assert "CC" in result.stdout
+    assert "shared.c" not in result.stdout
+
+
+def test_generate_ninja_thin_archive(tmp_path: Path) -> None:
+    """Test that archive modes other than ranlib index in the ar step."""
+    os.chdir(tmp_path)
+    _write_project(tmp_path)
+    build_file = tmp_path / "build.ezbuild"
+    build_file.write_text(
+        build_file.read_text().replace(
+            'public_defines=["USE_LIB"]',
+            'public_defines=["USE_LIB"],\n    archive_mode=ArchiveMode.THIN',
+        )
+    )
+
+    assert generate(ninja=True) == (0, "")
+    build_dir = tmp_path / "build"
+    assert (
+        f"build {build_dir}/lib/mylib.a: ar_indexed {build_dir}/mylib/lib.c.o\n"
+        "  arflags = -rcsT\n"
+    ) in _ninja_file(tmp_path)
@@ -0,0 +1,122 @@
+from typing import TYPE_CHECKING
+
+from ezbuild import build_log
+from ezbuild.build_log import LOG_FILE, BuildLog, LogEntry
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def _entry(output: str = "main.o", kind: str = "cc", status: int = 0) -> LogEntry:
+    return LogEntry(
+        output=output,
+        kind=kind,
+        start=1_000,
+        end=3_500,
+        command="abc123",
+        status=status,
+    )
+
+
+def test_log_entry_format_and_parse() -> None:
+    entry = _entry(output="/my dir/main.o")
+    assert entry.format() == "1000\t3500\t0\tcc\tabc123\t/my dir/main.o"
+    assert LogEntry.parse(entry.format() + "\n") == entry
+    assert entry.duration == 2.5
+
+
+def test_log_entry_parse_malformed() -> None:
+    assert LogEntry.parse("") is None
+    assert LogEntry.parse("1\t2\t0\tcc\tabc") is None
+    assert LogEntry.parse("one\t2\t0\tcc\tabc\tmain.o") is None
+
+
+def test_load_missing_log(tmp_path: Path) -> None:
+    log = BuildLog.load(tmp_path)
+    assert log.path == tmp_path / LOG_FILE
+    assert log.entries == {}
+
+
+def test_save_and_load_roundtrip(tmp_path: Path) -> None:
+    log = BuildLog.load(tmp_path)
+    log.record(_entry())
+    log.record(_entry(output="app", kind="ccld"))
+    log.save()
+
+    loaded = BuildLog.load(tmp_path)
+    assert loaded.entries == {
+        ("main.o", "cc"): _entry(),
+        ("app", "ccld"): _entry(output="app", kind="ccld"),
+    }
+
+
+def test_save_appends_to_existing_log(tmp_path: Path) -> None:
+    log = BuildLog.load(tmp_path)
+    log.record(_entry())
+    log.save()
+
+    log = BuildLog.load(tmp_path)
+    log.record(_entry(status=1))
+    log.save()
+
+    lines = (tmp_path / LOG_FILE).read_text().splitlines()
+    assert len(lines) == 3
+    assert BuildLog.load(tmp_path).entries[("main.o", "cc")].status == 1
+
+
+def test_save_without_entries_does_not_write(tmp_path: Path) -> None:
+    BuildLog.load(tmp_path).save()
+    assert not (tmp_path / LOG_FILE).exists()
+
+
+def test_load_ignores_other_versions(tmp_path: Path) -> None:
+    (tmp_path / LOG_FILE).write_text(f"# ezbuild log v0\n{_entry().format()}\n")
+    log = BuildLog.load(tmp_path)
+    assert log.entries == {}
+
+    log.record(_entry(output="other.o"))
+    log.save()
+    assert (tmp_path / LOG_FILE).read_text().splitlines()[0] == "# ezbuild log v1"
+    assert list(BuildLog.load(tmp_path).entries) == [("other.o", "cc")]
+
+
+def test_load_skips_malformed_lines(tmp_path: Path) -> None:
+    (tmp_path / LOG_FILE).write_text(
+        f"# ezbuild log v1\ngarbage\n{_entry().format()}\n"
+    )
+    assert list(BuildLog.load(tmp_path).entries) == [("main.o", "cc")]
+
+
+def test_duration(tmp_path: Path) -> None:
+    log = BuildLog.load(tmp_path)
+    log.record(_entry())
+    log.record(_entry(output="bad.o", status=1))
+    assert log.duration("main.o", "cc") == 2.5
+    assert log.duration("main.o", "cxx") is None
+    assert log.duration("bad.o", "cc") is None
+
+
+def test_save_compacts_long_log(tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch.object(build_log, "_COMPACT_LINES", 6)
+    for _ in range(3):
+        log = BuildLog.load(tmp_path)
+        log.record(_entry())
+        log.record(_entry(output="app", kind="ccld"))
+        log.save()
+
+    assert len((tmp_path / LOG_FILE).read_text().splitlines()) == 3
+
+
+def test_typical_duration(tmp_path: Path) -> None:
+    log = BuildLog.load(tmp_path)
+    assert log.typical_duration("cc") is None
+
+    log.record(_entry())
+    log.record(
+        LogEntry(output="b.o", kind="cc", start=0, end=500, command="", status=0)
+    )
+    log.record(_entry(output="bad.o", status=1))
+    log.record(_entry(output="app", kind="ccld"))
+    assert log.typical_duration("cc") == 1.5
@@ -0,0 +1,187 @@
+import os
+from typing import TYPE_CHECKING
+
+from ezbuild.build_state import STATE_FILE, BuildState, command_hash, file_hash
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _set_mtime(path: Path, seconds: int) -> None:
+    os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+
+def test_file_hash(tmp_path: Path) -> None:
+    path = tmp_path / "file.c"
+    path.write_text("int x;")
+    other = tmp_path / "other.c"
+    other.write_text("int x;")
+    assert file_hash(str(path)) == file_hash(str(other))
+
+    other.write_text("int y;")
+    assert file_hash(str(path)) != file_hash(str(other))
+
+
+def test_load_missing_state(tmp_path: Path) -> None:
+    state = BuildState.load(tmp_path)
+    assert state.path == tmp_path / STATE_FILE
+    assert state.entries == {}
+
+
+def test_load_corrupt_state(tmp_path: Path) -> None:
+    (tmp_path / STATE_FILE).write_text("{not json")
+    state = BuildState.load(tmp_path)
+    assert state.entries == {}
+
+
+def test_save_and_load_roundtrip(tmp_path: Path) -> None:
+    state = BuildState.load(tmp_path)
+    state.record("out.o", ["main.c"])
+    state.save()
+
+    loaded = BuildState.load(tmp_path)
+    assert loaded.entries == {"out.o": {"inputs": ["main.c"]}}
+
+
+def test_unknown_output_is_not_up_to_date(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    output = tmp_path / "main.c.o"
+    source.write_text("int main() { return 0; }")
+    output.write_text("")
+
+    state = BuildState.load(tmp_path)
+    assert not state.is_up_to_date(str(output), [str(source)])
+
+
+def test_output_newer_than_inputs_is_up_to_date(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    output = tmp_path / "main.c.o"
+    source.write_text("int main() { return 0; }")
+    output.write_text("")
+    _set_mtime(source, 100)
+    _set_mtime(output, 200)
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(source)])
+    assert state.is_up_to_date(str(output), [str(source)])
+
+
+def test_input_newer_than_output_is_stale(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    output = tmp_path / "main.c.o"
+    source.write_text("int main() { return 0; }")
+    output.write_text("")
+    _set_mtime(source, 300)
+    _set_mtime(output, 200)
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(source)])
+    assert not state.is_up_to_date(str(output), [str(source)])
+
+
+def test_missing_output_is_stale(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    source.write_text("int main() { return 0; }")
+
+    state = BuildState.load(tmp_path)
+    state.record(str(tmp_path / "main.c.o"), [str(source)])
+    assert not state.is_up_to_date(str(tmp_path / "main.c.o"), [str(source)])
+
+
+def test_missing_input_is_stale(tmp_path: Path) -> None:
+    output = tmp_path / "main.c.o"
+    output.write_text("")
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(tmp_path / "main.c")])
+    assert not state.is_up_to_date(str(output), [str(tmp_path / "main.c")])
+
+
+def test_changed_inputs_are_stale(tmp_path: Path) -> None:
+    a = tmp_path / "a.o"
+    b = tmp_path / "b.o"
+    output = tmp_path / "app"
+    for path in [a, b]:
+        path.write_text("")
+        _set_mtime(path, 100)
+    output.write_text("")
+    _set_mtime(output, 200)
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(a), str(b)])
+    assert state.is_up_to_date(str(output), [str(a), str(b)])
+    assert not state.is_up_to_date(str(output), [str(a)])
+
+
+def test_hash_ignores_touched_input(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    output = tmp_path / "main.c.o"
+    source.write_text("int main() { return 0; }")
+    output.write_text("")
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(source)], use_hash=True)
+    _set_mtime(output, 200)
+    _set_mtime(source, 300)
+
+    assert state.is_up_to_date(str(output), [str(source)], use_hash=True)
+    assert not state.is_up_to_date(str(output), [str(source)])
+
+    source.write_text("int main() { return 1; }")
+    _set_mtime(source, 300)
+    assert not state.is_up_to_date(str(output), [str(source)], use_hash=True)
+
+
+def test_recorded_dependency_newer_than_output_is_stale(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    header = tmp_path / "lib.h"
+    output = tmp_path / "main.c.o"
+    for path in [source, header, output]:
+        path.write_text("")
+    _set_mtime(source, 100)
+    _set_mtime(header, 100)
+    _set_mtime(output, 200)
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(source)], deps=[str(header)])
+    assert state.is_up_to_date(str(output), [str(source)])
+
+    _set_mtime(header, 300)
+    assert not state.is_up_to_date(str(output), [str(source)])
+
+
+def test_missing_recorded_dependency_is_stale(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    output = tmp_path / "main.c.o"
+    source.write_text("")
+    output.write_text("")
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(source)], deps=[str(tmp_path / "gone.h")])
+    assert not state.is_up_to_date(str(output), [str(source)])
+
+
+def test_command_hash() -> None:
+    assert command_hash(["cc", "-c", "a.c"]) == command_hash(["cc", "-c", "a.c"])
+    assert command_hash(["cc", "-c", "a.c"]) != command_hash(["cc", "-c", "b.c"])
+    assert command_hash(["cc", "-DA B"]) != command_hash(["cc", "-DA", "B"])
+    assert command_hash(["ar"], ["ranlib"]) != command_hash(["ar", "ranlib"])
+
+
+def test_changed_command_is_stale(tmp_path: Path) -> None:
+    source = tmp_path / "main.c"
+    output = tmp_path / "main.c.o"
+    source.write_text("")
+    output.write_text("")
+    _set_mtime(source, 100)
+    _set_mtime(output, 200)
+
+    old = command_hash(["cc", "-c", str(source)])
+    new = command_hash(["cc", "-DDEBUG", "-c", str(source)])
+
+    state = BuildState.load(tmp_path)
+    state.record(str(output), [str(source)], command=old)
+    assert state.is_up_to_date(str(output), [str(source)], command=old)
+    assert not state.is_up_to_date(str(output), [str(source)], command=new)
+    # Callers that do not fingerprint commands only check timestamps.
+    assert state.is_up_to_date(str(output), [str(source)])
@@ -0,0 +1,362 @@
+import os
+from os import utime
+from shutil import which
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ezbuild.cache import (
+    DEFAULT_MAX_SIZE,
+    CacheStats,
+    ObjectCache,
+    compiler_identity,
+    configured_max_size,
+    format_size,
+    normalize_argv,
+    parse_size,
+    preprocess_argv,
+)
+from ezbuild.executor import Job
+from ezbuild.python_environment import PythonEnvironment
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def _compile_job(tmp_path: Path, source: str = "main.c") -> Job:
+    output = str(tmp_path / f"{source}.o")
+    depfile = str(tmp_path / f"{source}.d")
+    return Job(
+        argv=[
+            "cc",
+            "-DVALUE=1",
+            "-MMD",
+            "-MF",
+            depfile,
+            "-c",
+            "-o",
+            output,
+            str(tmp_path / source),
+        ],
+        output=output,
+        kind="cc",
+        depfile=depfile,
+    )
+
+
+def test_preprocess_argv() -> None:
+    argv = ["cc", "-DA", "-c", "-o", "main.o", "main.c"]
+    assert preprocess_argv(argv, "main.o") == ["cc", "-DA", "-E", "main.c"]
+
+
+def test_normalize_argv_drops_output_paths() -> None:
+    argv = ["cc", "-DA", "-MMD", "-MF", "main.d", "-c", "-o", "main.o", "main.c"]
+    assert normalize_argv(argv, "main.o", "main.d") == [
+        "-DA",
+        "-MMD",
+        "-c",
+        "main.c",
+    ]
+
+
+def test_normalize_argv_keeps_unrelated_flags() -> None:
+    argv = ["cc", "-o", "other.o", "main.c"]
+    assert normalize_argv(argv, "main.o", "main.d") == ["-o", "other.o", "main.c"]
+
+
+def test_compiler_identity_changes_with_compiler(tmp_path: Path) -> None:
+    compiler = tmp_path / "fake-cc"
+    compiler.write_text("#!/bin/sh\n")
+    before = compiler_identity(str(compiler))
+    assert before.startswith(str(compiler.resolve()))
+
+    compiler.write_text("#!/bin/sh\nexit 0\n")
+    assert compiler_identity(str(compiler)) != before
+
+
+def test_compiler_identity_resolves_from_path() -> None:
+    assert compiler_identity("cc").startswith("/")
+    assert which("cc") is not None
+
+
+def test_object_cache_put_and_get(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    obj = tmp_path / "main.o"
+    obj.write_bytes(b"object")
+
+    assert not cache.get("ab" * 32, str(tmp_path / "restored.o"))
+
+    cache.put("ab" * 32, str(obj))
+    assert cache.entry_path("ab" * 32).exists()
+    assert cache.get("ab" * 32, str(tmp_path / "restored.o"))
+    assert (tmp_path / "restored.o").read_bytes() == b"object"
+
+
+def test_object_cache_put_skips_temp_files_of_other_builds(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    obj = tmp_path / "main.o"
+    obj.write_bytes(b"object")
+    entry = cache.entry_path("ab" * 32)
+    entry.parent.mkdir(parents=True)
+    # Another build is writing the same entry through this temp file.
+    other = entry.with_name(f"{entry.name}.0000.tmp")
+    other.write_bytes(b"obj")
+    mocker.patch("ezbuild.cache.token_hex", side_effect=["0000", "0001"])
+
+    cache.put("ab" * 32, str(obj))
+    assert entry.read_bytes() == b"object"
+    assert other.read_bytes() == b"obj"
+
+
+def test_object_cache_key_depends_on_preprocessed_source(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    job = _compile_job(tmp_path)
+    assert cache.key(job, b"int a;") == cache.key(job, b"int a;")
+    assert cache.key(job, b"int a;") != cache.key(job, b"int b;")
+
+
+def test_object_cache_key_ignores_output_location(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    (tmp_path / "one").mkdir()
+    (tmp_path / "two").mkdir()
+    one = _compile_job(tmp_path / "one")
+    two = _compile_job(tmp_path / "two")
+    two.argv[-1] = one.argv[-1]
+    assert cache.key(one, b"int a;") == cache.key(two, b"int a;")
+
+
+def test_object_cache_key_depends_on_flags(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    job = _compile_job(tmp_path)
+    other = _compile_job(tmp_path)
+    other.argv[1] = "-DVALUE=2"
+    assert cache.key(job, b"int a;") != cache.key(other, b"int a;")
+
+
+def test_object_cache_run_miss_then_hit(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    (tmp_path / "main.c").write_text("int value(void) { return VALUE; }")
+    job = _compile_job(tmp_path)
+
+    result = cache.run(job)
+    assert result.returncode == 0
+    assert not result.cached
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    obj = tmp_path / "main.c.o"
+    content = obj.read_bytes()
+    obj.unlink()
+    (tmp_path / "main.c.d").unlink()
+
+    result = cache.run(job)
+    assert result.returncode == 0
+    assert result.cached
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert obj.read_bytes() == content
+    assert (tmp_path / "main.c.d").exists()
+
+
+def test_object_cache_run_compile_error(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    (tmp_path / "main.c").write_text("int value(void) { return }")
+
+    result = cache.run(_compile_job(tmp_path))
+    assert result.returncode != 0
+    assert "error" in result.stderr
+    assert not (tmp_path / "cache" / "objects").exists()
+
+
+def test_object_cache_run_missing_header(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    (tmp_path / "main.c").write_text('#include "missing.h"\n')
+
+    result = cache.run(_compile_job(tmp_path))
+    assert result.returncode != 0
+    assert "missing.h" in result.stderr
+    assert cache.misses == 0
+
+
+def _link_job(tmp_path: Path) -> Job:
+    (tmp_path / "main.c").write_text("int main(void) { return 0; }")
+    compile_job = _compile_job(tmp_path)
+    assert ObjectCache(tmp_path / "objects").run(compile_job).returncode == 0
+
+    output = str(tmp_path / "app")
+    return Job(
+        argv=["cc", "-o", output, compile_job.output],
+        output=output,
+        kind="ccld",
+        inputs=[compile_job.output],
+    )
+
+
+def test_object_cache_link_key_depends_on_inputs(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    job = _link_job(tmp_path)
+    key = cache.link_key(job)
+    assert cache.link_key(job) == key
+
+    obj = tmp_path / "main.c.o"
+    obj.write_bytes(obj.read_bytes() + b"\0")
+    assert cache.link_key(job) != key
+
+
+def test_object_cache_run_link_restores_executable(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    job = _link_job(tmp_path)
+
+    assert not cache.run(job).cached
+    app = tmp_path / "app"
+    content = app.read_bytes()
+    app.unlink()
+
+    result = cache.run(job)
+    assert result.cached
+    assert app.read_bytes() == content
+    assert os.access(app, os.X_OK)
+
+
+def test_object_cache_run_uncached_kind(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    archive = tmp_path / "lib.a"
+    archive.write_bytes(b"!<arch>\n")
+
+    result = cache.run(
+        Job(argv=["ranlib", str(archive)], output=str(archive), kind="ranlib")
+    )
+    assert result.returncode == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def _fill(cache: ObjectCache, tmp_path: Path, count: int, size: int) -> list[str]:
+    """Store count entries of size bytes, the first one least recently used."""
+    obj = tmp_path / "entry.o"
+    obj.write_bytes(b"x" * size)
+    keys = [f"{i:02x}" * 32 for i in range(count)]
+    for i, key in enumerate(keys):
+        cache.put(key, str(obj))
+        utime(cache.entry_path(key), ns=(i * 10**9, i * 10**9))
+    return keys
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [
+        ("100", 100),
+        ("1K", 1024),
+        ("512M", 512 * 1024**2),
+        ("5G", 5 * 1024**3),
+        ("5GiB", 5 * 1024**3),
+        ("1.5k", 1536),
+    ],
+)
+def test_parse_size(size: str, expected: int) -> None:
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ["", "G", "five", "-1G"])
+def test_parse_size_invalid(size: str) -> None:
+    with pytest.raises(ValueError, match="Invalid size"):
+        parse_size(size)
+
+
+def test_format_size() -> None:
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KiB"
+    assert format_size(5 * 1024**3) == "5.0 GiB"
+
+
+def test_configured_max_size(mocker: MockerFixture) -> None:
+    mocker.patch.object(PythonEnvironment, "_cache_max_size", "")
+    assert configured_max_size() == DEFAULT_MAX_SIZE
+
+    mocker.patch.object(PythonEnvironment, "_cache_max_size", "1M")
+    assert configured_max_size() == 1024**2
+
+    mocker.patch.object(PythonEnvironment, "_cache_max_size", "lots")
+    assert configured_max_size() == DEFAULT_MAX_SIZE
+
+
+def test_cache_stats_hit_rate() -> None:
+    assert CacheStats().hit_rate == 0.0
+    assert CacheStats(hits=3, misses=1).hit_rate == 0.75
+
+
+def test_object_cache_size(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    assert cache.size() == (0, 0)
+
+    _fill(cache, tmp_path, 3, 100)
+    assert cache.size() == (3, 300)
+
+
+def test_object_cache_trim_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    keys = _fill(cache, tmp_path, 10, 100)
+
+    assert cache.trim(500) == (6, 600)
+    assert [cache.entry_path(key).exists() for key in keys] == [False] * 6 + [True] * 4
+
+    evictions = cache.stats().evictions
+    assert len(evictions) == 1
+    assert evictions[0]["entries"] == 6
+    assert evictions[0]["bytes"] == 600
+
+
+def test_object_cache_trim_within_limit(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    _fill(cache, tmp_path, 3, 100)
+
+    assert cache.trim(300) == (0, 0)
+    assert cache.size() == (3, 300)
+    assert cache.stats().evictions == []
+
+
+def test_object_cache_hit_marks_entry_used(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    keys = _fill(cache, tmp_path, 3, 100)
+
+    assert cache.get(keys[0], str(tmp_path / "restored.o"))
+    cache.trim(200)
+    assert cache.entry_path(keys[0]).exists()
+    assert not cache.entry_path(keys[1]).exists()
+
+
+def test_object_cache_close_accumulates_stats(tmp_path: Path) -> None:
+    for hits, misses in [(1, 2), (3, 0)]:
+        cache = ObjectCache(tmp_path / "cache")
+        cache.hits, cache.misses, cache.bytes_saved = hits, misses, 100
+        cache.close()
+
+    stats = ObjectCache(tmp_path / "cache").stats()
+    assert (stats.hits, stats.misses, stats.bytes_saved) == (4, 2, 200)
+
+
+def test_object_cache_start_trim(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    _fill(cache, tmp_path, 4, 100)
+
+    cache.start_trim(200)
+    cache.close()
+    assert cache.size() == (1, 100)
+
+
+def test_object_cache_stats_unreadable(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / "stats.json").write_text("not json")
+    assert cache.stats() == CacheStats()
+
+
+def test_object_cache_clear(tmp_path: Path) -> None:
+    cache = ObjectCache(tmp_path / "cache")
+    _fill(cache, tmp_path, 2, 100)
+    cache.close()
+
+    cache.clear()
+    assert not (tmp_path / "cache").exists()
+    assert cache.size() == (0, 0)
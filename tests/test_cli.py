@@ -155,6 +155,192 @@ def test_clean_removes_nested_files(tmp_path) -> None:
         assert not build_dir.exists()
 
 
+@pytest.mark.parametrize("flag", ["-j", "--jobs"])
+def test_build_jobs(tmp_path, flag: str) -> None:
+    """Test build command with an explicit number of jobs."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+myapp = Program(
+    name="myapp",
+    languages=[Language.C],
+    sources=["main.c"]
+)
+"""
+        )
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(cli, ["build", flag, "2"])
+        assert result.exit_code == 0
+        assert (Path.cwd() / "build" / "bin" / "myapp").exists()
+
+
+def test_build_trace(tmp_path) -> None:
+    """Test build command writes a trace with --trace."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+myapp = Program(name="myapp", languages=[Language.C], sources=["main.c"])
+"""
+        )
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(cli, ["build", "--trace", "trace.json"])
+        assert result.exit_code == 0
+        assert (Path.cwd() / "trace.json").exists()
+
+
+def test_build_stats(tmp_path) -> None:
+    """Test build command prints a summary with --stats."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+myapp = Program(name="myapp", languages=[Language.C], sources=["main.c"])
+"""
+        )
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(cli, ["build", "--stats"])
+        assert result.exit_code == 0
+        assert "Slowest compiles:" in result.output
+
+
+def test_build_link_jobs(tmp_path) -> None:
+    """Test build command with a separate limit for links."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+myapp = Program(name="myapp", languages=[Language.C], sources=["main.c"])
+"""
+        )
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(
+            cli, ["build", "--link-jobs", "1", "--link-memory", "512M"]
+        )
+        assert result.exit_code == 0
+
+
+def test_build_load_average(tmp_path) -> None:
+    """Test build command with a load average limit."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+myapp = Program(name="myapp", languages=[Language.C], sources=["main.c"])
+"""
+        )
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(cli, ["build", "-l", "1000"])
+        assert result.exit_code == 0
+
+
+def test_build_keep_going(tmp_path) -> None:
+    """Test build command builds independent targets with -k."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+broken = Program(name="broken", languages=[Language.C], sources=["broken.c"])
+myapp = Program(name="myapp", languages=[Language.C], sources=["main.c"])
+"""
+        )
+        (Path.cwd() / "broken.c").write_text("int main(void) { return }")
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(cli, ["build", "-k"])
+        assert result.exit_code == 6
+        assert "Failed steps:" in result.output
+        assert (Path.cwd() / "build" / "bin" / "myapp").exists()
+
+
+def test_build_named_targets(tmp_path) -> None:
+    """Test build command with several target names."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+one = Program(name="one", languages=[Language.C], sources=["main.c"])
+two = Program(name="two", languages=[Language.C], sources=["main.c"])
+three = Program(name="three", languages=[Language.C], sources=["main.c"])
+"""
+        )
+        (Path.cwd() / "main.c").write_text("int main(void) { return 0; }")
+
+        result = runner.invoke(cli, ["build", "one", "three"])
+        assert result.exit_code == 0
+        bin_dir = Path.cwd() / "build" / "bin"
+        assert sorted(path.name for path in bin_dir.iterdir()) == ["one", "three"]
+
+        result = runner.invoke(cli, ["build", "four"])
+        assert result.exit_code == 10
+
+
+def test_generate_ninja(tmp_path) -> None:
+    """Test generate command writes build.ninja."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        from pathlib import Path
+
+        (Path.cwd() / "build.ezbuild").write_text(
+            """
+env = Environment()
+myapp = Program(name="myapp", languages=[Language.C], sources=["main.c"])
+"""
+        )
+
+        result = runner.invoke(cli, ["generate", "--ninja"])
+        assert result.exit_code == 0
+        assert (Path.cwd() / "build" / "build.ninja").exists()
+
+        result = runner.invoke(cli, ["generate"])
+        assert result.exit_code == 11
+
+
+def test_build_invalid_jobs(tmp_path) -> None:
+    """Test build command rejects a non-positive number of jobs."""
+    with runner.isolated_filesystem(temp_dir=tmp_path):
+        result = runner.invoke(cli, ["build", "-j", "0"])
+        assert result.exit_code == 2
+
+
+def test_cache_commands(tmp_path, mocker) -> None:
+    """Test the cache sub-commands against an empty cache."""
+    from ezbuild.python_environment import PythonEnvironment
+
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "cache")
+    for args in [["stats"], ["trim", "--max-size", "1M"], ["clear"]]:
+        result = runner.invoke(cli, ["cache", *args])
+        assert result.exit_code == 0
+
+
+def test_cache_trim_invalid_size(tmp_path, mocker) -> None:
+    """Test cache trim rejects an invalid size."""
+    from ezbuild.python_environment import PythonEnvironment
+
+    mocker.patch.object(PythonEnvironment, "_cache_dir", tmp_path / "cache")
+    result = runner.invoke(cli, ["cache", "trim", "--max-size", "lots"])
+    assert result.exit_code == 1
+
+
 def test_run_builds_then_runs(tmp_path) -> None:
     """Test run command builds and runs a C program."""
     with runner.isolated_filesystem(temp_dir=tmp_path):
@@ -6,6 +6,7 @@ from ezbuild.compile_command import CompileCommand
 def test_default_values() -> None:
     cmd = CompileCommand()
     assert cmd.directory == ""
+    assert cmd.arguments == []
     assert cmd.command == ""
     assert cmd.file == ""
     assert cmd.output == ""
@@ -14,11 +15,12 @@ def test_default_values() -> None:
 def test_custom_values() -> None:
     cmd = CompileCommand(
         directory="/build",
-        command="gcc -c main.c",
+        arguments=["gcc", "-c", "main.c"],
         file="main.c",
         output="main.o",
     )
     assert cmd.directory == "/build"
+    assert cmd.arguments == ["gcc", "-c", "main.c"]
     assert cmd.command == "gcc -c main.c"
     assert cmd.file == "main.c"
     assert cmd.output == "main.o"
@@ -27,7 +29,7 @@ def test_custom_values() -> None:
 def test_partial_values() -> None:
     cmd = CompileCommand(directory="/build", file="main.c")
     assert cmd.directory == "/build"
-    assert cmd.command == ""
+    assert cmd.arguments == []
     assert cmd.file == "main.c"
     assert cmd.output == ""
 
@@ -39,11 +41,23 @@ def test_directory_setter() -> None:
     assert cmd["directory"] == "/new/path"
 
 
+def test_arguments_setter() -> None:
+    cmd = CompileCommand()
+    cmd.arguments = ["clang++", "-c", "file.cpp"]
+    assert cmd.arguments == ["clang++", "-c", "file.cpp"]
+    assert cmd["arguments"] == ["clang++", "-c", "file.cpp"]
+
+
 def test_command_setter() -> None:
     cmd = CompileCommand()
-    cmd.command = "clang++ -c file.cpp"
-    assert cmd.command == "clang++ -c file.cpp"
-    assert cmd["command"] == "clang++ -c file.cpp"
+    cmd.command = "clang++ -c 'my file.cpp'"
+    assert cmd.arguments == ["clang++", "-c", "my file.cpp"]
+    assert cmd.command == "clang++ -c 'my file.cpp'"
+
+
+def test_command_quotes_arguments() -> None:
+    cmd = CompileCommand(arguments=["gcc", '-DMESSAGE="Hello World"', "-c", "main.c"])
+    assert cmd.command == """gcc '-DMESSAGE="Hello World"' -c main.c"""
 
 
 def test_file_setter() -> None:
@@ -61,34 +75,34 @@ def test_output_setter() -> None:
 
 
 def test_dict_access() -> None:
-    cmd = CompileCommand(directory="/build", command="gcc main.c")
+    cmd = CompileCommand(directory="/build", arguments=["gcc", "main.c"])
     assert cmd["directory"] == "/build"
-    assert cmd["command"] == "gcc main.c"
+    assert cmd["arguments"] == ["gcc", "main.c"]
 
 
 def test_dict_keys() -> None:
     cmd = CompileCommand()
-    assert set(cmd.keys()) == {"directory", "command", "file", "output"}
+    assert set(cmd.keys()) == {"directory", "arguments", "file", "output"}
 
 
 def test_dict_values() -> None:
     cmd = CompileCommand(
         directory="/build",
-        command="gcc main.c",
+        arguments=["gcc", "main.c"],
         file="main.c",
         output="main.o",
     )
-    assert list(cmd.values()) == ["/build", "gcc main.c", "main.c", "main.o"]
+    assert list(cmd.values()) == ["/build", ["gcc", "main.c"], "main.c", "main.o"]
 
 
 def test_json_serialization() -> None:
     cmd = CompileCommand(
         directory="/build",
-        command="gcc -c main.c",
+        arguments=["gcc", "-c", "main.c"],
         file="main.c",
         output="main.o",
     )
-    json_str = json.dumps(cmd)
+    json_str = json.dumps(cmd.entry())
     parsed = json.loads(json_str)
     assert parsed == {
         "directory": "/build",
@@ -101,7 +115,7 @@ def test_json_serialization() -> None:
 def test_iteration() -> None:
     cmd = CompileCommand()
     keys = list(cmd)
-    assert set(keys) == {"directory", "command", "file", "output"}
+    assert set(keys) == {"directory", "arguments", "file", "output"}
 
 
 def test_len() -> None:
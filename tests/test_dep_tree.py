@@ -1,6 +1,11 @@
 import pytest
 
-from ezbuild.dep_tree import CyclicDependencyError, DepTree, MissingDependencyError
+from ezbuild.dep_tree import (
+    CyclicDependencyError,
+    DepTree,
+    MissingDependencyError,
+    UnknownTargetError,
+)
 from ezbuild.environment import Program, SharedLibrary, StaticLibrary
 from ezbuild.language import Language
 
@@ -21,6 +26,13 @@ def test_missing_dependency_error_message() -> None:
     assert "does not exist" in str(error)
 
 
+def test_unknown_target_error_message() -> None:
+    error = UnknownTargetError("nonexistent")
+    assert error.name == "nonexistent"
+    assert "nonexistent" in str(error)
+    assert "does not exist" in str(error)
+
+
 def test_deptree_init() -> None:
     targets: dict[str, Program | StaticLibrary | SharedLibrary] = {}
     tree = DepTree(targets)
@@ -283,3 +295,234 @@ def test_deptree_find_cycle_empty_remaining() -> None:
     tree.in_degree = {}
     cycle = tree._find_cycle()
     assert cycle == []
+
+
+def test_deptree_start_independent_targets_ready() -> None:
+    lib1 = StaticLibrary(name="lib1", languages=[Language.C], sources=["lib1.c"])
+    lib2 = StaticLibrary(name="lib2", languages=[Language.C], sources=["lib2.c"])
+    prog = Program(
+        name="app",
+        languages=[Language.C],
+        sources=["main.c"],
+        dependencies=["lib1", "lib2"],
+    )
+    tree = DepTree({"app": prog, "lib1": lib1, "lib2": lib2})
+    tree.start()
+    assert sorted(tree.pop_ready()) == ["lib1", "lib2"]
+    assert tree.pop_ready() == []
+
+
+def test_deptree_mark_done_releases_dependents() -> None:
+    lib1 = StaticLibrary(name="lib1", languages=[Language.C], sources=["lib1.c"])
+    lib2 = StaticLibrary(name="lib2", languages=[Language.C], sources=["lib2.c"])
+    prog = Program(
+        name="app",
+        languages=[Language.C],
+        sources=["main.c"],
+        dependencies=["lib1", "lib2"],
+    )
+    tree = DepTree({"app": prog, "lib1": lib1, "lib2": lib2})
+    tree.start()
+    tree.pop_ready()
+
+    assert tree.mark_done("lib1") == []
+    assert tree.pop_ready() == []
+    assert tree.mark_done("lib2") == ["app"]
+    assert tree.pop_ready() == ["app"]
+    assert not tree.is_complete()
+
+    assert tree.mark_done("app") == []
+    assert tree.is_complete()
+
+
+def test_deptree_mark_done_twice_is_ignored() -> None:
+    lib = StaticLibrary(name="mylib", languages=[Language.C], sources=["lib.c"])
+    prog = Program(
+        name="app",
+        languages=[Language.C],
+        sources=["main.c"],
+        dependencies=["mylib"],
+    )
+    tree = DepTree({"app": prog, "mylib": lib})
+    tree.start()
+    assert tree.pop_ready() == ["mylib"]
+    assert tree.mark_done("mylib") == ["app"]
+    assert tree.mark_done("mylib") == []
+    assert tree.pop_ready() == ["app"]
+
+
+def test_deptree_wavefront_diamond() -> None:
+    base = StaticLibrary(name="base", languages=[Language.C], sources=["base.c"])
+    left = StaticLibrary(
+        name="left",
+        languages=[Language.C],
+        sources=["left.c"],
+        dependencies=["base"],
+    )
+    right = StaticLibrary(
+        name="right",
+        languages=[Language.C],
+        sources=["right.c"],
+        dependencies=["base"],
+    )
+    prog = Program(
+        name="app",
+        languages=[Language.C],
+        sources=["main.c"],
+        dependencies=["left", "right"],
+    )
+    tree = DepTree({"app": prog, "base": base, "left": left, "right": right})
+    tree.start()
+
+    waves: list[list[str]] = []
+    while not tree.is_complete():
+        wave = sorted(tree.pop_ready())
+        waves.append(wave)
+        for name in wave:
+            tree.mark_done(name)
+
+    assert waves == [["base"], ["left", "right"], ["app"]]
+
+
+def test_deptree_start_cyclic_dependency() -> None:
+    lib1 = StaticLibrary(
+        name="lib1",
+        languages=[Language.C],
+        sources=["lib1.c"],
+        dependencies=["lib2"],
+    )
+    lib2 = StaticLibrary(
+        name="lib2",
+        languages=[Language.C],
+        sources=["lib2.c"],
+        dependencies=["lib1"],
+    )
+    tree = DepTree({"lib1": lib1, "lib2": lib2})
+    with pytest.raises(CyclicDependencyError):
+        tree.start()
+
+
+def _diamond_with_tool() -> DepTree:
+    base = StaticLibrary(name="base", languages=[Language.C], sources=["base.c"])
+    left = StaticLibrary(
+        name="left",
+        languages=[Language.C],
+        sources=["left.c"],
+        dependencies=["base"],
+    )
+    right = StaticLibrary(
+        name="right",
+        languages=[Language.C],
+        sources=["right.c"],
+        dependencies=["base"],
+    )
+    prog = Program(
+        name="app",
+        languages=[Language.C],
+        sources=["main.c"],
+        dependencies=["left", "right"],
+    )
+    tool = Program(
+        name="my-tool",
+        languages=[Language.C],
+        sources=["tool.c"],
+        dependencies=["left"],
+    )
+    return DepTree(
+        {"app": prog, "base": base, "left": left, "right": right, "tool": tool}
+    )
+
+
+def test_deptree_mark_failed_cancels_dependents() -> None:
+    tree = _diamond_with_tool()
+    tree.start()
+    assert tree.pop_ready() == ["base"]
+    tree.mark_done("base")
+    assert sorted(tree.pop_ready()) == ["left", "right"]
+
+    assert sorted(tree.mark_failed("left")) == ["app", "tool"]
+    assert tree.mark_done("right") == []
+    assert tree.pop_ready() == []
+    assert not tree.is_complete()
+
+
+def test_deptree_mark_failed_cancels_once() -> None:
+    tree = _diamond_with_tool()
+    tree.start()
+    tree.mark_done("base")
+    tree.mark_failed("left")
+    assert tree.mark_failed("right") == []
+
+
+def test_deptree_mark_failed_only_selected() -> None:
+    tree = _diamond_with_tool()
+    tree.start(["tool"])
+    assert tree.mark_failed("base") == ["left", "tool"]
+
+
+def test_deptree_find_by_key_or_name() -> None:
+    tree = _diamond_with_tool()
+    assert tree.find("tool") == "tool"
+    assert tree.find("my-tool") == "tool"
+    with pytest.raises(UnknownTargetError):
+        tree.find("missing")
+
+
+def test_deptree_closure() -> None:
+    tree = _diamond_with_tool()
+    assert tree.closure(["left"]) == {"left", "base"}
+    assert tree.closure(["my-tool"]) == {"tool", "left", "base"}
+    assert tree.closure(["app"]) == {"app", "left", "right", "base"}
+    assert tree.closure(["right", "tool"]) == {"right", "tool", "left", "base"}
+
+
+def test_deptree_closure_unknown_target() -> None:
+    tree = _diamond_with_tool()
+    with pytest.raises(UnknownTargetError):
+        tree.closure(["app", "missing"])
+
+
+def test_deptree_start_with_names_schedules_closure() -> None:
+    tree = _diamond_with_tool()
+    tree.start(["tool"])
+    assert sorted(tree.selected()) == ["base", "left", "tool"]
+
+    waves: list[list[str]] = []
+    while not tree.is_complete():
+        wave = sorted(tree.pop_ready())
+        waves.append(wave)
+        for name in wave:
+            tree.mark_done(name)
+
+    assert waves == [["base"], ["left"], ["tool"]]
+
+
+def test_deptree_start_without_names_selects_everything() -> None:
+    tree = _diamond_with_tool()
+    tree.start()
+    assert sorted(tree.selected()) == ["app", "base", "left", "right", "tool"]
+
+
+def test_deptree_critical_paths() -> None:
+    tree = _diamond_with_tool()
+    tree.start()
+    costs = {"base": 1.0, "left": 5.0, "right": 2.0, "app": 1.0, "tool": 10.0}
+    assert tree.critical_paths(costs.__getitem__) == {
+        "app": 1.0,
+        "tool": 10.0,
+        "left": 15.0,
+        "right": 3.0,
+        "base": 16.0,
+    }
+
+
+def test_deptree_critical_paths_only_selected() -> None:
+    tree = _diamond_with_tool()
+    tree.start(["app"])
+    costs = {"base": 1.0, "left": 5.0, "right": 2.0, "app": 1.0, "tool": 10.0}
+    assert tree.critical_paths(costs.__getitem__) == {
+        "app": 1.0,
+        "left": 6.0,
+        "right": 3.0,
+        "base": 7.0,
+    }
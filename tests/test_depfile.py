@@ -0,0 +1,55 @@
+from typing import TYPE_CHECKING
+
+from ezbuild.depfile import parse_depfile, read_depfile
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def test_parse_depfile_single_line() -> None:
+    assert parse_depfile("main.o: main.c lib.h\n") == ["main.c", "lib.h"]
+
+
+def test_parse_depfile_continuation_lines() -> None:
+    content = "main.o: main.c \\\n  lib.h \\\n  other.h\n"
+    assert parse_depfile(content) == ["main.c", "lib.h", "other.h"]
+
+
+def test_parse_depfile_escaped_spaces() -> None:
+    content = "main.o: my\\ dir/main.c my\\ dir/lib.h\n"
+    assert parse_depfile(content) == ["my dir/main.c", "my dir/lib.h"]
+
+
+def test_parse_depfile_escaped_dollar_and_hash() -> None:
+    content = "main.o: a$$b.h c\\#d.h\n"
+    assert parse_depfile(content) == ["a$b.h", "c#d.h"]
+
+
+def test_parse_depfile_phony_targets() -> None:
+    # -MP style output adds an empty rule for every header.
+    content = "main.o: main.c lib.h\n\nlib.h:\n"
+    assert parse_depfile(content) == ["main.c", "lib.h"]
+
+
+def test_parse_depfile_removes_duplicates() -> None:
+    content = "a.o: a.c common.h\nb.o: b.c common.h\n"
+    assert parse_depfile(content) == ["a.c", "common.h", "b.c"]
+
+
+def test_parse_depfile_windows_drive_letter() -> None:
+    content = "main.o: C:/src/main.c\n"
+    assert parse_depfile(content) == ["C:/src/main.c"]
+
+
+def test_parse_depfile_empty() -> None:
+    assert parse_depfile("") == []
+
+
+def test_read_depfile(tmp_path: Path) -> None:
+    path = tmp_path / "main.c.d"
+    path.write_text("main.c.o: main.c lib.h\n")
+    assert read_depfile(str(path)) == ["main.c", "lib.h"]
+
+
+def test_read_depfile_missing(tmp_path: Path) -> None:
+    assert read_depfile(str(tmp_path / "missing.d")) is None
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING
 import pytest
 from typer import Exit
 
+from ezbuild.archive_mode import ArchiveMode
 from ezbuild.environment import Environment, Program, SharedLibrary, StaticLibrary
 from ezbuild.language import Language
 
@@ -295,6 +296,43 @@ def test_environment_static_library_with_dependencies() -> None:
     assert lib.dependencies == ["dep1"]
 
 
+def test_environment_static_library_archive_mode() -> None:
+    env = Environment()
+    lib = env.StaticLibrary(
+        name="mylib",
+        languages=[Language.C],
+        sources=["lib.c"],
+        archive_mode=ArchiveMode.THIN,
+    )
+    assert lib.archive_mode == ArchiveMode.THIN
+    assert env.archive_mode(lib) == ArchiveMode.THIN
+
+
+def test_archive_mode_defaults_to_ranlib() -> None:
+    env = Environment()
+    lib = StaticLibrary(name="mylib", languages=[Language.C], sources=["lib.c"])
+    assert lib.archive_mode is None
+    assert env.archive_mode(lib) == ArchiveMode.RANLIB
+
+
+def test_archive_mode_from_environment() -> None:
+    env = Environment()
+    env["ARCHIVE_MODE"] = "indexed"
+    lib = StaticLibrary(name="mylib", languages=[Language.C], sources=["lib.c"])
+    assert env.archive_mode(lib) == ArchiveMode.INDEXED
+
+    lib.archive_mode = ArchiveMode.RANLIB
+    assert env.archive_mode(lib) == ArchiveMode.RANLIB
+
+
+def test_archive_mode_unknown() -> None:
+    env = Environment()
+    env["ARCHIVE_MODE"] = "fat"
+    lib = StaticLibrary(name="mylib", languages=[Language.C], sources=["lib.c"])
+    with pytest.raises(Exit):
+        env.archive_mode(lib)
+
+
 def test_environment_multiple_static_libraries() -> None:
     env = Environment()
     lib1 = env.StaticLibrary(name="lib1", languages=[Language.C], sources=["lib1.c"])
@@ -534,25 +572,25 @@ def test_validate_defines_with_d_prefix() -> None:
 
 
 def test_format_define_simple() -> None:
-    from ezbuild.commands.build import _format_define
+    from ezbuild.steps import _format_define
 
     assert _format_define("DEBUG") == "-DDEBUG"
 
 
 def test_format_define_with_value() -> None:
-    from ezbuild.commands.build import _format_define
+    from ezbuild.steps import _format_define
 
     assert _format_define("VERSION=1.0") == "-DVERSION=1.0"
 
 
 def test_format_define_with_spaces() -> None:
-    from ezbuild.commands.build import _format_define
+    from ezbuild.steps import _format_define
 
-    assert _format_define("NAME=John Doe") == '"-DNAME=John Doe"'
+    assert _format_define("NAME=John Doe") == "-DNAME=John Doe"
 
 
 def test_format_define_complex_expression() -> None:
-    from ezbuild.commands.build import _format_define
+    from ezbuild.steps import _format_define
 
     assert _format_define("CONFIG=(A|B)") == "-DCONFIG=(A|B)"
 
@@ -0,0 +1,303 @@
+import shlex
+
+import pytest
+
+from ezbuild.executor import (
+    RESPONSE_FILE_THRESHOLD,
+    Job,
+    JobPool,
+    JobResult,
+    cgroup_cpu_limit,
+    default_jobs,
+    response_file_argv,
+    run_job,
+)
+
+
+def test_default_jobs_is_positive() -> None:
+    assert default_jobs() >= 1
+
+
+def _write_cgroup(tmp_path, mocker, quotas: dict[str, str]) -> None:
+    root = tmp_path / "cgroup"
+    for path, quota in quotas.items():
+        (root / path).mkdir(parents=True, exist_ok=True)
+        (root / path / "cpu.max").write_text(f"{quota}\n")
+    proc = tmp_path / "proc_cgroup"
+    proc.write_text("0::/ci/build\n")
+    mocker.patch("ezbuild.executor.CGROUP_ROOT", root)
+    mocker.patch("ezbuild.executor.PROC_CGROUP", proc)
+
+
+def test_cgroup_cpu_limit(tmp_path, mocker) -> None:
+    _write_cgroup(tmp_path, mocker, {"ci/build": "850000 100000"})
+    assert cgroup_cpu_limit() == 8
+
+
+def test_cgroup_cpu_limit_of_parent(tmp_path, mocker) -> None:
+    _write_cgroup(tmp_path, mocker, {"ci": "200000 100000", "ci/build": "max 100000"})
+    assert cgroup_cpu_limit() == 2
+
+
+def test_cgroup_cpu_limit_at_least_one_cpu(tmp_path, mocker) -> None:
+    _write_cgroup(tmp_path, mocker, {"ci/build": "50000 100000"})
+    assert cgroup_cpu_limit() == 1
+
+
+def test_cgroup_cpu_limit_unlimited(tmp_path, mocker) -> None:
+    _write_cgroup(tmp_path, mocker, {"ci/build": "max 100000"})
+    assert cgroup_cpu_limit() is None
+
+
+def test_cgroup_cpu_limit_without_cgroup_v2(tmp_path, mocker) -> None:
+    proc = tmp_path / "proc_cgroup"
+    proc.write_text("4:memory:/ci\n1:cpu:/\n")
+    mocker.patch("ezbuild.executor.PROC_CGROUP", proc)
+    assert cgroup_cpu_limit() is None
+
+
+def test_default_jobs_honors_cgroup_quota(mocker) -> None:
+    mocker.patch("ezbuild.executor.process_cpu_count", return_value=128)
+    mocker.patch("ezbuild.executor.cgroup_cpu_limit", return_value=8)
+    assert default_jobs() == 8
+
+
+def test_default_jobs_honors_affinity(mocker) -> None:
+    mocker.patch("ezbuild.executor.process_cpu_count", return_value=4)
+    mocker.patch("ezbuild.executor.cgroup_cpu_limit", return_value=8)
+    assert default_jobs() == 4
+
+
+def test_job_pool_rejects_zero_jobs() -> None:
+    with pytest.raises(ValueError, match="at least 1"):
+        JobPool(0)
+
+
+def _run_all(pool: JobPool, jobs: list[Job]) -> list[JobResult]:
+    """Run jobs on the pool and return their results in submission order."""
+    for job in jobs:
+        pool.submit(job)
+
+    results: dict[int, JobResult] = {}
+    while len(results) < len(jobs):
+        for result in pool.wait():
+            results[id(result.job)] = result
+
+    return [results[id(job)] for job in jobs]
+
+
+def test_job_pool_starts_idle() -> None:
+    with JobPool(2) as pool:
+        assert pool.idle()
+        assert pool.wait() == []
+
+
+def test_job_pool_runs_jobs() -> None:
+    jobs = [Job(argv=["true"], output=f"out{i}") for i in range(4)]
+    with JobPool(2) as pool:
+        results = _run_all(pool, jobs)
+        assert pool.idle()
+
+    assert [result.job for result in results] == jobs
+    assert all(result.returncode == 0 for result in results)
+    assert all(0 < result.start <= result.end for result in results)
+
+
+def test_job_pool_captures_stderr() -> None:
+    job = Job(argv=["sh", "-c", "echo oops >&2; exit 3"], output="out")
+    with JobPool(1) as pool:
+        [result] = _run_all(pool, [job])
+
+    assert result.returncode == 3
+    assert result.stderr.strip() == "oops"
+
+
+def test_job_pool_runs_jobs_concurrently(tmp_path) -> None:
+    # Each job waits for the other one to start, so this only finishes when
+    # both jobs run at the same time.
+    script = (
+        "touch {own}; "
+        "for _ in $(seq 100); do [ -e {other} ] && exit 0; sleep 0.05; done; exit 1"
+    )
+    a, b = tmp_path / "a", tmp_path / "b"
+    jobs = [
+        Job(argv=["sh", "-c", script.format(own=a, other=b)], output=str(a)),
+        Job(argv=["sh", "-c", script.format(own=b, other=a)], output=str(b)),
+    ]
+    with JobPool(2) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0]
+
+
+def test_job_pool_limits_running_jobs(tmp_path) -> None:
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.1; rm {marker}"
+    jobs = [Job(argv=["sh", "-c", script], output=str(i)) for i in range(3)]
+    with JobPool(1) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0, 0]
+
+
+def test_job_pool_starts_highest_priority_first(tmp_path) -> None:
+    order = tmp_path / "order"
+    jobs = [
+        Job(argv=["sh", "-c", f"echo {i} >> {order}"], output=str(i), priority=p)
+        for i, p in enumerate([1.0, 5.0, 0.0, 5.0, 3.0])
+    ]
+    with JobPool(1) as pool:
+        _run_all(pool, jobs)
+
+    # Equal priorities keep their submission order.
+    assert order.read_text().split() == ["1", "3", "4", "0", "2"]
+
+
+def test_job_pool_rejects_zero_pool_depth() -> None:
+    with pytest.raises(ValueError, match="pool link"):
+        JobPool(2, {"link": 0})
+
+
+def test_job_pool_limits_jobs_of_pool(tmp_path) -> None:
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.1; rm {marker}"
+    jobs = [
+        Job(argv=["sh", "-c", script], output=str(i), pool="link") for i in range(3)
+    ]
+    jobs.append(Job(argv=["true"], output="other"))
+    with JobPool(4, {"link": 1}) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0, 0, 0]
+
+
+def test_job_pool_defers_jobs_without_memory(tmp_path, mocker) -> None:
+    mocker.patch("ezbuild.executor.available_memory", return_value=1000)
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.1; rm {marker}"
+    jobs = [
+        Job(argv=["sh", "-c", script], output=str(i), memory=1024) for i in range(3)
+    ]
+    with JobPool(3) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0, 0]
+
+
+def test_job_pool_counts_memory_of_running_jobs(tmp_path, mocker) -> None:
+    # 16 GiB stay available since the running link has not allocated yet.
+    mocker.patch("ezbuild.executor.available_memory", return_value=16 * 1024**3)
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.2; rm {marker}"
+    first, second = (
+        Job(argv=["sh", "-c", script], output=str(i), pool="link", memory=10 * 1024**3)
+        for i in range(2)
+    )
+    with JobPool(4, {"link": 2}) as pool:
+        # The links start in separate dispatches.
+        pool.submit(first)
+        pool._dispatch()
+        pool.submit(second)
+        results = [*pool.wait()]
+        while not pool.idle():
+            results.extend(pool.wait())
+
+    assert [result.returncode for result in results] == [0, 0]
+
+
+def test_job_pool_runs_jobs_with_enough_memory(tmp_path, mocker) -> None:
+    mocker.patch("ezbuild.executor.available_memory", return_value=4096)
+    # As in test_job_pool_runs_jobs_concurrently, both jobs must run at once.
+    script = (
+        "touch {own}; "
+        "for _ in $(seq 100); do [ -e {other} ] && exit 0; sleep 0.05; done; exit 1"
+    )
+    a, b = tmp_path / "a", tmp_path / "b"
+    jobs = [
+        Job(argv=["sh", "-c", script.format(own=a, other=b)], output="a", memory=1024),
+        Job(argv=["sh", "-c", script.format(own=b, other=a)], output="b", memory=1024),
+    ]
+    with JobPool(2) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0]
+
+
+def test_job_pool_throttles_on_load_average(tmp_path, mocker) -> None:
+    mocker.patch("ezbuild.executor.getloadavg", return_value=(4.0, 4.0, 4.0))
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.1; rm {marker}"
+    jobs = [Job(argv=["sh", "-c", script], output=str(i)) for i in range(3)]
+    with JobPool(3, max_load=4.0) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0, 0]
+
+
+def test_job_pool_counts_started_jobs_in_load(tmp_path, mocker) -> None:
+    mocker.patch("ezbuild.executor.getloadavg", return_value=(1.0, 1.0, 1.0))
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.1; rm {marker}"
+    jobs = [Job(argv=["sh", "-c", script], output=str(i)) for i in range(3)]
+    with JobPool(3, max_load=2.0) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0, 0]
+
+
+def test_job_pool_numbers_workers() -> None:
+    jobs = [Job(argv=["true"], output=str(i)) for i in range(6)]
+    with JobPool(2) as pool:
+        results = _run_all(pool, jobs)
+
+    assert {result.worker for result in results} <= {1, 2}
+
+
+def test_response_file_argv_short_command(tmp_path) -> None:
+    rspfile = tmp_path / "out.rsp"
+    argv = ["cc", "-c", "main.c"]
+    assert response_file_argv(argv, str(rspfile)) == argv
+    assert not rspfile.exists()
+
+
+def test_response_file_argv_long_command(tmp_path) -> None:
+    rspfile = tmp_path / "target" / "out.rsp"
+    objects = [f"/build/target/object {i}.o" for i in range(RESPONSE_FILE_THRESHOLD)]
+    argv = ["cc", "-o", "app", *objects]
+
+    assert response_file_argv(argv, str(rspfile)) == ["cc", f"@{rspfile}"]
+    assert shlex.split(rspfile.read_text()) == argv[1:]
+
+
+def test_response_file_argv_without_rspfile() -> None:
+    argv = ["cc", "x" * RESPONSE_FILE_THRESHOLD]
+    assert response_file_argv(argv, "") == argv
+
+
+def test_response_file_reused_when_unchanged(tmp_path) -> None:
+    rspfile = tmp_path / "out.rsp"
+    argv = ["ar", "-rc", "lib.a", "x" * RESPONSE_FILE_THRESHOLD]
+    response_file_argv(argv, str(rspfile))
+    rspfile.touch()
+    mtime = rspfile.stat().st_mtime_ns
+
+    response_file_argv(argv, str(rspfile))
+    assert rspfile.stat().st_mtime_ns == mtime
+
+    response_file_argv([*argv, "y"], str(rspfile))
+    assert shlex.split(rspfile.read_text())[-1] == "y"
+
+
+def test_run_job_passes_long_command_in_response_file(tmp_path, mocker) -> None:
+    run = mocker.patch("ezbuild.executor.run")
+    run.return_value.returncode = 0
+    run.return_value.stderr = b""
+    rspfile = tmp_path / "app.rsp"
+    job = Job(
+        argv=["cc", "x" * RESPONSE_FILE_THRESHOLD], output="app", rspfile=str(rspfile)
+    )
+
+    assert run_job(job).returncode == 0
+    run.assert_called_once_with(
+        ["cc", f"@{rspfile}"], capture_output=True, close_fds=False
+    )
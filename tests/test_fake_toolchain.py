@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from ezbuild.commands.build import build
+
+FAKE_TOOLCHAIN = Path(__file__).parents[1] / "utils" / "fake_toolchain.py"
+
+
+def _write_project(tmp_path: Path, tools: Path, mode: str, sources: str) -> None:
+    (tmp_path / "build.ezbuild").write_text(
+        f"""
+env = Environment()
+env["CC"] = "{tools / "cc"}"
+env["CCLD"] = "{tools / "cc"}"
+env["AR"] = "{tools / "ar"}"
+env["RANLIB"] = "{tools / "ranlib"}"
+env["ARCHIVE_MODE"] = ArchiveMode.{mode}
+mylib = StaticLibrary(
+    name="mylib",
+    languages=[Language.C],
+    sources={[f"{source}.c" for source in sources]!r},
+)
+"""
+    )
+
+
+@pytest.mark.parametrize("mode", ["RANLIB", "INDEXED", "THIN"])
+def test_fake_toolchain_deletes_archive_members(tmp_path: Path, mode: str) -> None:
+    """Test that the fake ar handles archives updated after removing a source."""
+    os.chdir(tmp_path)
+    tools = tmp_path / "fake"
+    subprocess.run(
+        [sys.executable, FAKE_TOOLCHAIN, "install", tools, "--compile-time", "0"],
+        check=True,
+        capture_output=True,
+    )
+    for source in "abcde":
+        (tmp_path / f"{source}.c").write_text(f"int {source}(void) {{ return 0; }}")
+
+    _write_project(tmp_path, tools, mode, "abcde")
+    assert build() == (0, "")
+    _write_project(tmp_path, tools, mode, "abcd")
+    assert build() == (0, "")
+
+    archive = (tmp_path / "build" / "lib" / "mylib.a").read_text().splitlines()
+    assert [line.split()[0] for line in archive[1:]] == [
+        f"{source}.c.o" for source in "abcd"
+    ]
@@ -0,0 +1,262 @@
+import os
+import sys
+from shutil import which
+from subprocess import run
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ezbuild.executor import Job, JobPool, JobResult
+from ezbuild.jobserver import Jobserver, jobserver
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+@pytest.fixture
+def pipe() -> Iterator[tuple[int, int]]:
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    yield read_fd, write_fd
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def _drain(fd: int) -> bytes:
+    try:
+        return os.read(fd, 1024)
+    except BlockingIOError:
+        return b""
+
+
+def _run_all(pool: JobPool, jobs: list[Job]) -> list[JobResult]:
+    """Run jobs on the pool and return their results in submission order."""
+    for job in jobs:
+        pool.submit(job)
+
+    results: dict[int, JobResult] = {}
+    while len(results) < len(jobs):
+        for result in pool.wait():
+            results[id(result.job)] = result
+
+    return [results[id(job)] for job in jobs]
+
+
+def test_from_makeflags_without_jobserver() -> None:
+    assert Jobserver.from_makeflags("") is None
+    assert Jobserver.from_makeflags("-j4 -k") is None
+
+
+def test_from_makeflags_descriptors(pipe: tuple[int, int]) -> None:
+    read_fd, write_fd = pipe
+    os.write(write_fd, b"++")
+    client = Jobserver.from_makeflags(f" -j3 --jobserver-auth={read_fd},{write_fd}")
+    assert client is not None
+
+    assert client.acquire()
+    assert client.acquire()
+    assert not client.acquire()
+    assert client.tokens == 2
+
+    client.close()
+    assert _drain(read_fd) == b"++"
+
+
+def test_from_makeflags_legacy_descriptors(pipe: tuple[int, int]) -> None:
+    read_fd, write_fd = pipe
+    os.write(write_fd, b"+")
+    client = Jobserver.from_makeflags(f"--jobserver-fds={read_fd},{write_fd} -j")
+    assert client is not None
+
+    assert client.acquire()
+    client.close()
+
+
+def test_from_makeflags_fifo(tmp_path: Path) -> None:
+    fifo = tmp_path / "fifo"
+    os.mkfifo(fifo)
+    # Keeps the fifo open, as make does.
+    server = os.open(fifo, os.O_RDWR | os.O_NONBLOCK)
+    os.write(server, b"+")
+
+    client = Jobserver.from_makeflags(f"-j2 --jobserver-auth=fifo:{fifo}")
+    assert client is not None
+    assert client.acquire()
+    assert not client.acquire()
+    client.release()
+    assert client.tokens == 0
+
+    client.close()
+    assert _drain(server) == b"+"
+    os.close(server)
+
+
+def test_from_makeflags_returns_the_token_it_took(pipe: tuple[int, int]) -> None:
+    read_fd, write_fd = pipe
+    os.write(write_fd, b"x")
+    client = Jobserver.from_makeflags(f"--jobserver-auth={read_fd},{write_fd}")
+    assert client is not None
+
+    assert client.acquire()
+    client.close()
+    assert _drain(read_fd) == b"x"
+
+
+def test_from_makeflags_uses_last_jobserver(pipe: tuple[int, int]) -> None:
+    read_fd, _ = pipe
+    makeflags = f"--jobserver-auth=fifo:/nonexistent --jobserver-auth={read_fd},0"
+    client = Jobserver.from_makeflags(makeflags)
+    assert client is not None
+    client.close()
+
+
+def test_from_makeflags_inaccessible(tmp_path: Path) -> None:
+    assert Jobserver.from_makeflags("--jobserver-auth=1000,1001") is None
+    assert Jobserver.from_makeflags(f"--jobserver-auth=fifo:{tmp_path}/x") is None
+    assert Jobserver.from_makeflags("--jobserver-auth=sem:name") is None
+
+
+def test_from_makeflags_not_a_pipe(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_text("++")
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        assert Jobserver.from_makeflags(f"--jobserver-auth={fd},{fd}") is None
+    finally:
+        os.close(fd)
+
+
+def test_jobserver_serves_tokens(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("MAKEFLAGS", "-s")
+    with jobserver(3) as client:
+        makeflags = os.environ["MAKEFLAGS"]
+        assert makeflags.startswith("-s -j3 --jobserver-auth=")
+        assert client is not None
+        assert [client.acquire() for _ in range(3)] == [True, True, False]
+
+    assert os.environ["MAKEFLAGS"] == "-s"
+
+
+def test_jobserver_serves_tokens_without_proc(
+    monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+) -> None:
+    monkeypatch.delenv("MAKEFLAGS", raising=False)
+    open_ = os.open
+
+    def open_without_proc(path: str | Path, *args: int, **kwargs: int) -> int:
+        if str(path).startswith("/proc"):
+            raise FileNotFoundError(path)
+        return open_(path, *args, **kwargs)
+
+    mocker.patch("os.open", side_effect=open_without_proc)
+    with jobserver(2) as client:
+        assert client is not None
+        assert [client.acquire() for _ in range(2)] == [True, False]
+
+
+def test_jobserver_unavailable(
+    monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+) -> None:
+    monkeypatch.setenv("MAKEFLAGS", "-s")
+    mocker.patch("os.mkfifo", side_effect=PermissionError("denied"))
+    with jobserver(2) as client:
+        assert client is None
+        assert os.environ["MAKEFLAGS"] == "-s"
+
+
+def test_jobserver_joins_parent(
+    pipe: tuple[int, int], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    read_fd, write_fd = pipe
+    makeflags = f"-j2 --jobserver-auth={read_fd},{write_fd}"
+    monkeypatch.setenv("MAKEFLAGS", makeflags)
+    os.write(write_fd, b"+")
+
+    with jobserver(8) as client:
+        assert os.environ["MAKEFLAGS"] == makeflags
+        assert client is not None
+        assert client.acquire()
+        assert not client.acquire()
+
+    assert _drain(read_fd) == b"+"
+
+
+def test_jobserver_is_inherited(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("MAKEFLAGS", raising=False)
+    # Exits with 0 if it inherited the pipe with the 3 tokens of the others.
+    child = (
+        "import os, re\n"
+        "auth = re.search(r'auth=(\\d+),(\\d+)', os.environ['MAKEFLAGS'])\n"
+        "read_fd, write_fd = map(int, auth.groups())\n"
+        "os.set_blocking(read_fd, False)\n"
+        "tokens = os.read(read_fd, 16)\n"
+        "os.write(write_fd, tokens)\n"
+        "raise SystemExit(len(tokens) - 3)\n"
+    )
+    with jobserver(4), JobPool(1) as pool:
+        [result] = _run_all(
+            pool, [Job(argv=[sys.executable, "-c", child], output="child")]
+        )
+
+    assert result.returncode == 0, result.stderr
+    assert "MAKEFLAGS" not in os.environ
+
+
+def test_job_pool_waits_for_tokens(tmp_path: Path, pipe: tuple[int, int]) -> None:
+    read_fd, write_fd = pipe
+    client = Jobserver.from_makeflags(f"--jobserver-auth={read_fd},{write_fd}")
+    assert client is not None
+    marker = tmp_path / "marker"
+    script = f"[ -e {marker} ] && exit 1; touch {marker}; sleep 0.1; rm {marker}"
+    jobs = [Job(argv=["sh", "-c", script], output=str(i)) for i in range(3)]
+
+    with JobPool(3, jobserver=client) as pool:
+        results = _run_all(pool, jobs)
+
+    assert [result.returncode for result in results] == [0, 0, 0]
+    client.close()
+
+
+def test_job_pool_returns_tokens(pipe: tuple[int, int]) -> None:
+    read_fd, write_fd = pipe
+    os.write(write_fd, b"++")
+    client = Jobserver.from_makeflags(f"--jobserver-auth={read_fd},{write_fd}")
+    assert client is not None
+    jobs = [Job(argv=["sleep", "0.1"], output=str(i)) for i in range(3)]
+
+    with JobPool(3, jobserver=client) as pool:
+        _run_all(pool, jobs)
+
+    assert client.tokens == 0
+    client.close()
+    assert _drain(read_fd) == b"++"
+
+
+@pytest.mark.skipif(which("make") is None, reason="make is not installed")
+def test_jobserver_under_make(tmp_path: Path) -> None:
+    """Test that a recipe of GNU make can take and give back its tokens."""
+    script = tmp_path / "client.py"
+    script.write_text(
+        "import os\n"
+        "from ezbuild.jobserver import Jobserver\n"
+        "client = Jobserver.from_makeflags(os.environ['MAKEFLAGS'])\n"
+        "while client.acquire(): pass\n"
+        "print('tokens', client.tokens)\n"
+        "client.close()\n"
+    )
+    (tmp_path / "Makefile").write_text(f"all:\n\t+{sys.executable} {script}\n")
+
+    env = {key: value for key, value in os.environ.items() if key != "MAKEFLAGS"}
+    env["PYTHONPATH"] = os.pathsep.join(sys.path)
+    result = run(
+        ["make", "-s", "-j3", "-C", str(tmp_path)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "tokens 2"
+    assert result.stderr == ""
@@ -0,0 +1,46 @@
+from ezbuild.ninja import NinjaWriter, escape, escape_path
+
+
+def test_escape_path() -> None:
+    assert escape_path("/src/main.c") == "/src/main.c"
+    assert escape_path("/my src/a:b$c.c") == "/my$ src/a$:b$$c.c"
+
+
+def test_escape() -> None:
+    assert escape("-DPRICE=$5 -O2") == "-DPRICE=$$5 -O2"
+
+
+def test_ninja_writer_rule_and_pool() -> None:
+    writer = NinjaWriter()
+    writer.pool("link_pool", 2)
+    writer.rule("cc", "$cc -c -o $out $in", deps="gcc")
+    assert writer.text() == (
+        "pool link_pool\n"
+        "  depth = 2\n"
+        "rule cc\n"
+        "  command = $cc -c -o $out $in\n"
+        "  deps = gcc\n"
+    )
+
+
+def test_ninja_writer_build() -> None:
+    writer = NinjaWriter()
+    writer.build(
+        ["out dir/main.o"],
+        "cc",
+        ["main.c"],
+        implicit=["main.h"],
+        variables={"cflags": "-O2", "ldflags": ""},
+    )
+    assert writer.text() == (
+        "build out$ dir/main.o: cc main.c | main.h\n  cflags = -O2\n"
+    )
+
+
+def test_ninja_writer_comment_variable_default() -> None:
+    writer = NinjaWriter()
+    writer.comment("generated")
+    writer.variable("cc", "/usr/bin/cc")
+    writer.newline()
+    writer.default(["app", "lib.a"])
+    assert writer.text() == "# generated\ncc = /usr/bin/cc\n\ndefault app lib.a\n"
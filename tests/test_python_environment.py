@@ -26,3 +26,36 @@ def test_debug_can_be_mocked(mocker: MockerFixture) -> None:
 
     mocker.patch.object(PythonEnvironment, "_debug", True)
     assert PythonEnvironment.debug() is True
+
+
+def test_cache_default_value() -> None:
+    assert PythonEnvironment._cache == (environ.get("EZBUILD_CACHE") == "1")
+
+
+def test_cache_can_be_mocked(mocker: MockerFixture) -> None:
+    mocker.patch.object(PythonEnvironment, "_cache", True)
+    assert PythonEnvironment.cache() is True
+
+
+def test_cache_dir_returns_class_attribute() -> None:
+    assert PythonEnvironment.cache_dir() == PythonEnvironment._cache_dir
+
+
+def test_default_cache_dir(mocker: MockerFixture) -> None:
+    from pathlib import Path
+
+    from ezbuild.python_environment import _default_cache_dir
+
+    mocker.patch.dict(environ, {"EZBUILD_CACHE_DIR": "/tmp/ezbuild-cache"})
+    assert _default_cache_dir() == Path("/tmp/ezbuild-cache")
+
+    mocker.patch.dict(environ, {"EZBUILD_CACHE_DIR": "", "XDG_CACHE_HOME": "/xdg"})
+    assert _default_cache_dir() == Path("/xdg/ezbuild")
+
+    mocker.patch.dict(environ, {"EZBUILD_CACHE_DIR": "", "XDG_CACHE_HOME": ""})
+    assert _default_cache_dir() == Path.home() / ".cache" / "ezbuild"
+
+
+def test_remote_cache_returns_class_attribute(mocker: MockerFixture) -> None:
+    mocker.patch.object(PythonEnvironment, "_remote_cache", "http://localhost:8765")
+    assert PythonEnvironment.remote_cache() == "http://localhost:8765"
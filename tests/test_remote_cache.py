@@ -0,0 +1,127 @@
+from http import HTTPStatus
+from http.client import HTTPConnection
+from subprocess import run
+from threading import Thread
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ezbuild.cache import ObjectCache
+from ezbuild.executor import Job
+from ezbuild.remote_cache import CacheServer, RemoteCache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+KEY = "ab" * 32
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Iterator[CacheServer]:
+    server = CacheServer(("127.0.0.1", 0), tmp_path / "server")
+    thread = Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _url(server: CacheServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def test_remote_cache_put_and_get(server: CacheServer) -> None:
+    remote = RemoteCache(_url(server))
+    assert remote.get(KEY) is None
+    assert remote.put(KEY, b"object")
+    assert remote.get(KEY) == b"object"
+    assert (server.directory / KEY[:2] / KEY[2:]).read_bytes() == b"object"
+
+
+def test_remote_cache_url_trailing_slash(server: CacheServer) -> None:
+    assert RemoteCache(_url(server) + "/").put(KEY, b"object")
+    assert RemoteCache(_url(server)).get(KEY) == b"object"
+
+
+def test_remote_cache_rejects_invalid_key(server: CacheServer) -> None:
+    remote = RemoteCache(_url(server))
+    assert not remote.put("../../etc/passwd", b"object")
+    assert remote.get("not-a-key") is None
+    assert remote.enabled
+
+
+def test_server_requires_content_length(server: CacheServer) -> None:
+    connection = HTTPConnection("127.0.0.1", server.server_port)
+    connection.putrequest("PUT", f"/{KEY}")
+    connection.endheaders()
+    assert connection.getresponse().status == HTTPStatus.LENGTH_REQUIRED
+    connection.close()
+
+
+def test_remote_cache_disabled_when_unreachable(
+    server: CacheServer,
+) -> None:
+    url = _url(server)
+    server.shutdown()
+    server.server_close()
+
+    remote = RemoteCache(url)
+    assert remote.get(KEY) is None
+    assert not remote.enabled
+    assert not remote.put(KEY, b"object")
+
+
+def test_object_cache_falls_back_to_remote(tmp_path: Path, server: CacheServer) -> None:
+    obj = tmp_path / "main.o"
+    obj.write_bytes(b"object")
+    ObjectCache(tmp_path / "one", remote=RemoteCache(_url(server))).put(KEY, str(obj))
+
+    cache = ObjectCache(tmp_path / "two", remote=RemoteCache(_url(server)))
+    assert cache.get(KEY, str(tmp_path / "restored.o"))
+    assert (tmp_path / "restored.o").read_bytes() == b"object"
+    assert cache.remote_hits == 1
+
+    # The remote entry is kept locally, so the next lookup does not go remote.
+    assert cache.entry_path(KEY).read_bytes() == b"object"
+    assert cache.get(KEY, str(tmp_path / "restored.o"))
+    assert cache.remote_hits == 1
+
+
+def _system_library(lib_dir: Path, value: int) -> None:
+    source = lib_dir / "value.c"
+    source.write_text(f"int value(void) {{ return {value}; }}")
+    obj = lib_dir / "value.o"
+    run(["cc", "-c", "-o", obj, source], check=True)
+    (lib_dir / "libvalue.a").unlink(missing_ok=True)
+    run(["ar", "rcs", lib_dir / "libvalue.a", obj], check=True)
+
+
+def test_object_cache_keeps_links_local(tmp_path: Path, server: CacheServer) -> None:
+    """Test that a link is not restored from another machine's system library."""
+    lib_dir = tmp_path / "lib"
+    lib_dir.mkdir()
+    main = tmp_path / "main.c"
+    main.write_text("int value(void);\nint main(void) { return value(); }")
+    obj = tmp_path / "main.o"
+    run(["cc", "-c", "-o", obj, main], check=True)
+    app = tmp_path / "app"
+    job = Job(
+        argv=["cc", "-o", str(app), str(obj), f"-L{lib_dir}", "-lvalue"],
+        output=str(app),
+        kind="ccld",
+        inputs=[str(obj)],
+    )
+
+    _system_library(lib_dir, 1)
+    one = ObjectCache(tmp_path / "one", remote=RemoteCache(_url(server)))
+    assert not one.run(job).cached
+    assert run([app]).returncode == 1
+
+    # Only the system library differs on the second machine.
+    _system_library(lib_dir, 2)
+    two = ObjectCache(tmp_path / "two", remote=RemoteCache(_url(server)))
+    assert not two.run(job).cached
+    assert two.remote_hits == 0
+    assert run([app]).returncode == 2
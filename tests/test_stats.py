@@ -0,0 +1,74 @@
+import subprocess
+from time import time
+
+from ezbuild.executor import Job, JobResult
+from ezbuild.stats import BuildStats
+
+
+def _result(label: str, kind: str, duration: float, cached: bool = False) -> JobResult:
+    job = Job(argv=[], output=label, target="app", kind=kind, label=label)
+    start = time()
+    return JobResult(
+        job=job,
+        returncode=0,
+        stderr="",
+        cached=cached,
+        start=start,
+        end=start + duration,
+    )
+
+
+def test_summary_lists_slowest_compiles_and_links() -> None:
+    stats = BuildStats()
+    results = [
+        _result("a.c", "cc", 1.0),
+        _result("b.cxx", "cxx", 3.0),
+        _result("c.c", "cc", 2.0),
+        _result("d.c", "cc", 9.0, cached=True),
+        _result("lib.a", "ar", 0.5),
+        _result("app", "cxxld", 4.0),
+    ]
+
+    lines = stats.summary(results, slowest=2)
+    assert lines[0].startswith("Wall time: ")
+    assert lines[2].startswith("Jobs: 6 (1 from cache), parallelism ")
+    assert lines[3:] == [
+        "Slowest compiles:",
+        "     3.00s  CXX    b.cxx",
+        "     2.00s  CC     c.c",
+        "Slowest links:",
+        "     4.00s  CXXLD  app",
+        "     0.50s  AR     lib.a",
+    ]
+
+
+def test_summary_names_the_kind_of_links() -> None:
+    stats = BuildStats()
+    results = [_result("lib.a", "ar", 0.5), _result("lib.a", "ranlib", 0.25)]
+
+    lines = stats.summary(results)
+    assert lines[-2:] == ["     0.50s  AR     lib.a", "     0.25s  RANLIB lib.a"]
+
+
+def test_summary_parallelism() -> None:
+    stats = BuildStats()
+    stats.start = time() - 2
+    lines = stats.summary([_result("a.c", "cc", 2.0), _result("b.c", "cc", 2.0)])
+    parallelism = float(lines[2].rsplit(" ", 1)[1])
+    assert 1.9 < parallelism <= 2.0
+
+
+def test_summary_counts_child_cpu_time() -> None:
+    stats = BuildStats()
+    subprocess.run(
+        ["python3", "-c", "sum(range(10**7))"], check=True, capture_output=True
+    )
+    [_, cpu, _] = stats.summary([])
+    tools = float(cpu.split()[2].removesuffix("s"))
+    assert tools > 0
+
+
+def test_summary_without_jobs() -> None:
+    lines = BuildStats().summary([])
+    assert len(lines) == 3
+    assert lines[2].startswith("Jobs: 0 (0 from cache)")
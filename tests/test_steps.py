@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from ezbuild import Environment, Language, Program, SharedLibrary, StaticLibrary
+from ezbuild.steps import artifact_path, compile_flags, compile_job, link_kinds
+
+
+def test_artifact_path() -> None:
+    bin_dir, lib_dir = Path("bin"), Path("lib")
+    assert artifact_path(
+        Program(name="app", languages=[Language.C], sources=[]), bin_dir, lib_dir
+    ) == Path("bin/app")
+    assert artifact_path(
+        StaticLibrary(name="foo", languages=[Language.C], sources=[]),
+        bin_dir,
+        lib_dir,
+    ) == Path("lib/foo.a")
+    assert artifact_path(
+        SharedLibrary(name="bar", languages=[Language.C], sources=[]),
+        bin_dir,
+        lib_dir,
+    ) == Path("lib/bar.so")
+
+
+def test_compile_flags_shared_library() -> None:
+    lib = SharedLibrary(
+        name="lib", languages=[Language.C], sources=[], defines=["VALUE=1"]
+    )
+    assert compile_flags(lib, {"lib": lib}, {}) == ["-DVALUE=1", "-fPIC"]
+
+
+def test_compile_job(tmp_path: Path) -> None:
+    env = Environment()
+    env["CXX"] = "c++"
+    target = Program(name="app", languages=[Language.CXX], sources=[])
+
+    result = compile_job("app", target, "main.cpp", tmp_path, tmp_path / "app", env, [])
+    assert result is not None
+    command, job = result
+    assert job.kind == "cxx"
+    assert job.argv == command.arguments
+    assert job.argv[0] == "c++"
+    assert job.output == str(tmp_path / "app" / "main.cpp.o")
+
+
+def test_compile_job_header(tmp_path: Path) -> None:
+    target = Program(name="app", languages=[Language.C], sources=[])
+    job = compile_job("app", target, "app.h", tmp_path, tmp_path, Environment(), [])
+    assert job is None
+
+
+def test_link_kinds() -> None:
+    env = Environment()
+    program = Program(name="app", languages=[Language.C, Language.CXX], sources=[])
+    library = StaticLibrary(name="lib", languages=[Language.C], sources=[])
+    assert link_kinds(program, env) == ["cxxld"]
+    assert link_kinds(library, env) == ["ar", "ranlib"]
@@ -0,0 +1,79 @@
+import json
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ezbuild.trace import MAIN_LANE, Trace
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def test_trace_complete() -> None:
+    trace = Trace()
+    trace.complete(
+        "CC main.c", "cc", trace.origin + 1, trace.origin + 1.5, lane=2, args={"a": 1}
+    )
+
+    [metadata, event] = trace.events
+    assert metadata == {
+        "name": "thread_name",
+        "ph": "M",
+        "pid": 1,
+        "tid": 2,
+        "args": {"name": "worker 2"},
+    }
+    assert event == {
+        "name": "CC main.c",
+        "cat": "cc",
+        "ph": "X",
+        "ts": 1_000_000,
+        "dur": 500_000,
+        "pid": 1,
+        "tid": 2,
+        "args": {"a": 1},
+    }
+
+
+def test_trace_names_each_lane_once() -> None:
+    trace = Trace()
+    for lane in [MAIN_LANE, 1, 1, MAIN_LANE]:
+        trace.complete("step", "cc", trace.origin, trace.origin, lane=lane)
+
+    names = [event["args"]["name"] for event in trace.events if event["ph"] == "M"]
+    assert names == ["ezbuild", "worker 1"]
+
+
+def test_trace_span() -> None:
+    trace = Trace()
+    with trace.span("Sort targets", targets=3):
+        pass
+
+    event = trace.events[-1]
+    assert event["name"] == "Sort targets"
+    assert event["cat"] == "ezbuild"
+    assert event["tid"] == MAIN_LANE
+    assert event["args"] == {"targets": 3}
+    assert event["ts"] >= 0
+    assert event["dur"] >= 0
+
+
+def test_trace_span_records_on_error() -> None:
+    trace = Trace()
+    with pytest.raises(RuntimeError), trace.span("failing"):
+        raise RuntimeError
+
+    assert trace.events[-1]["name"] == "failing"
+
+
+def test_trace_save(tmp_path: Path) -> None:
+    trace = Trace()
+    with trace.span("step"):
+        pass
+
+    path = tmp_path / "nested" / "trace.json"
+    trace.save(path)
+    with path.open() as f:
+        data = json.load(f)
+    assert data["displayTimeUnit"] == "ms"
+    assert data["traceEvents"] == trace.events
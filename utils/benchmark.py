@@ -0,0 +1,342 @@
+"""
+Benchmark ezbuild on generated projects.
+
+Generates a synthetic C project of static libraries and one program, then
+measures end-to-end build times through the CLI and the overhead of
+evaluating build.ezbuild and walking the dependency graph in-process.
+Results are printed as JSON, or written to --output, so runs of different
+releases can be compared.
+
+Usage: uv run utils/benchmark.py --targets 50 --sources 20 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from random import Random
+from time import perf_counter, time
+
+import ezbuild
+from ezbuild import Environment, Language, Program, SharedLibrary, StaticLibrary
+from ezbuild.dep_tree import DepTree
+from ezbuild.safe_exec import safe_execute
+
+# Environment variables that would make builds depend on earlier runs.
+_CACHE_VARIABLES = ["EZBUILD_CACHE", "EZBUILD_REMOTE_CACHE"]
+
+
+def generate_project(
+    root: Path,
+    targets: int,
+    sources: int,
+    fan_in: int,
+    fan_out: int,
+    defines: int,
+    seed: int,
+    tools: dict[str, Path] | None = None,
+) -> dict[str, list[str]]:
+    """
+    Write a project of targets - 1 static libraries and a program to root.
+    Each library depends on up to fan_in earlier libraries, and no library
+    has more than fan_out dependents. Sources include the headers of their
+    target's dependencies, so touching a header rebuilds its dependents.
+    The program depends on every library nothing else depends on.
+    tools set CC, AR etc. of the environment, e.g. to a fake toolchain.
+    Returns the dependencies of every target.
+    """
+    random = Random(seed)
+    libraries = [f"lib{index}" for index in range(targets - 1)]
+    graph: dict[str, list[str]] = {}
+    dependents = dict.fromkeys(libraries, 0)
+
+    for index, library in enumerate(libraries):
+        candidates = [dep for dep in libraries[:index] if dependents[dep] < fan_out]
+        deps = random.sample(candidates, min(fan_in, len(candidates)))
+        for dep in deps:
+            dependents[dep] += 1
+        graph[library] = sorted(deps)
+    graph["app"] = [library for library in libraries if dependents[library] == 0]
+
+    build_file = ["env = Environment()"]
+    for variable, tool in (tools or {}).items():
+        build_file.append(f'env["{variable}"] = "{tool}"')
+    build_file.append("")
+    for name, deps in graph.items():
+        directory = root / name
+        directory.mkdir(parents=True, exist_ok=True)
+        includes = "".join(f'#include "../{dep}/{dep}.h"\n' for dep in deps)
+
+        if name == "app":
+            calls = "".join(f"    total += {dep}_0();\n" for dep in deps)
+            (directory / "main.c").write_text(
+                f"{includes}\nint main(void) {{\n    int total = 0;\n{calls}"
+                "    return total == 0;\n}\n"
+            )
+            files = ["app/main.c"]
+        else:
+            (directory / f"{name}.h").write_text(
+                "".join(f"int {name}_{index}(void);\n" for index in range(sources))
+            )
+            files = []
+            for index in range(sources):
+                source = directory / f"s{index}.c"
+                source.write_text(
+                    f'{includes}#include "{name}.h"\n\n'
+                    f"int {name}_{index}(void) {{ return {index + 1}; }}\n"
+                )
+                files.append(f"{name}/{source.name}")
+
+        kind = "Program" if name == "app" else "StaticLibrary"
+        target_defines = [
+            f"{name.upper()}_OPTION_{index}={index}" for index in range(defines)
+        ]
+        build_file.extend(
+            [
+                f"{name} = env.{kind}(",
+                f'    name="{name}",',
+                "    languages=[Language.C],",
+                f"    sources={files!r},",
+                f"    dependencies={deps!r},",
+                f"    defines={target_defines!r},",
+                ")",
+                "",
+            ]
+        )
+
+    (root / "build.ezbuild").write_text("\n".join(build_file))
+    return graph
+
+
+def _summary(samples: list[float]) -> dict[str, float | list[float]]:
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+
+def _run_build(root: Path, jobs: int, env: dict[str, str]) -> float:
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "ezbuild", "build", "-j", str(jobs)],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = perf_counter() - start
+    if result.returncode != 0:
+        print(result.stdout, result.stderr, sep="\n", file=sys.stderr)
+        sys.exit(f"Build failed with exit code {result.returncode}")
+    return elapsed
+
+
+def benchmark_builds(
+    root: Path, jobs: int, repeat: int, touched: Path
+) -> dict[str, dict[str, float | list[float]]]:
+    """Time full builds, no-op rebuilds and rebuilds after touching one file."""
+    env = {
+        key: value for key, value in os.environ.items() if key not in _CACHE_VARIABLES
+    }
+    full, noop, touch = [], [], []
+
+    for _ in range(repeat):
+        shutil.rmtree(root / "build", ignore_errors=True)
+        full.append(_run_build(root, jobs, env))
+        noop.append(_run_build(root, jobs, env))
+        now = time()
+        os.utime(touched, (now, now))
+        touch.append(_run_build(root, jobs, env))
+
+    return {
+        "full_build": _summary(full),
+        "noop_rebuild": _summary(noop),
+        "touch_rebuild": _summary(touch),
+    }
+
+
+def _namespace() -> dict[str, object]:
+    return {
+        "Environment": Environment,
+        "Language": Language,
+        "Program": Program,
+        "StaticLibrary": StaticLibrary,
+        "SharedLibrary": SharedLibrary,
+    }
+
+
+def benchmark_overhead(
+    root: Path, iterations: int
+) -> dict[str, dict[str, float | list[float]]]:
+    """Time evaluating build.ezbuild and traversing its dependency graph."""
+    code = (root / "build.ezbuild").read_text()
+
+    evaluate = []
+    for _ in range(iterations):
+        start = perf_counter()
+        namespace = safe_execute(code, _namespace())
+        evaluate.append(perf_counter() - start)
+
+    targets = {
+        name: value
+        for name, value in namespace.items()
+        if isinstance(value, Program | StaticLibrary | SharedLibrary)
+    }
+
+    traverse = []
+    for _ in range(iterations):
+        start = perf_counter()
+        dep_tree = DepTree(targets)
+        dep_tree.topological_sort()
+        dep_tree.start()
+        ready = dep_tree.pop_ready()
+        while ready:
+            for name in ready:
+                dep_tree.mark_done(name)
+            ready = dep_tree.pop_ready()
+        assert dep_tree.is_complete()
+        traverse.append(perf_counter() - start)
+
+    return {"safe_execute": _summary(evaluate), "dep_tree": _summary(traverse)}
+
+
+def _install_fake_toolchain(
+    directory: Path, compile_time: float, link_time: float
+) -> dict[str, Path]:
+    from fake_toolchain import install
+
+    defaults = {
+        "cc": compile_time,
+        "cxx": compile_time,
+        "ccld": link_time,
+        "cxxld": link_time,
+        "ar": 0.0,
+        "ranlib": 0.0,
+    }
+    install(directory, defaults, scale=1.0, log=None)
+    return {
+        variable: directory / tool
+        for variable, tool in [
+            ("CC", "cc"),
+            ("CXX", "cxx"),
+            ("CCLD", "cc"),
+            ("CXXLD", "cxx"),
+            ("AR", "ar"),
+            ("RANLIB", "ranlib"),
+        ]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--targets", type=int, default=20, help="number of targets")
+    parser.add_argument("--sources", type=int, default=10, help="sources per library")
+    parser.add_argument(
+        "--fan-in", type=int, default=2, help="dependencies per library"
+    )
+    parser.add_argument(
+        "--fan-out", type=int, default=4, help="max dependents per library"
+    )
+    parser.add_argument("--defines", type=int, default=0, help="defines per target")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the dependency graph"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every build")
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=100,
+        help="runs of every in-process measurement",
+    )
+    parser.add_argument(
+        "--skip-builds", action="store_true", help="only measure overhead"
+    )
+    parser.add_argument(
+        "--dir", type=Path, help="generate the project here and keep it"
+    )
+    parser.add_argument("--output", type=Path, help="write results here, not to stdout")
+    parser.add_argument(
+        "--fake-toolchain",
+        action="store_true",
+        help="build with utils/fake_toolchain.py instead of the system compiler",
+    )
+    parser.add_argument(
+        "--compile-time", type=float, default=0.0, help="seconds per fake compile"
+    )
+    parser.add_argument(
+        "--link-time", type=float, default=0.0, help="seconds per fake link"
+    )
+    args = parser.parse_args()
+
+    if args.targets < 1:
+        parser.error("--targets must be at least 1")
+
+    with tempfile.TemporaryDirectory(prefix="ezbuild-bench-") as temp_dir:
+        root = (args.dir or Path(temp_dir)).resolve()
+        tools = None
+        if args.fake_toolchain:
+            tools = _install_fake_toolchain(
+                root / "fake-toolchain", args.compile_time, args.link_time
+            )
+        graph = generate_project(
+            root,
+            args.targets,
+            args.sources,
+            args.fan_in,
+            args.fan_out,
+            args.defines,
+            args.seed,
+            tools,
+        )
+
+        results = {}
+        if not args.skip_builds:
+            print(f"Building {root}", file=sys.stderr)
+            touched = (
+                root / "lib0" / "s0.c" if args.targets > 1 else root / "app" / "main.c"
+            )
+            results.update(benchmark_builds(root, args.jobs, args.repeat, touched))
+        print("Measuring overhead", file=sys.stderr)
+        results.update(benchmark_overhead(root, args.iterations))
+
+    report = {
+        "ezbuild": ezbuild.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "targets": args.targets,
+            "sources": args.sources,
+            "fan_in": args.fan_in,
+            "fan_out": args.fan_out,
+            "defines": args.defines,
+            "seed": args.seed,
+            "jobs": args.jobs,
+            "repeat": args.repeat,
+            "iterations": args.iterations,
+            "fake_toolchain": args.fake_toolchain,
+            "compile_time": args.compile_time if args.fake_toolchain else None,
+            "link_time": args.link_time if args.fake_toolchain else None,
+            "dependencies": sum(len(deps) for deps in graph.values()),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
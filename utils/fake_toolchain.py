@@ -0,0 +1,289 @@
+"""
+Fake C/C++ toolchain for benchmarking ezbuild without a real compiler.
+
+`install DIR` writes cc, cxx, ar and ranlib wrappers to DIR, which a build
+file selects through the environment:
+
+    env["CC"] = "DIR/cc"
+    env["CXX"] = "DIR/cxx"
+    env["AR"] = "DIR/ar"
+    env["RANLIB"] = "DIR/ranlib"
+
+Every tool sleeps for a configured duration and writes a plausible output:
+compiles write an object and the depfile requested with -MMD -MF, and
+preprocess to stdout with -E; links, ar and ranlib write their output from
+the hashes of their inputs, and ar d deletes members. Outputs are
+deterministic, so caching and incremental builds behave as with a real
+toolchain. Like gcc, the tools read arguments from `@file` response files.
+
+Durations of a recorded build are replayed with --from-log, which reads
+the .ezbuild_log of a build of the same project in the same directory.
+Steps that are not in the log take the mean duration of their kind in the
+log, or the defaults given on the command line.
+
+Usage: uv run utils/fake_toolchain.py install /tmp/fake --compile-time 0.2
+"""
+
+import argparse
+import json
+import re
+import shlex
+import sys
+from hashlib import sha256
+from pathlib import Path
+from time import sleep
+
+CONFIG_FILE = "fake_toolchain.json"
+
+_TOOLS = ["cc", "cxx", "ar", "ranlib"]
+_INCLUDE = re.compile(rb'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+
+def _digest(*parts: bytes) -> str:
+    digest = sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _option(argv: list[str], name: str) -> str | None:
+    if name in argv and argv.index(name) + 1 < len(argv):
+        return argv[argv.index(name) + 1]
+    return None
+
+
+def _headers(source: Path, include_dirs: list[Path]) -> list[Path]:
+    """Quoted includes of source, recursively, the way cc would find them."""
+    found: list[Path] = []
+    pending = [source]
+    while pending:
+        text = pending.pop().read_bytes()
+        for match in _INCLUDE.finditer(text):
+            name = match.group(1).decode()
+            for directory in [source.parent, *include_dirs]:
+                header = (directory / name).resolve()
+                if header.is_file():
+                    if header not in found:
+                        found.append(header)
+                        pending.append(header)
+                    break
+    return found
+
+
+def _inputs(argv: list[str], options_with_values: list[str]) -> list[str]:
+    inputs = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in options_with_values:
+            skip = True
+        elif not arg.startswith("-"):
+            inputs.append(arg)
+    return inputs
+
+
+def _expand_response_files(argv: list[str]) -> list[str]:
+    expanded = []
+    for arg in argv:
+        if arg.startswith("@") and Path(arg[1:]).is_file():
+            expanded.extend(shlex.split(Path(arg[1:]).read_text()))
+        else:
+            expanded.append(arg)
+    return expanded
+
+
+def _write(path: str, text: str) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(text)
+
+
+def _compile(config: dict, tool: str, argv: list[str]) -> int:
+    sources = _inputs(argv, ["-o", "-MF", "-MT", "-MQ", "-I", "-include"])
+    if len(sources) != 1:
+        print(f"fake {tool}: expected one source, got {sources}", file=sys.stderr)
+        return 1
+
+    source = Path(sources[0])
+    include_dirs = [Path(arg[2:]) for arg in argv if arg.startswith("-I") and arg[2:]]
+    try:
+        headers = _headers(source, include_dirs)
+        text = source.read_bytes() + b"".join(path.read_bytes() for path in headers)
+    except OSError as e:
+        print(f"fake {tool}: {e}", file=sys.stderr)
+        return 1
+
+    output = _option(argv, "-o")
+    depfile = _option(argv, "-MF")
+    if "-MMD" in argv and depfile:
+        target = output or f"{source.stem}.o"
+        prerequisites = " \\\n ".join([str(source), *map(str, headers)])
+        _write(depfile, f"{target}: {prerequisites}\n")
+
+    if "-E" in argv:
+        defines = [arg for arg in argv if arg.startswith("-D")]
+        sys.stdout.buffer.write("\n".join(defines).encode() + b"\n" + text)
+        return 0
+
+    if output is None:
+        print(f"fake {tool}: -o is required", file=sys.stderr)
+        return 1
+
+    sleep(_duration(config, output, tool))
+    flags = [arg for arg in argv if arg.startswith(("-D", "-O", "-g", "-std"))]
+    _write(output, f"fake object {_digest(text, json.dumps(flags).encode())}\n")
+    return 0
+
+
+def _link(config: dict, tool: str, argv: list[str]) -> int:
+    output = _option(argv, "-o")
+    if output is None:
+        print(f"fake {tool}: -o is required", file=sys.stderr)
+        return 1
+
+    kind = f"{tool}ld"
+    sleep(_duration(config, output, kind))
+    try:
+        inputs = [Path(path).read_bytes() for path in _inputs(argv, ["-o", "-L", "-l"])]
+    except OSError as e:
+        print(f"fake {kind}: {e}", file=sys.stderr)
+        return 1
+
+    _write(output, f"#!/bin/sh\n# fake executable {_digest(*inputs)}\n")
+    if "-shared" not in argv:
+        Path(output).chmod(0o755)
+    return 0
+
+
+def _archive(config: dict, argv: list[str]) -> int:
+    if len(argv) < 2:
+        print("fake ar: usage: ar OPERATION ARCHIVE [MEMBERS...]", file=sys.stderr)
+        return 1
+
+    operation, archive, members = argv[0].lstrip("-"), argv[1], argv[2:]
+    path = Path(archive)
+    # Replace members of an existing archive by name, like `ar r`, or delete
+    # them with `ar d`. Members are stored by name, also with P.
+    entries: dict[str, str] = {}
+    if path.exists():
+        for line in path.read_text().splitlines()[1:]:
+            name, _, digest = line.rpartition(" ")
+            entries[name] = digest
+
+    sleep(_duration(config, archive, "ar"))
+    try:
+        for member in members:
+            if "d" in operation:
+                entries.pop(Path(member).name, None)
+            else:
+                entries[Path(member).name] = _digest(Path(member).read_bytes())
+    except OSError as e:
+        print(f"fake ar: {e}", file=sys.stderr)
+        return 1
+
+    lines = ["!<arch>", *(f"{name} {digest}" for name, digest in entries.items())]
+    _write(archive, "\n".join(lines) + "\n")
+    return 0
+
+
+def _ranlib(config: dict, argv: list[str]) -> int:
+    if len(argv) != 1 or not Path(argv[0]).exists():
+        print(f"fake ranlib: no archive in {argv}", file=sys.stderr)
+        return 1
+
+    sleep(_duration(config, argv[0], "ranlib"))
+    Path(argv[0]).touch()
+    return 0
+
+
+def _duration(config: dict, output: str, kind: str) -> float:
+    recorded = config["durations"].get(f"{output}\t{kind}")
+    if recorded is None:
+        recorded = config["defaults"][kind]
+    return recorded * config["scale"]
+
+
+def run(tool: str, config_path: Path, argv: list[str]) -> int:
+    """Run a fake tool with the configuration written by install."""
+    config = json.loads(config_path.read_text())
+    argv = _expand_response_files(argv)
+
+    if tool == "ar":
+        return _archive(config, argv)
+    if tool == "ranlib":
+        return _ranlib(config, argv)
+    if "-c" in argv or "-E" in argv:
+        return _compile(config, tool, argv)
+    return _link(config, tool, argv)
+
+
+def install(
+    directory: Path,
+    defaults: dict[str, float],
+    scale: float,
+    log: Path | None,
+) -> None:
+    """Write the wrappers and their configuration to directory."""
+    durations: dict[str, float] = {}
+    if log is not None:
+        # Only needed here, so the tools themselves start without ezbuild.
+        from ezbuild.build_log import BuildLog
+
+        build_log = BuildLog.load(log.parent)
+        if log.name != build_log.path.name:
+            sys.exit(f"{log} is not named {build_log.path.name}")
+        for (output, kind), entry in build_log.entries.items():
+            if entry.status == 0:
+                durations[f"{output}\t{kind}"] = entry.duration
+        for kind in defaults:
+            typical = build_log.typical_duration(kind)
+            if typical is not None:
+                defaults[kind] = typical
+
+    directory.mkdir(parents=True, exist_ok=True)
+    config = {"defaults": defaults, "scale": scale, "durations": durations}
+    (directory / CONFIG_FILE).write_text(json.dumps(config, indent=2))
+
+    script = Path(__file__).resolve()
+    for tool in _TOOLS:
+        wrapper = directory / tool
+        wrapper.write_text(
+            f'#!/bin/sh\nexec "{sys.executable}" "{script}" '
+            f'run {tool} "{directory / CONFIG_FILE}" "$@"\n'
+        )
+        wrapper.chmod(0o755)
+
+
+def main() -> None:
+    if len(sys.argv) > 3 and sys.argv[1] == "run":
+        sys.exit(run(sys.argv[2], Path(sys.argv[3]), sys.argv[4:]))
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+    install_parser = commands.add_parser("install", help="write the fake tools")
+    install_parser.add_argument("directory", type=Path)
+    install_parser.add_argument("--compile-time", type=float, default=0.05)
+    install_parser.add_argument("--link-time", type=float, default=0.1)
+    install_parser.add_argument("--archive-time", type=float, default=0.01)
+    install_parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply every duration by this"
+    )
+    install_parser.add_argument(
+        "--from-log", type=Path, help="replay durations from this .ezbuild_log"
+    )
+    args = parser.parse_args()
+
+    defaults = {
+        "cc": args.compile_time,
+        "cxx": args.compile_time,
+        "ccld": args.link_time,
+        "cxxld": args.link_time,
+        "ar": args.archive_time,
+        "ranlib": 0.0,
+    }
+    install(args.directory.resolve(), defaults, args.scale, args.from_log)
+    print(f"Installed fake toolchain to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()